@@ -24,7 +24,9 @@ CREATE TABLE `bitacora` (
   `fechaCreacion` timestamp NOT NULL DEFAULT current_timestamp(),
   `fechaActualizacion` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
   PRIMARY KEY (`idBitacora`),
-  KEY `idPaciente` (`idPaciente`),
+  KEY `idx_paciente_fecha` (`idPaciente`,`fecha`),
+  KEY `idx_fecha` (`fecha`),
+  KEY `idx_glucosa` (`glucosa`),
   CONSTRAINT `bitacora_ibfk_2` FOREIGN KEY (`idPaciente`) REFERENCES `pacientes` (`idPaciente`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
@@ -37,6 +39,33 @@ INSERT INTO `bitacora` (`idBitacora`, `idPaciente`, `fecha`, `horaInicio`, `hora
 (21,	1,	'2025-10-10',	'20:24',	'20:24',	789.00,	789.00,	8.99,	778.00,	678.00,	23.00,	'180/90',	'2025-11-26 02:24:46',	'2025-11-26 05:16:52'),
 (22,	1,	'2025-11-01',	'08:00',	'21:00',	1230.00,	232.00,	231.00,	213.00,	321.00,	123.00,	'120/30',	'2025-11-26 05:01:03',	'2025-11-26 05:16:52');
 
+DROP TABLE IF EXISTS `bitacora_resumen_diario`;
+CREATE TABLE `bitacora_resumen_diario` (
+  `idPaciente` int(11) NOT NULL,
+  `anio` smallint(6) NOT NULL,
+  `mes` tinyint(4) NOT NULL,
+  `dia` tinyint(4) NOT NULL,
+  `sesiones` int(11) NOT NULL DEFAULT 0,
+  `sumaUfTotal` decimal(14,2) NOT NULL DEFAULT 0.00,
+  `conteoUfTotal` int(11) NOT NULL DEFAULT 0,
+  `sumaLiquidoIngerido` decimal(14,2) NOT NULL DEFAULT 0.00,
+  `sumaCantidadOrina` decimal(14,2) NOT NULL DEFAULT 0.00,
+  `glucosaMinima` decimal(10,2) DEFAULT NULL,
+  `glucosaMaxima` decimal(10,2) DEFAULT NULL,
+  `fechaActualizacion` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  PRIMARY KEY (`idPaciente`,`anio`,`mes`,`dia`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Resúmenes de los datos de ejemplo: misma consulta que `flask reconstruir-resumen`
+INSERT INTO `bitacora_resumen_diario` (`idPaciente`, `anio`, `mes`, `dia`, `sesiones`, `sumaUfTotal`, `conteoUfTotal`, `sumaLiquidoIngerido`, `sumaCantidadOrina`, `glucosaMinima`, `glucosaMaxima`)
+SELECT `idPaciente`, YEAR(`fecha`), MONTH(`fecha`), DAY(`fecha`),
+       COUNT(*), COALESCE(SUM(`ufTotal`), 0), COUNT(`ufTotal`),
+       COALESCE(SUM(`liquidoIngerido`), 0), COALESCE(SUM(`cantidadOrina`), 0),
+       MIN(`glucosa`), MAX(`glucosa`)
+FROM `bitacora`
+WHERE `idPaciente` IS NOT NULL
+GROUP BY `idPaciente`, `fecha`;
+
 DROP TABLE IF EXISTS `pacientes`;
 CREATE TABLE `pacientes` (
   `idPaciente` int(11) NOT NULL AUTO_INCREMENT,
@@ -52,7 +81,9 @@ CREATE TABLE `pacientes` (
   `idUsuario` int(11) DEFAULT NULL,
   PRIMARY KEY (`idPaciente`),
   KEY `idx_nombre` (`nombreCompleto`),
-  KEY `idx_curp` (`curp`)
+  KEY `idx_curp` (`curp`),
+  KEY `idx_usuario` (`idUsuario`),
+  FULLTEXT KEY `ft_nombre` (`nombreCompleto`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 INSERT INTO `pacientes` (`idPaciente`, `nombreCompleto`, `edad`, `sexo`, `curp`, `domicilio`, `telefono`, `emergencia`, `seguroMedico`, `fechaRegistro`, `idUsuario`) VALUES
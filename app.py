@@ -5,14 +5,19 @@
 # pip install -r requirements.txt
 
 from functools import wraps
-from flask import Flask, render_template, request, jsonify, make_response, session
+from flask import Flask, render_template, request, jsonify, make_response, session, Response, stream_with_context, g
 
 from flask_cors import CORS, cross_origin
 
-import mysql.connector.pooling
-import pusher
+import mysql.connector
 import pytz
 import datetime
+import hmac
+import io
+import itertools
+import os
+import time
+import click
 
 from bitacora_service import (
     BitacoraConnectionSingleton, 
@@ -22,35 +27,48 @@ from bitacora_service import (
     BitacoraDateFormatDecorator,
     BitacoraCountDecorator,
     BitacoraLogObserver,
-    BitacoraNotificationObserver
+    BitacoraNotificationObserver,
+    BitacoraCacheMes,
+    BitacoraCacheObserver,
+    BitacoraDespachador
 )
+from bitacora_export import BitacoraExportador
+from bitacora_import import BitacoraImportador
+from consultas_lentas_service import RegistroConsultasLentas
 from dao.usuario_dao import UsuarioDAO
+from json_provider import VidaDialJSONProvider
+from log_service import RegistroActividad
+from metricas_service import REGISTRO, TIPO_CONTENIDO
+from paciente_service import PacienteResolver
+from pool_service import ConexionesPorPeticion, PoolConexiones, consultar
+from pusher_service import PusherPublicador
+from resumen_service import BitacoraResumenObserver, ResumenService
+from tendencias_service import BitacoraTendenciasObserver, TendenciasService
 
 app            = Flask(__name__)
 app.secret_key = "Test12345"
-CORS(app)
-
-con_pool = mysql.connector.pooling.MySQLConnectionPool(
-    pool_name="my_pool",
-    pool_size=5,
-    host="185.232.14.52",
-    database="u760464709_23005102_bd",
-    user="u760464709_23005102_usr",
-    password="*Q~ic:$9XVr2"
-)
-"""
-con_pool = mysql.connector.pooling.MySQLConnectionPool(
-    pool_name="my_pool",
-    pool_size=5,
-    host="localhost",
-    database="practicas",
-    user="root",
-    password="Test12345"
-)
-"""
+
+# JSON uniforme (Decimal como número, fechas ISO) con backend configurable:
+# JSON_BACKEND=auto (orjson si está instalado), json u orjson
+app.json = VidaDialJSONProvider(app, backend=os.environ.get("JSON_BACKEND", "auto"))
+CORS(app, expose_headers=["X-Siguiente-Cursor", "X-Log-Offset", "Content-Disposition"])
+
+# Pool de conexiones configurable por entorno (DB_HOST, DB_NAME, DB_USER,
+# DB_PASSWORD, DB_POOL_SIZE, DB_POOL_TIMEOUT...); espera a que se libere una
+# conexión en lugar de fallar de inmediato cuando está agotado
+con_pool = PoolConexiones.desde_entorno()
+
+# Registro de consultas lentas (SLOW_QUERY_MS, SLOW_QUERY_LOG): mide cada sentencia
+# de las conexiones del pool y captura el EXPLAIN de las lentas en una conexión aparte
+consultas_lentas = RegistroConsultasLentas.desde_entorno(conectar=con_pool.conexion_aparte)
+con_pool.set_consultas_lentas(consultas_lentas)
+
+# Unidad de trabajo: una sola conexión por petición, compartida por los
+# helpers, el Facade y el DAO; se devuelve al pool en teardown_request
+conexiones = ConexionesPorPeticion(con_pool)
 
 # Inicializar el Singleton para la conexión de bitácora
-bitacora_connection = BitacoraConnectionSingleton.get_instance(con_pool)
+bitacora_connection = BitacoraConnectionSingleton.get_instance(conexiones)
 
 # Inicializar el Facade con decoradores
 bitacora_facade = BitacoraFacade(bitacora_connection)
@@ -62,26 +80,93 @@ decorator_count = BitacoraCountDecorator(decorator_date_format)
 bitacora_facade.set_decorator_chain(decorator_count)
 
 # Configurar observadores (patrón Observer)
+# Los observadores asíncronos (log y notificaciones) se atienden en segundo plano
+despachador_eventos = BitacoraDespachador(num_hilos=2, max_cola=1000, politica="bloquear")
+bitacora_facade.set_despachador(despachador_eventos)
 log_observer = BitacoraLogObserver()
 notification_observer = BitacoraNotificationObserver()
 bitacora_facade.attach_observer(log_observer)
 bitacora_facade.attach_observer(notification_observer)
 
+# Caché de resultados por mes; el observador expulsa las entradas en cada escritura
+cache_mes = BitacoraCacheMes(max_entradas=256, ttl=300)
+bitacora_facade.set_cache(cache_mes)
+bitacora_facade.attach_observer(BitacoraCacheObserver(cache_mes), asincrono=False)
+
+# Resúmenes diarios preagregados, mantenidos en segundo plano por su observador
+resumen_service = ResumenService(conexiones)
+bitacora_facade.attach_observer(BitacoraResumenObserver(resumen_service))
+
+# Tendencias por paciente (NumPy); la caché se invalida con cada escritura del paciente
+tendencias_service = TendenciasService(conexiones)
+bitacora_facade.attach_observer(BitacoraTendenciasObserver(tendencias_service), asincrono=False)
+
 # Inicializar DAO (patrón DAO para usuarios)
-usuario_dao = UsuarioDAO(con_pool)
-
-def pusherProductos():    
-    pusher_client = pusher.Pusher(
-        app_id="2046005",
-        key="12cb9c6b5319b2989000",
-        secret="7c193405c24182d96965",
-        cluster="us2",
-        ssl=True
-    )
-    
-    pusher_client.trigger("canalProductos", "eventoProductos", {"message": "Hola Mundo!"})
+usuario_dao = UsuarioDAO(conexiones)
+
+# Resolvedor de pacientes por nombre compartido con el Facade (índice en memoria)
+paciente_resolver = PacienteResolver(conexiones)
+bitacora_facade.set_paciente_resolver(paciente_resolver)
+paciente_resolver.cargar()
+
+# Importador masivo de registros (CSV/NDJSON)
+bitacora_importador = BitacoraImportador(bitacora_facade)
+bitacora_exportador = BitacoraExportador(conexiones)
+
+# Registro de actividad en segmentos rotativos (migra el antiguo log-busquedas.txt)
+registro_actividad = RegistroActividad(directorio="logs", archivo_legado="log-busquedas.txt")
+
+# Publicador de Pusher compartido: un solo cliente y envío en segundo plano
+publicador_pusher = PusherPublicador.desde_entorno()
+
+# Métricas en formato de Prometheus (/metrics): latencia por ruta y estado de
+# los componentes, leído en cada consulta de /metrics
+metrica_peticiones = REGISTRO.histograma(
+    "vidadial_peticion_segundos", "Duración de las peticiones por ruta", ("ruta", "metodo", "estado"))
+REGISTRO.medidores("vidadial_pool", "Pool de conexiones", con_pool.estadisticas,
+                   ("tamano", "abiertas", "en_uso", "libres", "prestamos", "esperas", "agotamientos", "descartadas"),
+                   contadores=("prestamos", "esperas", "agotamientos", "descartadas"))
+REGISTRO.medidores("vidadial_despachador", "Despachador de eventos de bitácora", despachador_eventos.metricas,
+                   ("profundidad", "profundidad_maxima", "encolados", "procesados", "descartados", "en_linea", "errores"),
+                   contadores=("encolados", "procesados", "descartados", "en_linea", "errores"))
+REGISTRO.medidores("vidadial_cache_mes", "Caché de búsquedas por mes", cache_mes.estadisticas,
+                   ("entradas", "aciertos", "fallos", "expulsiones"),
+                   contadores=("aciertos", "fallos", "expulsiones"))
+REGISTRO.medidores("vidadial_pusher", "Publicador de Pusher", publicador_pusher.metricas,
+                   ("profundidad", "publicados", "enviados", "agrupados", "lotes", "reintentos", "fallidos", "descartados"),
+                   contadores=("publicados", "enviados", "agrupados", "lotes", "reintentos", "fallidos", "descartados"))
+
+def pusherProductos():
+    publicador_pusher.publicar("canalProductos", "eventoProductos", {"message": "Hola Mundo!"})
     return make_response(jsonify({}))
 
+@app.before_request
+def iniciarMedicion():
+    g._inicio_peticion = time.perf_counter()
+
+@app.after_request
+def registrarEstado(respuesta):
+    g._estado_peticion = respuesta.status_code
+    return respuesta
+
+@app.teardown_request
+def liberarConexion(error=None):
+    """Devuelve al pool la conexión compartida de la petición."""
+    conexiones.liberar(error)
+
+@app.teardown_request
+def medirPeticion(error=None):
+    """
+    Registra la duración de la petición por plantilla de ruta. En las
+    respuestas por streaming se ejecuta al terminar de enviar el cuerpo.
+    """
+    inicio = g.pop("_inicio_peticion", None)
+    if inicio is None:
+        return
+    ruta = request.url_rule.rule if request.url_rule else "sin_ruta"
+    estado = 500 if error is not None else g.pop("_estado_peticion", 500)
+    metrica_peticiones.observar(time.perf_counter() - inicio, ruta, request.method, estado)
+
 def login(fun):
     @wraps(fun)
     def decorador(*args, **kwargs):
@@ -121,112 +206,144 @@ def obtener_contexto_usuario():
     paciente = session.get("login-usr")
     return tipo_usuario, id_usuario, es_admin, paciente
 
+def resolver_paciente_peticion(nombre_paciente: str, es_admin: bool):
+    """
+    Determina el paciente al que se asocia un registro.
+    Los usuarios no administradores usan el paciente de la sesión; los
+    administradores, el nombre proporcionado.
+    Retorna (idPaciente, nombre del paciente, idPaciente de la sesión).
+    """
+    id_paciente = None
+    id_paciente_sesion = None
+
+    if not es_admin:
+        # Si no es admin, el paciente (id y nombre completo) viene de la sesión
+        id_paciente_sesion, nombre_paciente_sesion = obtener_paciente_sesion()
+        id_paciente = id_paciente_sesion
+        if id_paciente:
+            nombre_paciente = nombre_paciente_sesion or nombre_paciente
+        else:
+            # Si no hay paciente asociado al usuario, intentar buscar por nombre
+            if nombre_paciente:
+                id_paciente = obtener_id_paciente_por_nombre(nombre_paciente)
+    else:
+        # Si es admin, buscar por el nombre proporcionado
+        if nombre_paciente:
+            id_paciente = obtener_id_paciente_por_nombre(nombre_paciente)
+
+    return id_paciente, nombre_paciente, id_paciente_sesion
+
+def leer_datos_bitacora(fuente):
+    """
+    Construye los datos de un registro a partir del formulario o de un objeto JSON.
+    Incluye 'id' cuando se trata de una actualización.
+    """
+    def texto(campo):
+        valor = fuente.get(campo)
+        return "" if valor is None else str(valor).strip()
+
+    datos = {
+        "fecha": texto("fecha"),
+        "horaInicio": texto("horaInicio") or None,
+        "horaFin": texto("horaFin") or None,
+        "presionArterial": texto("presionArterial") or None
+    }
+
+    # Convertir valores vacíos a None para campos numéricos
+    for campo in BitacoraValidationDecorator.CAMPOS_NUMERICOS:
+        valor = texto(campo)
+        datos[campo] = float(valor) if valor else None
+
+    # Agregar ID si existe (para actualización)
+    id_bitacora = texto("id")
+    if id_bitacora.isdigit():
+        datos["id"] = int(id_bitacora)
+
+    return datos
+
 def obtener_id_paciente_por_nombre(nombre_paciente: str):
     """
     Obtiene el idPaciente desde el nombre del paciente.
     Retorna el idPaciente o None si no se encuentra.
-    Busca de forma case-insensitive y permite coincidencias parciales.
+    Busca de forma case-insensitive (sin acentos) y permite coincidencias parciales.
     """
     if not nombre_paciente:
         return None
     
-    con = None
-    cursor = None
-    try:
-        con = con_pool.get_connection()
-        cursor = con.cursor(dictionary=True)
-        # Buscar primero por coincidencia exacta (case-insensitive)
-        sql = """
-        SELECT idPaciente
-        FROM pacientes
-        WHERE LOWER(TRIM(nombreCompleto)) = LOWER(TRIM(%s))
-        LIMIT 1
-        """
-        cursor.execute(sql, (nombre_paciente,))
-        resultado = cursor.fetchone()
-        if resultado:
-            return resultado['idPaciente']
-        
-        # Si no encuentra, buscar por coincidencia parcial (case-insensitive)
-        sql = """
-        SELECT idPaciente
-        FROM pacientes
-        WHERE LOWER(nombreCompleto) LIKE LOWER(%s)
-        LIMIT 1
-        """
-        cursor.execute(sql, (f"%{nombre_paciente}%",))
-        resultado = cursor.fetchone()
-        return resultado['idPaciente'] if resultado else None
-    except mysql.connector.Error as error:
-        print(f"[app.py] Error al obtener idPaciente: {error}")
-        return None
-    finally:
-        if cursor:
-            cursor.close()
-        if con and con.is_connected():
-            con.close()
+    return paciente_resolver.resolver_id(nombre_paciente)
 
-def obtener_id_paciente_por_id_usuario(id_usuario: int):
+def obtener_paciente_por_id_usuario(id_usuario: int):
     """
-    Obtiene el idPaciente asociado a un idUsuario.
-    Retorna el idPaciente o None si no se encuentra.
+    Obtiene el idPaciente y el nombre del paciente asociados a un idUsuario.
+    Retorna una tupla (idPaciente, nombreCompleto) o (None, None) si no se encuentra.
     """
     if not id_usuario:
-        return None
+        return None, None
     
     con = None
-    cursor = None
     try:
-        con = con_pool.get_connection()
-        cursor = con.cursor(dictionary=True)
+        con = conexiones.get_connection()
         sql = """
-        SELECT idPaciente
+        SELECT idPaciente, nombreCompleto
         FROM pacientes
         WHERE idUsuario = %s
+        ORDER BY idPaciente
         LIMIT 1
         """
-        cursor.execute(sql, (id_usuario,))
-        resultado = cursor.fetchone()
-        return resultado['idPaciente'] if resultado else None
+        # Consulta frecuente (cada inicio de sesión): sentencia preparada
+        registros = consultar(con, sql, (id_usuario,))
+        resultado = registros[0] if registros else None
+        if resultado:
+            return resultado['idPaciente'], resultado['nombreCompleto']
+        return None, None
     except mysql.connector.Error as error:
-        print(f"[app.py] Error al obtener idPaciente por idUsuario: {error}")
-        return None
+        print(f"[app.py] Error al obtener paciente por idUsuario: {error}")
+        return None, None
     finally:
-        if cursor:
-            cursor.close()
         if con and con.is_connected():
             con.close()
 
-def obtener_nombre_paciente_por_id(id_paciente: int):
+def refrescar_paciente_sesion():
     """
-    Obtiene el nombre del paciente desde su idPaciente.
-    Retorna el nombre o None si no se encuentra.
+    Resuelve el paciente asociado al usuario de la sesión y lo guarda en ella.
+    Retorna una tupla (idPaciente, nombreCompleto).
     """
-    if not id_paciente:
-        return None
-    
-    con = None
-    cursor = None
-    try:
-        con = con_pool.get_connection()
-        cursor = con.cursor(dictionary=True)
-        sql = """
-        SELECT nombreCompleto
-        FROM pacientes
-        WHERE idPaciente = %s
-        LIMIT 1
-        """
-        cursor.execute(sql, (id_paciente,))
-        resultado = cursor.fetchone()
-        return resultado['nombreCompleto'] if resultado else None
-    except mysql.connector.Error as error:
-        print(f"[app.py] Error al obtener nombre de paciente: {error}")
-        return None
-    finally:
-        if cursor:
-            cursor.close()
-        if con and con.is_connected():
-            con.close()
+    id_paciente, nombre_paciente = obtener_paciente_por_id_usuario(session.get("login-id"))
+    session["login-paciente-id"] = id_paciente
+    session["login-paciente"]    = nombre_paciente
+    return id_paciente, nombre_paciente
+
+def obtener_paciente_sesion():
+    """
+    Retorna el paciente asociado al usuario desde la sesión, como tupla
+    (idPaciente, nombreCompleto). Solo consulta la BD si la sesión aún no lo tiene.
+    """
+    if "login-paciente-id" not in session:
+        return refrescar_paciente_sesion()
+    return session.get("login-paciente-id"), session.get("login-paciente")
+
+def respuesta_json_streaming(registros, tamano_bloque: int = 65536):
+    """
+    Genera una respuesta JSON (arreglo) escrita de forma incremental a partir
+    de un iterable de registros, en bloques de aproximadamente `tamano_bloque` bytes.
+    """
+    def generar():
+        bloque = ["["]
+        longitud = 1
+        separador = ""
+        for registro in registros:
+            fragmento = separador + app.json.dumps(registro)
+            separador = ","
+            bloque.append(fragmento)
+            longitud += len(fragmento)
+            if longitud >= tamano_bloque:
+                yield "".join(bloque)
+                bloque = []
+                longitud = 0
+        bloque.append("]")
+        yield "".join(bloque)
+
+    return Response(stream_with_context(generar()), mimetype="application/json")
 
 @app.route("/")
 def dashboard():
@@ -262,6 +379,11 @@ def iniciarSesion():
         session["login-usr"]  = usuario["nombre"]
         session["login-tipo"] = usuario["tipo_usuario"]
         session["login-id"]   = usuario["idUsuario"]
+        # Resolver el paciente una sola vez; las siguientes peticiones lo leen de la sesión
+        refrescar_paciente_sesion()
+    else:
+        session.pop("login-paciente-id", None)
+        session.pop("login-paciente", None)
 
     return make_response(jsonify(registros))
 
@@ -272,8 +394,20 @@ def cerrarSesion():
     session["login-usr"]  = None
     session["login-tipo"] = 0
     session["login-id"]   = None
+    session.pop("login-paciente-id", None)
+    session.pop("login-paciente", None)
     return make_response(jsonify({}))
 
+@app.route("/sesion/refrescar", methods=["POST"])
+@login
+def refrescarSesion():
+    """Vuelve a resolver el paciente asociado al usuario (p. ej. tras vincularlo)."""
+    id_paciente, nombre_paciente = refrescar_paciente_sesion()
+    return make_response(jsonify({
+        "idPaciente": id_paciente,
+        "paciente": nombre_paciente
+    }))
+
 @app.route("/preferencias")
 @login
 def preferencias():
@@ -287,20 +421,35 @@ def preferencias():
 
 @app.route("/log", methods=["GET"])
 def logProductos():
+    """
+    Registra una actividad (si se envía) y retorna las últimas entradas
+    (parámetro n, por defecto 100) o las posteriores al desplazamiento
+    indicado en 'desde'. El encabezado X-Log-Offset indica el desplazamiento
+    desde el cual continuar la lectura.
+    """
     args         = request.args
-    actividad    = args["actividad"]
-    descripcion  = args["descripcion"]
-    tz           = pytz.timezone("America/Matamoros")
-    ahora        = datetime.datetime.now(tz)
-    fechaHoraStr = ahora.strftime("%Y-%m-%d %H:%M:%S")
+    actividad    = args.get("actividad")
+    descripcion  = args.get("descripcion", "")
 
-    with open("log-busquedas.txt", "a") as f:
-        f.write(f"{actividad}\t{descripcion}\t{fechaHoraStr}\n")
+    if actividad:
+        tz           = pytz.timezone("America/Matamoros")
+        ahora        = datetime.datetime.now(tz)
+        fechaHoraStr = ahora.strftime("%Y-%m-%d %H:%M:%S")
+        registro_actividad.agregar(actividad, descripcion, fechaHoraStr)
 
-    with open("log-busquedas.txt") as f:
-        log = f.read()
+    try:
+        if args.get("desde") is not None:
+            limite = min(max(int(args.get("n", 1000)), 1), 1000)
+            entradas, desplazamiento = registro_actividad.desde(int(args["desde"]), limite)
+        else:
+            n = min(max(int(args.get("n", 100)), 1), 1000)
+            entradas, desplazamiento = registro_actividad.ultimas(n)
+    except ValueError:
+        return make_response(jsonify({"error": "Parámetros inválidos"}), 400)
 
-    return log
+    respuesta = make_response("".join(entradas))
+    respuesta.headers["X-Log-Offset"] = str(desplazamiento)
+    return respuesta
 
 @app.route("/productos")
 def productos():
@@ -318,7 +467,7 @@ def buscarProductos():
     busqueda = f"%{busqueda}%"
 
     try:
-        con    = con_pool.get_connection()
+        con    = conexiones.get_connection()
         cursor = con.cursor(dictionary=True)
         sql    = """
         SELECT Id_Producto,
@@ -355,7 +504,7 @@ def productosCategorias():
     categoria = args["categoria"]
     
     try:
-        con    = con_pool.get_connection()
+        con    = conexiones.get_connection()
         cursor = con.cursor(dictionary=True)
         sql    = """
         SELECT Nombre_Producto
@@ -383,7 +532,7 @@ def productosCategorias():
 @app.route("/productos/ingredientes/<int:id>")
 @login
 def productosIngredientes(id):
-    con    = con_pool.get_connection()
+    con    = conexiones.get_connection()
     cursor = con.cursor(dictionary=True)
     sql    = """
     SELECT productos.Nombre_Producto, ingredientes.*, productos_ingredientes.Cantidad FROM productos_ingredientes
@@ -416,7 +565,7 @@ def guardarProducto():
 
     # fechahora   = datetime.datetime.now(pytz.timezone("America/Matamoros"))
 
-    con    = con_pool.get_connection()
+    con    = conexiones.get_connection()
     cursor = con.cursor()
 
     if id:
@@ -449,7 +598,7 @@ def guardarProducto():
 @app.route("/producto/<int:id>")
 @login
 def editarProducto(id):
-    con    = con_pool.get_connection()
+    con    = conexiones.get_connection()
     cursor = con.cursor(dictionary=True)
     sql    = """
     SELECT Id_Producto, Nombre_Producto, Precio, Existencias
@@ -471,7 +620,7 @@ def editarProducto(id):
 def eliminarProducto():
     id = request.form["id"]
 
-    con    = con_pool.get_connection()
+    con    = conexiones.get_connection()
     cursor = con.cursor(dictionary=True)
     sql    = """
     DELETE FROM productos
@@ -495,10 +644,19 @@ def eliminarProducto():
 def buscarBitacora():
     args = request.args
     mes = args.get("mes", "").strip()
+    anio = args.get("anio", "").strip()
     paciente_param = args.get("paciente", "").strip()
+    limite = args.get("limite", "").strip()
+    despues = args.get("despues", "").strip() or None
+    busqueda = args.get("busqueda", "").strip() or None
 
-    # Convertir mes a entero
+    # Convertir mes y año a entero (si no se indica año se usa el actual)
     mes_int = int(mes) if mes and mes.isdigit() else None
+    if anio and anio.isdigit():
+        anio_int = int(anio)
+    else:
+        anio_int = datetime.datetime.now(pytz.timezone("America/Matamoros")).year
+    limite_int = int(limite) if limite and limite.isdigit() else None
 
     # Definir contexto de usuario para aplicar reglas por rol
     tipo_usuario, id_usuario, es_admin, paciente_sesion = obtener_contexto_usuario()
@@ -510,21 +668,263 @@ def buscarBitacora():
             id_paciente_filtro = obtener_id_paciente_por_nombre(paciente_param)
         filtro_usuario = None
     else:
-        # Si no es admin, obtener el idPaciente desde la relación con el usuario
-        id_paciente_filtro = obtener_id_paciente_por_id_usuario(id_usuario)
+        # Si no es admin, el idPaciente viene de la sesión (resuelto al iniciar sesión)
+        id_paciente_filtro, _ = obtener_paciente_sesion()
         filtro_usuario = id_usuario
 
+    # Modo streaming: cursor del lado del servidor y JSON escrito por bloques
+    if args.get("stream") == "1":
+        registros = bitacora_facade.iterar_por_mes(
+            mes_int,
+            año=anio_int,
+            id_usuario=filtro_usuario,
+            id_paciente=id_paciente_filtro,
+            aplicar_decoradores=True,
+            despues=despues,
+            busqueda=busqueda
+        )
+        try:
+            # Iniciar la consulta antes de enviar cabeceras para reportar errores
+            primero = next(registros, None)
+        except ValueError:
+            return make_response(jsonify({"error": "Cursor de paginación inválido"}), 400)
+        except mysql.connector.Error as error:
+            print(f"Error al buscar bitácora: {error}")
+            return make_response(jsonify({"error": "Error al buscar en la bitácora"}), 500)
+        if primero is None:
+            return make_response(jsonify([]))
+        return respuesta_json_streaming(itertools.chain([primero], registros))
+
     # Usar el Facade para buscar (simplifica todo el proceso)
-    resultado = bitacora_facade.buscar_por_mes(
-        mes_int,
-        id_usuario=filtro_usuario,
-        id_paciente=id_paciente_filtro,
-        aplicar_decoradores=True
-    )
+    try:
+        resultado = bitacora_facade.buscar_por_mes(
+            mes_int,
+            año=anio_int,
+            id_usuario=filtro_usuario,
+            id_paciente=id_paciente_filtro,
+            aplicar_decoradores=True,
+            limite=limite_int,
+            despues=despues,
+            busqueda=busqueda
+        )
+    except ValueError:
+        return make_response(jsonify({"error": "Cursor de paginación inválido"}), 400)
+    if resultado.get('metadata', {}).get('error'):
+        return make_response(jsonify({"error": "Error al buscar en la bitácora"}), 500)
 
     # Retornar solo los registros para mantener compatibilidad con el frontend
-    # El frontend puede acceder a resultado['registros'] o usar resultado completo
-    return make_response(jsonify(resultado.get('registros', [])))
+    # El cursor de la página siguiente viaja en la cabecera X-Siguiente-Cursor
+    respuesta = make_response(jsonify(resultado.get('registros', [])))
+    if resultado.get('siguiente_cursor'):
+        respuesta.headers["X-Siguiente-Cursor"] = resultado['siguiente_cursor']
+    return respuesta
+
+@app.route("/bitacora/cache", methods=["GET"])
+@admin_required
+def estadisticasCacheBitacora():
+    """Retorna los contadores de la caché de búsquedas por mes (solo administradores)."""
+    return make_response(jsonify(cache_mes.estadisticas()))
+
+@app.route("/sistema/pool", methods=["GET"])
+@admin_required
+def estadisticasPool():
+    """Retorna el uso del pool de conexiones y los tiempos de espera (solo administradores)."""
+    return make_response(jsonify(con_pool.estadisticas()))
+
+@app.route("/sistema/consultas-lentas", methods=["GET"])
+@admin_required
+def consultasLentas():
+    """
+    Retorna las consultas lentas agrupadas por huella, de mayor a menor costo
+    (orden: total, maximo o ejecuciones), con su último plan EXPLAIN (solo administradores).
+    """
+    orden = request.args.get("orden", "total")
+    if orden not in RegistroConsultasLentas.ORDENES:
+        return make_response(jsonify({"error": "Orden no soportado (total, maximo o ejecuciones)"}), 400)
+    n = request.args.get("n", "20")
+    n = min(int(n), 200) if n.isdigit() else 20
+    return make_response(jsonify({
+        "umbral_ms": consultas_lentas.umbral * 1000,
+        "consultas": consultas_lentas.top(n, orden)
+    }))
+
+@app.route("/metrics", methods=["GET"])
+def metricas():
+    """
+    Exporta las métricas en el formato de texto de Prometheus. Si se define
+    METRICS_TOKEN, se exige la cabecera Authorization: Bearer <token>.
+    """
+    token = os.environ.get("METRICS_TOKEN")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return make_response(jsonify({"error": "No autorizado"}), 401)
+    return Response(REGISTRO.exportar(), content_type=TIPO_CONTENIDO)
+
+@app.route("/bitacora/eventos", methods=["GET"])
+@admin_required
+def estadisticasEventosBitacora():
+    """Retorna la profundidad de la cola y los contadores del despachador de eventos (solo administradores)."""
+    return make_response(jsonify(despachador_eventos.metricas()))
+
+@app.route("/bitacora/importar", methods=["POST"])
+@admin_required
+def importarBitacora():
+    """Importa registros de bitácora desde un archivo CSV o NDJSON (solo administradores)."""
+    archivo = request.files.get("archivo")
+    if not archivo:
+        return make_response(jsonify({"error": "Archivo no proporcionado"}), 400)
+
+    formato = request.form.get("formato", "").strip().lower() or BitacoraImportador.detectar_formato(archivo.filename)
+    if formato not in BitacoraImportador.FORMATOS:
+        return make_response(jsonify({"error": "Formato no soportado (csv o ndjson)"}), 400)
+
+    tipo_usuario, id_usuario, es_admin, paciente_sesion = obtener_contexto_usuario()
+    texto = io.TextIOWrapper(archivo.stream, encoding="utf-8-sig", newline="")
+    reporte = bitacora_importador.importar(texto, formato, tipo_usuario=tipo_usuario)
+    return make_response(jsonify(reporte))
+
+@app.cli.command("importar-bitacora")
+@click.argument("ruta", type=click.Path(exists=True, dir_okay=False))
+@click.option("--formato", type=click.Choice(BitacoraImportador.FORMATOS), default=None,
+              help="Formato del archivo (por defecto según la extensión).")
+@click.option("--lote", "tamano_lote", type=int, default=1000, show_default=True,
+              help="Registros insertados por transacción.")
+def importarBitacoraCli(ruta, formato, tamano_lote):
+    """Importa registros de bitácora desde un archivo CSV o NDJSON."""
+    importador = BitacoraImportador(bitacora_facade, tamano_lote=tamano_lote)
+    formato = formato or BitacoraImportador.detectar_formato(ruta)
+    with open(ruta, encoding="utf-8-sig", newline="") as archivo:
+        reporte = importador.importar(archivo, formato)
+
+    click.echo(f"Filas leídas: {reporte['total']}, insertadas: {reporte['insertados']}, "
+               f"lotes: {reporte['lotes']}, con error: {len(reporte['errores'])}")
+    for error in reporte["errores"]:
+        click.echo(f"  Fila {error['fila']}: {error['error']}")
+
+@app.route("/bitacora/export", methods=["GET"])
+@login
+def exportarBitacora():
+    """
+    Exporta la bitácora en CSV o NDJSON por streaming, con el mismo alcance
+    por rol que /bitacora/buscar. Parámetros: formato, columnas (separadas
+    por comas), desde y hasta (YYYY-MM-DD, inclusive), paciente (solo
+    administradores) y gzip=1 para comprimir.
+    """
+    args = request.args
+    formato = args.get("formato", "csv").strip().lower()
+    comprimir = args.get("gzip") == "1"
+    paciente_param = args.get("paciente", "").strip()
+    columnas = [c for c in args.get("columnas", "").split(",") if c.strip()]
+
+    try:
+        desde = datetime.datetime.strptime(args["desde"], "%Y-%m-%d").date() if args.get("desde") else None
+        hasta = datetime.datetime.strptime(args["hasta"], "%Y-%m-%d").date() if args.get("hasta") else None
+    except ValueError:
+        return make_response(jsonify({"error": "Fecha inválida (use YYYY-MM-DD)"}), 400)
+    if desde and hasta and desde > hasta:
+        return make_response(jsonify({"error": "'desde' debe ser anterior o igual a 'hasta'"}), 400)
+
+    tipo_usuario, id_usuario, es_admin, paciente_sesion = obtener_contexto_usuario()
+    id_paciente_filtro = None
+    if es_admin:
+        if paciente_param:
+            id_paciente_filtro = int(paciente_param) if paciente_param.isdigit() else obtener_id_paciente_por_nombre(paciente_param)
+            if not id_paciente_filtro:
+                return make_response(jsonify({"error": "Paciente no encontrado en la base de datos"}), 400)
+        filtro_usuario = None
+    else:
+        id_paciente_filtro, _ = obtener_paciente_sesion()
+        filtro_usuario = id_usuario
+
+    try:
+        bloques = bitacora_exportador.exportar(formato, columnas, comprimir,
+                                               id_usuario=filtro_usuario, id_paciente=id_paciente_filtro,
+                                               desde=desde, hasta=hasta)
+        # Ejecutar la consulta antes de enviar cabeceras para reportar errores
+        primero = next(bloques)
+    except ValueError as error:
+        return make_response(jsonify({"error": str(error)}), 400)
+    except mysql.connector.Error as error:
+        print(f"Error al exportar bitácora: {error}")
+        return make_response(jsonify({"error": "Error al exportar la bitácora"}), 500)
+
+    nombre = f"bitacora.{formato}" + (".gz" if comprimir else "")
+    respuesta = Response(stream_with_context(itertools.chain([primero], bloques)),
+                         mimetype="application/gzip" if comprimir else BitacoraExportador.TIPOS_CONTENIDO[formato])
+    respuesta.headers["Content-Disposition"] = f"attachment; filename={nombre}"
+    return respuesta
+
+@app.route("/bitacora/resumen", methods=["GET"])
+@login
+def resumenBitacora():
+    """
+    Retorna el resumen preagregado de un paciente: totales del mes y detalle
+    por día (con 'mes') o totales por mes del año (sin 'mes').
+    """
+    args = request.args
+    mes = args.get("mes", "").strip()
+    anio = args.get("anio", "").strip()
+    paciente_param = args.get("paciente", "").strip()
+
+    mes_int = int(mes) if mes.isdigit() and 1 <= int(mes) <= 12 else None
+    if anio.isdigit():
+        anio_int = int(anio)
+    else:
+        anio_int = datetime.datetime.now(pytz.timezone("America/Matamoros")).year
+
+    tipo_usuario, id_usuario, es_admin, paciente_sesion = obtener_contexto_usuario()
+    if es_admin:
+        id_paciente = int(paciente_param) if paciente_param.isdigit() else obtener_id_paciente_por_nombre(paciente_param)
+    else:
+        id_paciente, _ = obtener_paciente_sesion()
+    if not id_paciente:
+        return make_response(jsonify({"error": "Paciente no encontrado en la base de datos"}), 400)
+
+    resultado = resumen_service.resumen(id_paciente, anio_int, mes_int)
+    if not resultado.get("success"):
+        return make_response(jsonify({"error": resultado.get("error")}), 500)
+    resultado["paciente"] = paciente_resolver.obtener_nombre(id_paciente)
+    return make_response(jsonify(resultado))
+
+@app.route("/bitacora/tendencias", methods=["GET"])
+@login
+def tendenciasBitacora():
+    """
+    Retorna las tendencias del paciente (medias móviles, pendientes y
+    alertas de desviación) para las ventanas indicadas, p. ej. ventanas=7,30.
+    """
+    args = request.args
+    paciente_param = args.get("paciente", "").strip()
+
+    try:
+        ventanas = [int(v) for v in args.get("ventanas", "7,30").split(",") if v.strip()]
+        umbral = float(args.get("umbral", "2"))
+    except ValueError:
+        return make_response(jsonify({"error": "Parámetros inválidos"}), 400)
+    if not ventanas or len(ventanas) > 5 or any(v < 2 or v > 365 for v in ventanas) or umbral <= 0:
+        return make_response(jsonify({"error": "Se admiten de 1 a 5 ventanas entre 2 y 365 registros"}), 400)
+
+    tipo_usuario, id_usuario, es_admin, paciente_sesion = obtener_contexto_usuario()
+    if es_admin:
+        id_paciente = int(paciente_param) if paciente_param.isdigit() else obtener_id_paciente_por_nombre(paciente_param)
+    else:
+        id_paciente, _ = obtener_paciente_sesion()
+    if not id_paciente:
+        return make_response(jsonify({"error": "Paciente no encontrado en la base de datos"}), 400)
+
+    resultado = tendencias_service.tendencias(id_paciente, ventanas, umbral)
+    if not resultado.get("success"):
+        return make_response(jsonify({"error": resultado.get("error")}), 500)
+    return make_response(jsonify(resultado))
+
+@app.cli.command("reconstruir-resumen")
+@click.option("--paciente", "id_paciente", type=int, default=None,
+              help="ID del paciente a reconstruir (por defecto, todos).")
+def reconstruirResumenCli(id_paciente):
+    """Reconstruye los resúmenes diarios de la bitácora desde los registros."""
+    dias = resumen_service.reconstruir(id_paciente)
+    if dias < 0:
+        raise click.ClickException("Error al reconstruir los resúmenes")
+    click.echo(f"Días resumidos: {dias}")
 
 @app.route("/bitacora/<int:id>", methods=["GET"])
 @login
@@ -534,8 +934,8 @@ def obtenerBitacora(id):
     filtro_usuario = None if es_admin else id_usuario
     id_paciente_filtro = None
     if not es_admin:
-        # Si no es admin, obtener el idPaciente desde la relación con el usuario
-        id_paciente_filtro = obtener_id_paciente_por_id_usuario(id_usuario)
+        # Si no es admin, el idPaciente viene de la sesión (resuelto al iniciar sesión)
+        id_paciente_filtro, _ = obtener_paciente_sesion()
     resultado = bitacora_facade.obtener_registro(
         id,
         id_usuario=filtro_usuario,
@@ -550,29 +950,12 @@ def obtenerBitacora(id):
 @app.route("/bitacora", methods=["POST"])
 @login
 def guardarBitacora():
-    # Recopilar datos del formulario
-    id_bitacora = request.form.get("id", "").strip()
-    
     # Obtener contexto de usuario
     tipo_usuario, id_usuario, es_admin, paciente_sesion = obtener_contexto_usuario()
     
-    nombre_paciente = request.form.get("paciente", "").strip()
-    id_paciente = None
-    
-    if not es_admin:
-        # Si no es admin, obtener el idPaciente desde la relación con el usuario
-        id_paciente = obtener_id_paciente_por_id_usuario(id_usuario)
-        if id_paciente:
-            # Obtener el nombre completo del paciente para mantener consistencia
-            nombre_paciente = obtener_nombre_paciente_por_id(id_paciente) or nombre_paciente
-        else:
-            # Si no hay paciente asociado al usuario, intentar buscar por nombre
-            if nombre_paciente:
-                id_paciente = obtener_id_paciente_por_nombre(nombre_paciente)
-    else:
-        # Si es admin, buscar por el nombre proporcionado
-        if nombre_paciente:
-            id_paciente = obtener_id_paciente_por_nombre(nombre_paciente)
+    id_paciente, nombre_paciente, id_paciente_sesion = resolver_paciente_peticion(
+        request.form.get("paciente", "").strip(), es_admin
+    )
     
     if not id_paciente:
         return make_response(jsonify({"error": "Paciente no encontrado en la base de datos. Verifique que el nombre del paciente sea correcto."}), 400)
@@ -580,32 +963,9 @@ def guardarBitacora():
     if not nombre_paciente:
         return make_response(jsonify({"error": "El campo paciente es obligatorio"}), 400)
     
-    datos = {
-        "fecha": request.form.get("fecha", "").strip(),
-        "horaInicio": request.form.get("horaInicio", "").strip() or None,
-        "horaFin": request.form.get("horaFin", "").strip() or None,
-        "drenajeInicial": None,
-        "ufTotal": None,
-        "tiempoMedioPerm": None,
-        "liquidoIngerido": None,
-        "cantidadOrina": None,
-        "glucosa": None,
-        "presionArterial": request.form.get("presionArterial", "").strip() or None,
-        "paciente": nombre_paciente,  # Mantener para compatibilidad
-        "idPaciente": id_paciente     # Agregar idPaciente para la BD
-    }
-
-    # Agregar ID si existe (para actualización)
-    if id_bitacora and id_bitacora.isdigit():
-        datos["id"] = int(id_bitacora)
-
-    # Convertir valores vacíos a None para campos numéricos
-    campos_numericos = ['drenajeInicial', 'ufTotal', 'tiempoMedioPerm', 
-                       'liquidoIngerido', 'cantidadOrina', 'glucosa']
-    
-    for campo in campos_numericos:
-        valor = request.form.get(campo, "").strip()
-        datos[campo] = float(valor) if valor else None
+    datos = leer_datos_bitacora(request.form)
+    datos["paciente"] = nombre_paciente  # Mantener para compatibilidad
+    datos["idPaciente"] = id_paciente    # Agregar idPaciente para la BD
 
     # Usar el Facade para guardar (simplifica todo el proceso)
     # Pasar tipo_usuario para que los observadores puedan filtrar
@@ -615,7 +975,7 @@ def guardarBitacora():
         tipo_usuario=tipo_usuario,
         id_usuario=id_usuario,
         es_admin=es_admin,
-        paciente_contexto=None if es_admin else paciente_sesion
+        id_paciente_contexto=id_paciente_sesion
     )
 
     if resultado.get('success'):
@@ -623,6 +983,76 @@ def guardarBitacora():
     else:
         return make_response(jsonify({"error": resultado.get('error', 'Error desconocido')}), 400)
 
+@app.route("/bitacora/lote", methods=["POST"])
+@login
+def guardarBitacoraLote():
+    """
+    Crea, actualiza y elimina varios registros en una sola transacción.
+    Recibe JSON: {"operaciones": [{"accion": "guardar", "datos": {...}},
+                                  {"accion": "eliminar", "id": 123}, ...]}
+    """
+    cuerpo = request.get_json(silent=True) or {}
+    operaciones = cuerpo.get("operaciones")
+    if not isinstance(operaciones, list) or not operaciones:
+        return make_response(jsonify({"error": "No se proporcionaron operaciones"}), 400)
+
+    tipo_usuario, id_usuario, es_admin, paciente_sesion = obtener_contexto_usuario()
+    id_paciente_sesion = None if es_admin else obtener_paciente_sesion()[0]
+
+    lote = []
+    errores = []
+    for indice, operacion in enumerate(operaciones):
+        if not isinstance(operacion, dict):
+            errores.append({"indice": indice, "error": "Operación inválida"})
+            continue
+        if operacion.get("accion") != "guardar":
+            lote.append(operacion)
+            continue
+
+        fuente = operacion.get("datos") or {}
+        try:
+            datos = leer_datos_bitacora(fuente)
+            id_paciente = int(fuente["idPaciente"]) if es_admin and fuente.get("idPaciente") else None
+        except ValueError:
+            errores.append({"indice": indice, "error": "Valor numérico inválido"})
+            continue
+        if id_paciente:
+            nombre_paciente = fuente.get("paciente") or paciente_resolver.obtener_nombre(id_paciente)
+        else:
+            id_paciente, nombre_paciente, _ = resolver_paciente_peticion(
+                str(fuente.get("paciente") or "").strip(), es_admin
+            )
+        if not id_paciente or not nombre_paciente:
+            errores.append({"indice": indice, "error": "Paciente no encontrado en la base de datos"})
+            continue
+        datos["paciente"] = nombre_paciente
+        datos["idPaciente"] = id_paciente
+        lote.append({"accion": "guardar", "datos": datos})
+
+    if errores:
+        return make_response(jsonify({"error": "Operaciones inválidas", "errores": errores}), 400)
+
+    resultado = bitacora_facade.guardar_registros(
+        lote,
+        tipo_usuario=tipo_usuario,
+        id_usuario=id_usuario,
+        es_admin=es_admin,
+        id_paciente_contexto=id_paciente_sesion
+    )
+
+    if resultado.get("success"):
+        return make_response(jsonify({
+            "success": True,
+            "resultados": resultado.get("resultados"),
+            "creados": resultado.get("creados"),
+            "actualizados": resultado.get("actualizados"),
+            "eliminados": resultado.get("eliminados")
+        }))
+    respuesta = {"error": resultado.get("error", "Error al guardar los registros")}
+    if resultado.get("errores"):
+        respuesta["errores"] = resultado["errores"]
+    return make_response(jsonify(respuesta), 400)
+
 @app.route("/bitacora/eliminar", methods=["POST"])
 @login
 def eliminarRegistro():
@@ -642,12 +1072,13 @@ def eliminarRegistro():
     # Usar el Facade para eliminar (simplifica todo el proceso)
     # Pasar tipo_usuario para que los observadores puedan filtrar
     # Pasar id_usuario para verificar permisos
+    id_paciente_sesion = None if es_admin else obtener_paciente_sesion()[0]
     resultado = bitacora_facade.eliminar_registro(
         id_int,
         tipo_usuario=tipo_usuario,
         id_usuario=id_usuario,
         es_admin=es_admin,
-        paciente_contexto=None if es_admin else paciente_sesion
+        id_paciente_contexto=id_paciente_sesion
     )
 
     if resultado.get('success'):
@@ -655,6 +1086,15 @@ def eliminarRegistro():
     else:
         return make_response(jsonify({"error": resultado.get('error', 'Error al eliminar')}), 400)
 
+@app.route("/pacientes/recargar", methods=["POST"])
+@admin_required
+def recargarPacientes():
+    """Recarga el índice en memoria de pacientes tras cambios en la tabla (solo administradores)."""
+    total = paciente_resolver.cargar()
+    if total < 0:
+        return make_response(jsonify({"error": "Error al recargar pacientes"}), 500)
+    return make_response(jsonify({"success": True, "total": total}))
+
 # ============================================================================
 # RUTAS PARA GESTIÓN DE USUARIOS Y ADMINISTRADORES
 # ============================================================================
@@ -0,0 +1,84 @@
+"""
+Compara dos archivos de resultados de benchmarks.ejecutar.
+
+Muestra, por escenario, la variación de p50/p95/p99, consultas y memoria,
+y termina con código 1 si algún escenario empeora más que el umbral en p50
+o p95, o si hace más consultas. Uso (desde la raíz):
+
+    python -m benchmarks.comparar resultados/base.json resultados/nuevo.json --umbral 10
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+METRICAS_TIEMPO = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def cargar(ruta: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Carga un archivo de resultados indexado por (grupo, nombre)."""
+    with open(ruta, encoding="utf-8") as f:
+        reporte = json.load(f)
+    return {(r['grupo'], r['nombre']): r for r in reporte.get('resultados', [])}
+
+
+def variacion(base: float, nuevo: float) -> Optional[float]:
+    """Variación porcentual (None si la base es cero)."""
+    if not base:
+        return None
+    return (nuevo - base) / base * 100
+
+
+def formatear(valor: Optional[float]) -> str:
+    return "     n/a" if valor is None else f"{valor:+7.1f}%"
+
+
+def comparar(base: Dict, nuevo: Dict, umbral: float) -> Tuple[List[str], List[str]]:
+    """
+    Compara los escenarios presentes en ambos archivos.
+
+    Returns:
+        Tupla (líneas de la tabla, regresiones encontradas)
+    """
+    lineas = [f"{'escenario':58} {'p50':>8} {'p95':>8} {'p99':>8} {'consultas':>13} {'pico mem':>8}"]
+    regresiones = []
+    for clave in sorted(set(base) & set(nuevo)):
+        b, n = base[clave], nuevo[clave]
+        cambios = {m: variacion(b[m], n[m]) for m in METRICAS_TIEMPO}
+        memoria = variacion(b['memoria']['pico_bytes_p50'], n['memoria']['pico_bytes_p50'])
+        consultas = f"{b['consultas_por_op']:g} -> {n['consultas_por_op']:g}"
+        nombre = f"{clave[0]}/{clave[1]}"
+        lineas.append(f"{nombre:58} {formatear(cambios['p50_ms'])} {formatear(cambios['p95_ms'])} "
+                      f"{formatear(cambios['p99_ms'])} {consultas:>13} {formatear(memoria)}")
+        for metrica in ('p50_ms', 'p95_ms'):
+            if cambios[metrica] is not None and cambios[metrica] > umbral:
+                regresiones.append(f"{nombre}: {metrica} {b[metrica]} -> {n[metrica]} ({cambios[metrica]:+.1f}%)")
+        if n['consultas_por_op'] > b['consultas_por_op']:
+            regresiones.append(f"{nombre}: consultas {b['consultas_por_op']} -> {n['consultas_por_op']}")
+
+    for clave in sorted(set(base) - set(nuevo)):
+        lineas.append(f"{clave[0]}/{clave[1]:50} (solo en la base)")
+    for clave in sorted(set(nuevo) - set(base)):
+        lineas.append(f"{clave[0]}/{clave[1]:50} (nuevo)")
+    return lineas, regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dos resultados de benchmarks.")
+    parser.add_argument("base", help="Resultados de referencia")
+    parser.add_argument("nuevo", help="Resultados a comparar")
+    parser.add_argument("--umbral", type=float, default=10.0,
+                        help="Porcentaje de empeoramiento de p50/p95 tolerado")
+    args = parser.parse_args()
+
+    lineas, regresiones = comparar(cargar(args.base), cargar(args.nuevo), args.umbral)
+    print("\n".join(lineas))
+    if regresiones:
+        print("\nRegresiones:")
+        print("\n".join(f"  {r}" for r in regresiones))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Ejecuta los benchmarks de la bitácora y guarda los resultados en JSON.
+
+Los escenarios de decoradores y de JSON no necesitan base de datos; los del Facade
+y de las rutas usan la base de datos de benchmarks (ver benchmarks/entorno.py),
+generada antes con benchmarks.generar_datos. Uso (desde la raíz):
+
+    python -m benchmarks.ejecutar --salida resultados/base.json
+    python -m benchmarks.ejecutar --grupos decoradores --iteraciones 500
+    python -m benchmarks.ejecutar --grupos json --registros 1000
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import mysql.connector
+
+from benchmarks.entorno import RAIZ, conectar, configurar_aplicacion, configuracion
+from benchmarks.escenarios import (
+    escenarios_decoradores,
+    escenarios_facade,
+    escenarios_json,
+    escenarios_rutas,
+    muestra_datos
+)
+from benchmarks.medicion import Escenario, medir
+
+GRUPOS = ('decoradores', 'json', 'facade', 'rutas')
+VERSION_FORMATO = 1
+
+
+def commit_actual() -> Optional[str]:
+    """Commit de git del árbol medido (None si no está disponible)."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(grupos: List[str], iteraciones: int, calentamiento: int, registros: int) -> Dict[str, Any]:
+    """Construye y mide los escenarios de los grupos indicados."""
+    escenarios: List[Escenario] = []
+    muestra = None
+    if 'decoradores' in grupos:
+        escenarios += escenarios_decoradores(registros)
+    if 'json' in grupos:
+        escenarios += escenarios_json(registros)
+    if 'facade' in grupos or 'rutas' in grupos:
+        configurar_aplicacion()
+        con = conectar()
+        try:
+            muestra = muestra_datos(con)
+        finally:
+            con.close()
+        # Importar la aplicación después de configurar el entorno (crea el pool al importarse)
+        import app as aplicacion
+        if 'facade' in grupos:
+            escenarios += escenarios_facade(aplicacion, muestra)
+        if 'rutas' in grupos:
+            escenarios += escenarios_rutas(aplicacion, muestra)
+
+    resultados = []
+    for escenario in escenarios:
+        print(f"{escenario.grupo:12} {escenario.nombre:45}", end="", flush=True)
+        resultado = medir(escenario, iteraciones=iteraciones, calentamiento=calentamiento)
+        resultados.append(resultado)
+        print(f"p50 {resultado['p50_ms']:9.3f} ms  p95 {resultado['p95_ms']:9.3f} ms  "
+              f"p99 {resultado['p99_ms']:9.3f} ms  consultas {resultado['consultas_por_op']:5.1f}")
+
+    return {
+        'version': VERSION_FORMATO,
+        'fecha': datetime.now().isoformat(timespec="seconds"),
+        'commit': commit_actual(),
+        'entorno': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'mysql_connector': mysql.connector.__version__,
+            'base_datos': configuracion()['database'] if muestra else None,
+            'filas_bitacora': muestra['filas_bitacora'] if muestra else None
+        },
+        'parametros': {'iteraciones': iteraciones, 'calentamiento': calentamiento, 'registros': registros},
+        'resultados': resultados
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la bitácora.")
+    parser.add_argument("--grupos", default=",".join(GRUPOS),
+                        help=f"Grupos a ejecutar, separados por comas ({', '.join(GRUPOS)})")
+    parser.add_argument("--iteraciones", type=int, default=200)
+    parser.add_argument("--calentamiento", type=int, default=20)
+    parser.add_argument("--registros", type=int, default=500,
+                        help="Registros procesados por la cadena de decoradores y serializados a JSON")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto, salida estándar)")
+    args = parser.parse_args()
+
+    grupos = [g.strip() for g in args.grupos.split(",") if g.strip()]
+    desconocidos = [g for g in grupos if g not in GRUPOS]
+    if desconocidos:
+        parser.error(f"Grupos desconocidos: {', '.join(desconocidos)}")
+
+    reporte = ejecutar(grupos, args.iteraciones, args.calentamiento, args.registros)
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if args.salida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+        print(f"Resultados guardados en {args.salida}")
+    else:
+        sys.stdout.write(texto + "\n")
+
+
+if __name__ == "__main__":
+    main()
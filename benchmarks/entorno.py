@@ -0,0 +1,209 @@
+"""
+Entorno de los benchmarks: base de datos local y contador de consultas.
+
+Los benchmarks se ejecutan contra una instancia local de MariaDB (la misma
+sintaxis que producción: FOR UPDATE, MATCH ... AGAINST, UPDATE con JOIN),
+nunca contra la base de datos de la aplicación. La conexión se configura con
+BENCH_DB_HOST, BENCH_DB_PORT, BENCH_DB_NAME, BENCH_DB_USER y
+BENCH_DB_PASSWORD; el nombre de la base de datos debe terminar en "_bench"
+porque el generador borra y vuelve a crear las tablas. Por ejemplo:
+
+    docker run -d --name vidadial-bench -p 3307:3306 \\
+        -e MARIADB_ALLOW_EMPTY_ROOT_PASSWORD=1 -e MARIADB_DATABASE=vidadial_bench mariadb:11
+    export BENCH_DB_PORT=3307
+"""
+
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import mysql.connector
+from mysql.connector.connection import MySQLConnection
+
+RAIZ = Path(__file__).resolve().parent.parent
+ESQUEMA = RAIZ / "VidaDial.sql"
+SUFIJO_BD = "_bench"
+
+
+def configuracion() -> Dict[str, str]:
+    """Obtiene la configuración de la base de datos de benchmarks."""
+    return {
+        'host': os.environ.get("BENCH_DB_HOST", "127.0.0.1"),
+        'port': os.environ.get("BENCH_DB_PORT", "3306"),
+        'database': os.environ.get("BENCH_DB_NAME", "vidadial_bench"),
+        'user': os.environ.get("BENCH_DB_USER", "root"),
+        'password': os.environ.get("BENCH_DB_PASSWORD", "")
+    }
+
+
+def verificar_base_datos(nombre: str):
+    """
+    Evita ejecutar el generador o los benchmarks sobre una base de datos real.
+
+    Raises:
+        SystemExit: Si el nombre no termina en SUFIJO_BD
+    """
+    if not nombre.endswith(SUFIJO_BD):
+        raise SystemExit(f"La base de datos de benchmarks debe terminar en '{SUFIJO_BD}' (recibido: {nombre})")
+
+
+def configurar_aplicacion():
+    """
+    Apunta la aplicación a la base de datos de benchmarks y a un backend de
+    Pusher local. Debe llamarse antes de importar app.
+    """
+    config = configuracion()
+    verificar_base_datos(config['database'])
+    os.environ["DB_HOST"] = config['host']
+    os.environ["DB_PORT"] = config['port']
+    os.environ["DB_NAME"] = config['database']
+    os.environ["DB_USER"] = config['user']
+    os.environ["DB_PASSWORD"] = config['password']
+    os.environ["PUSHER_BACKEND"] = "local"
+
+
+def conectar() -> MySQLConnection:
+    """Abre una conexión directa (sin pool) a la base de datos de benchmarks."""
+    config = configuracion()
+    verificar_base_datos(config['database'])
+    return mysql.connector.connect(
+        host=config['host'],
+        port=int(config['port']),
+        database=config['database'],
+        user=config['user'],
+        password=config['password']
+    )
+
+
+class FuenteConexiones:
+    """Fuente de conexiones directas con la interfaz get_connection() de los servicios."""
+
+    def get_connection(self) -> MySQLConnection:
+        return conectar()
+
+
+def sentencias_esquema() -> List[str]:
+    """
+    Obtiene las sentencias DDL de VidaDial.sql (sin los datos de ejemplo),
+    para que el esquema de los benchmarks sea siempre el de la aplicación.
+    """
+    texto = ESQUEMA.read_text(encoding="utf-8")
+    texto = "\n".join(linea for linea in texto.splitlines() if not linea.startswith("--"))
+    sentencias = []
+    for sentencia in re.split(r";\s*\n", texto):
+        sentencia = sentencia.strip()
+        if sentencia and not sentencia.upper().startswith("INSERT"):
+            sentencias.append(sentencia)
+    return sentencias
+
+
+# Métodos de cada clase de conexión que envían un comando al servidor, con
+# el nombre con el que se cuentan. Con la conexión pura, COMMIT, ROLLBACK y
+# ping pasan por cmd_query/cmd_ping; la extensión en C los envía directamente.
+_COMANDOS_PUROS = {
+    'cmd_query': 'query',
+    'cmd_stmt_prepare': 'stmt_prepare',
+    'cmd_stmt_execute': 'stmt_execute',
+    'cmd_stmt_reset': 'stmt_reset',
+    'cmd_stmt_close': 'stmt_close',
+    'cmd_stmt_fetch': 'stmt_fetch',
+    'cmd_ping': 'ping',
+    'cmd_reset_connection': 'reset_connection',
+    'cmd_change_user': 'change_user',
+    'cmd_init_db': 'init_db'
+}
+_COMANDOS_CEXT = dict(_COMANDOS_PUROS, commit='query', rollback='query', ping='ping')
+del _COMANDOS_CEXT['cmd_ping']
+
+
+def _clases_conexion() -> List[Tuple[type, Dict[str, str]]]:
+    """Clases de conexión que puede devolver mysql.connector.connect()."""
+    clases = [(MySQLConnection, _COMANDOS_PUROS)]
+    try:
+        from mysql.connector.connection_cext import CMySQLConnection
+    except ImportError:
+        # Extensión en C no disponible: connect() devuelve siempre MySQLConnection
+        pass
+    else:
+        clases.append((CMySQLConnection, _COMANDOS_CEXT))
+    return clases
+
+
+class ContadorConsultas:
+    """
+    Cuenta los comandos enviados al servidor por todas las conexiones del
+    proceso (incluidos los hilos de los observadores) mientras está activo,
+    tanto con la conexión en Python puro como con la extensión en C:
+    consultas de texto (también COMMIT/ROLLBACK), preparación, reinicio,
+    ejecución y cierre de sentencias preparadas, ping y reinicio de sesión.
+    Cada uno es un viaje al servidor (salvo COM_STMT_CLOSE, que no tiene
+    respuesta pero igualmente se envía).
+    """
+
+    _lock = threading.Lock()
+    _activos: List['ContadorConsultas'] = []
+    _originales: List[Tuple[type, str, Any]] = []
+
+    def __init__(self):
+        self.comandos: Dict[str, int] = {}
+
+    @property
+    def total(self) -> int:
+        """Comandos enviados al servidor."""
+        return sum(self.comandos.values())
+
+    @property
+    def preparaciones(self) -> int:
+        """Sentencias preparadas (COM_STMT_PREPARE)."""
+        return self.comandos.get('stmt_prepare', 0)
+
+    def __enter__(self) -> 'ContadorConsultas':
+        with self._lock:
+            if not ContadorConsultas._activos:
+                self._instalar()
+            ContadorConsultas._activos.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            ContadorConsultas._activos.remove(self)
+            if not ContadorConsultas._activos:
+                self._desinstalar()
+        return False
+
+    @classmethod
+    def _registrar(cls, comando: str):
+        with cls._lock:
+            for contador in cls._activos:
+                contador.comandos[comando] = contador.comandos.get(comando, 0) + 1
+
+    @classmethod
+    def _instalar(cls):
+        """Envuelve los comandos del protocolo de las clases de conexión."""
+        def envolver(comando, original):
+            def metodo(self, *args, **kwargs):
+                cls._registrar(comando)
+                return original(self, *args, **kwargs)
+            return metodo
+
+        originales = []
+        for clase, comandos in _clases_conexion():
+            for metodo, comando in comandos.items():
+                # Solo los métodos propios: los heredados se restauran borrando el envoltorio
+                original = clase.__dict__.get(metodo)
+                if original is None and not hasattr(clase, metodo):
+                    continue
+                originales.append((clase, metodo, original))
+                setattr(clase, metodo, envolver(comando, getattr(clase, metodo)))
+        cls._originales = originales
+
+    @classmethod
+    def _desinstalar(cls):
+        for clase, metodo, original in reversed(cls._originales):
+            if original is None:
+                delattr(clase, metodo)
+            else:
+                setattr(clase, metodo, original)
+        cls._originales = []
@@ -0,0 +1,260 @@
+"""
+Escenarios de los benchmarks: cadena de decoradores y serialización JSON
+(sin base de datos), operaciones del Facade y rutas de Flask con el
+cliente de pruebas.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from bitacora_service import (
+    BitacoraCountDecorator,
+    BitacoraDateFormatDecorator,
+    BitacoraPipelineDecorator,
+    BitacoraRow,
+    BitacoraValidationDecorator
+)
+from benchmarks.medicion import Escenario
+from json_provider import VidaDialJSONProvider, orjson
+
+
+def registros_sinteticos(cantidad: int, semilla: int = 7) -> List[Dict[str, Any]]:
+    """Registros con la forma de los que devuelve la búsqueda (b.* y paciente)."""
+    rnd = random.Random(semilla)
+    hoy = date.today()
+    return [{
+        'idBitacora': i,
+        'idPaciente': 1,
+        'fecha': hoy - timedelta(days=i % 31),
+        'horaInicio': "07:15:00",
+        'horaFin': "12:05:00",
+        'drenajeInicial': Decimal(f"{rnd.uniform(1000, 1300):.2f}"),
+        'ufTotal': Decimal(f"{rnd.uniform(300, 500):.2f}"),
+        'tiempoMedioPerm': Decimal(f"{rnd.uniform(38, 48):.2f}"),
+        'liquidoIngerido': Decimal(rnd.randint(350, 900)),
+        'cantidadOrina': Decimal(rnd.randint(150, 450)),
+        'glucosa': Decimal(f"{rnd.gauss(115, 15):.2f}"),
+        'presionArterial': "120/80",
+        'paciente': "Paciente de prueba"
+    } for i in range(1, cantidad + 1)]
+
+
+def escenarios_decoradores(cantidad: int = 500) -> List[Escenario]:
+    """
+    La cadena de la aplicación (validación -> formateo -> conteo), clásica y
+    compilada, sobre diccionarios y sobre registros compactos (BitacoraRow).
+    """
+    cadena = BitacoraCountDecorator(BitacoraDateFormatDecorator(BitacoraValidationDecorator(None)))
+    pipeline = BitacoraPipelineDecorator.compilar(cadena)
+    base = registros_sinteticos(cantidad)
+    columnas = tuple(base[0])
+    tuplas = [tuple(registro.values()) for registro in base]
+    entrada: List[List[Dict[str, Any]]] = [[]]
+
+    def copiar(_):
+        # Las etapas del pipeline modifican los registros en sitio
+        entrada[0] = [registro.copy() for registro in base]
+
+    def filas(_):
+        # Como los entrega la búsqueda: construidos sobre las tuplas del cursor
+        entrada[0] = BitacoraRow.desde_filas(columnas, tuplas)
+
+    return [
+        Escenario(f"cadena clásica ({cantidad} registros)", "decoradores",
+                  lambda _: cadena.process(entrada[0]), preparar=copiar),
+        Escenario(f"pipeline compilado ({cantidad} registros)", "decoradores",
+                  lambda _: pipeline.process(entrada[0]), preparar=copiar),
+        Escenario(f"cadena clásica, BitacoraRow ({cantidad} registros)", "decoradores",
+                  lambda _: cadena.process(entrada[0]), preparar=filas),
+        Escenario(f"pipeline compilado, BitacoraRow ({cantidad} registros)", "decoradores",
+                  lambda _: pipeline.process(entrada[0]), preparar=filas)
+    ]
+
+
+class ProveedorFlask(DefaultJSONProvider):
+    """Proveedor de Flask por defecto (referencia): registros vía a_dict y ganchos por objeto."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, BitacoraRow):
+            return o.a_dict()
+        return DefaultJSONProvider.default(o)
+
+
+def escenarios_json(cantidad: int = 500) -> List[Escenario]:
+    """
+    Respuesta de /bitacora/buscar (registros decorados por la cadena de la
+    aplicación) serializada con el proveedor de Flask y con los backends
+    de VidaDialJSONProvider.
+    """
+    base = registros_sinteticos(cantidad)
+    for registro in base:
+        # Columnas de auditoría de b.* (timestamps)
+        registro['fechaCreacion'] = datetime.combine(registro['fecha'], datetime.min.time())
+        registro['fechaActualizacion'] = registro['fechaCreacion'] + timedelta(hours=5)
+    cadena = BitacoraPipelineDecorator.compilar(
+        BitacoraCountDecorator(BitacoraDateFormatDecorator(BitacoraValidationDecorator(None))))
+    registros = cadena.process(BitacoraRow.desde_filas(tuple(base[0]), [tuple(r.values()) for r in base]))['registros']
+
+    proveedores = [("Flask por defecto", lambda app: ProveedorFlask(app)),
+                   ("VidaDial json", lambda app: VidaDialJSONProvider(app, backend='json'))]
+    if orjson is not None:
+        proveedores.append(("VidaDial orjson", lambda app: VidaDialJSONProvider(app, backend='orjson')))
+
+    escenarios = []
+    for nombre, crear in proveedores:
+        app = Flask(__name__)
+        app.json = crear(app)
+        escenarios.append(Escenario(f"{nombre} ({cantidad} registros)", "json",
+                                    lambda _, app=app: app.json.response(registros)))
+    return escenarios
+
+
+def muestra_datos(con) -> Dict[str, Any]:
+    """
+    Elige de la base de datos de benchmarks el paciente con más registros,
+    su mes más reciente y algunos de sus registros.
+    """
+    cursor = con.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT p.idPaciente, p.nombreCompleto, p.idUsuario, COUNT(*) AS registros
+        FROM pacientes p INNER JOIN bitacora b ON b.idPaciente = p.idPaciente
+        GROUP BY p.idPaciente ORDER BY registros DESC LIMIT 1
+    """)
+    paciente = cursor.fetchone()
+    if not paciente:
+        raise SystemExit("La base de datos de benchmarks está vacía; ejecute benchmarks.generar_datos")
+    cursor.execute("SELECT MAX(fecha) AS fecha FROM bitacora WHERE idPaciente = %s", (paciente['idPaciente'],))
+    fecha = cursor.fetchone()['fecha']
+    cursor.execute("SELECT idBitacora FROM bitacora WHERE idPaciente = %s ORDER BY fecha DESC LIMIT 200",
+                   (paciente['idPaciente'],))
+    ids = [fila['idBitacora'] for fila in cursor.fetchall()]
+    cursor.execute("SELECT idUsuario FROM usuario WHERE tipo_usuario = '1' LIMIT 1")
+    admin = cursor.fetchone()
+    cursor.execute("SELECT COUNT(*) AS total FROM bitacora")
+    total = cursor.fetchone()['total']
+    cursor.close()
+    return {
+        'id_paciente': paciente['idPaciente'],
+        'paciente': paciente['nombreCompleto'],
+        'id_usuario': paciente['idUsuario'],
+        'id_admin': admin['idUsuario'] if admin else None,
+        'anio': fecha.year,
+        'mes': fecha.month,
+        'ids': ids,
+        'filas_bitacora': total
+    }
+
+
+def datos_registro(muestra: Dict[str, Any], indice: int) -> Dict[str, Any]:
+    """Datos de un registro nuevo (o de una modificación) del paciente de la muestra."""
+    return {
+        'fecha': date(muestra['anio'], muestra['mes'], 1 + indice % 28).isoformat(),
+        'horaInicio': "07:00:00",
+        'horaFin': "12:00:00",
+        'drenajeInicial': 1100 + indice % 100,
+        'ufTotal': 400 + indice % 50,
+        'tiempoMedioPerm': 42,
+        'liquidoIngerido': 500,
+        'cantidadOrina': 300,
+        'glucosa': 110 + indice % 20,
+        'presionArterial': "120/80",
+        'paciente': muestra['paciente'],
+        'idPaciente': muestra['id_paciente']
+    }
+
+
+def escenarios_facade(aplicacion, muestra: Dict[str, Any]) -> List[Escenario]:
+    """
+    Operaciones del Facade de la aplicación, con el contexto de un usuario
+    no administrador (incluye la verificación de propiedad).
+    """
+    facade = aplicacion.bitacora_facade
+    cache = aplicacion.cache_mes
+    despachador = aplicacion.despachador_eventos
+    contexto = {'tipo_usuario': 2, 'id_usuario': muestra['id_usuario'], 'es_admin': False,
+                'id_paciente_contexto': muestra['id_paciente']}
+    ids = muestra['ids']
+    creados: List[int] = []
+
+    def esperar_observadores(_):
+        despachador.esperar()
+
+    def buscar(_):
+        facade.buscar_por_mes(muestra['mes'], año=muestra['anio'], id_usuario=muestra['id_usuario'],
+                              id_paciente=muestra['id_paciente'])
+
+    def verificar(resultado):
+        if not resultado.get('success'):
+            raise RuntimeError(resultado.get('error'))
+        return resultado
+
+    def guardar(indice):
+        creados.append(verificar(facade.guardar_registro(datos_registro(muestra, indice), **contexto))['id'])
+
+    def modificar(indice):
+        datos = datos_registro(muestra, indice)
+        datos['id'] = ids[indice % len(ids)]
+        verificar(facade.guardar_registro(datos, **contexto))
+
+    def eliminar(_):
+        verificar(facade.eliminar_registro(creados.pop(), **contexto))
+
+    return [
+        Escenario("buscar_por_mes (sin caché)", "facade", buscar, preparar=lambda _: cache.limpiar()),
+        Escenario("buscar_por_mes (con caché)", "facade", buscar),
+        Escenario("obtener_registro", "facade",
+                  lambda i: facade.obtener_registro(ids[i % len(ids)], id_usuario=muestra['id_usuario'],
+                                                    id_paciente=muestra['id_paciente'])),
+        Escenario("guardar_registro (alta)", "facade", guardar, despues=esperar_observadores),
+        Escenario("guardar_registro (modificación)", "facade", modificar, despues=esperar_observadores),
+        # Elimina los registros creados por el escenario de alta (misma cantidad de iteraciones)
+        Escenario("eliminar_registro", "facade", eliminar, despues=esperar_observadores)
+    ]
+
+
+def escenarios_rutas(aplicacion, muestra: Dict[str, Any]) -> List[Escenario]:
+    """Rutas de la bitácora a través del cliente de pruebas de Flask (sesión de paciente)."""
+    cliente = aplicacion.app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion["login"] = True
+        sesion["login-usr"] = f"bench-paciente-{muestra['id_paciente']}"
+        sesion["login-tipo"] = "2"
+        sesion["login-id"] = muestra['id_usuario']
+        sesion["login-paciente-id"] = muestra['id_paciente']
+        sesion["login-paciente"] = muestra['paciente']
+
+    cache = aplicacion.cache_mes
+    despachador = aplicacion.despachador_eventos
+    ids = muestra['ids']
+    creados: List[int] = []
+
+    def verificar(respuesta):
+        if respuesta.status_code != 200:
+            raise RuntimeError(f"{respuesta.request.path}: HTTP {respuesta.status_code} {respuesta.get_data(as_text=True)[:200]}")
+        return respuesta
+
+    def buscar(_):
+        verificar(cliente.get(f"/bitacora/buscar?mes={muestra['mes']}&anio={muestra['anio']}"))
+
+    def guardar(indice):
+        datos = datos_registro(muestra, indice)
+        respuesta = verificar(cliente.post("/bitacora", data={k: str(v) for k, v in datos.items()}))
+        creados.append(respuesta.get_json()['id'])
+
+    def eliminar(_):
+        verificar(cliente.post("/bitacora/eliminar", data={'id': str(creados.pop())}))
+
+    return [
+        Escenario("GET /bitacora/buscar (sin caché)", "rutas", buscar, preparar=lambda _: cache.limpiar()),
+        Escenario("GET /bitacora/buscar (con caché)", "rutas", buscar),
+        Escenario("GET /bitacora/<id>", "rutas",
+                  lambda i: verificar(cliente.get(f"/bitacora/{ids[i % len(ids)]}"))),
+        Escenario("POST /bitacora", "rutas", guardar, despues=lambda _: despachador.esperar()),
+        Escenario("POST /bitacora/eliminar", "rutas", eliminar, despues=lambda _: despachador.esperar())
+    ]
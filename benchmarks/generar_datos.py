@@ -0,0 +1,161 @@
+"""
+Generador de datos sintéticos para los benchmarks.
+
+Vuelve a crear el esquema de VidaDial.sql en la base de datos de benchmarks
+(ver benchmarks/entorno.py) y la llena con usuarios, pacientes y registros
+de bitácora diarios con valores plausibles, de forma determinista (semilla).
+Al final reconstruye los resúmenes diarios.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.generar_datos --filas 100000
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterator, List, Tuple
+
+from benchmarks.entorno import FuenteConexiones, conectar, sentencias_esquema
+from resumen_service import ResumenService
+
+ESCALAS = (10_000, 100_000, 1_000_000)
+# Registros por paciente: dos años de sesiones diarias
+REGISTROS_POR_PACIENTE = 730
+TAMANO_LOTE = 5000
+
+NOMBRES = ("María", "José", "Guadalupe", "Juan", "Ana", "Luis", "Rosa", "Carlos",
+           "Elena", "Miguel", "Sofía", "Jorge", "Laura", "Pedro", "Lucía", "Ramón")
+APELLIDOS = ("Hernández", "García", "Martínez", "López", "González", "Rodríguez",
+             "Pérez", "Sánchez", "Ramírez", "Torres", "Flores", "Rivera", "Treviño")
+
+# Usuarios fijos que usan los benchmarks de rutas
+USUARIO_ADMIN = ('bench-admin', 'bench', '1')
+
+
+def crear_esquema(con):
+    """Borra y vuelve a crear las tablas de VidaDial.sql."""
+    cursor = con.cursor()
+    for sentencia in sentencias_esquema():
+        cursor.execute(sentencia)
+    cursor.close()
+    con.commit()
+
+
+def pacientes(num_pacientes: int, rnd: random.Random) -> Iterator[Tuple]:
+    """Genera los pacientes (idPaciente, nombre, edad, sexo, curp, idUsuario)."""
+    for i in range(1, num_pacientes + 1):
+        nombre = f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)} {i}"
+        # El usuario 1 es el administrador; cada paciente tiene su propio usuario
+        yield (i, nombre, rnd.randint(18, 90), rnd.choice("FM"), f"BENCH{i:013d}", i + 1)
+
+
+def registros(num_pacientes: int, filas: int, rnd: random.Random) -> Iterator[Tuple]:
+    """
+    Genera los registros de bitácora: una sesión diaria por paciente hasta
+    completar las filas, terminando el día de hoy.
+    """
+    hoy = date.today()
+    for indice in range(filas):
+        id_paciente = indice // REGISTROS_POR_PACIENTE + 1
+        if id_paciente > num_pacientes:
+            id_paciente = rnd.randint(1, num_pacientes)
+        dia = REGISTROS_POR_PACIENTE - 1 - indice % REGISTROS_POR_PACIENTE
+        inicio = rnd.randint(6, 9)
+        liquido = Decimal(rnd.randint(350, 900))
+        # Algunos valores faltantes, como en las hojas capturadas a mano
+        glucosa = None if rnd.random() < 0.03 else Decimal(f"{rnd.gauss(115, 15):.2f}")
+        yield (
+            id_paciente,
+            hoy - timedelta(days=dia),
+            f"{inicio:02d}:{rnd.randint(0, 59):02d}:00",
+            f"{inicio + 5:02d}:{rnd.randint(0, 59):02d}:00",
+            Decimal(f"{rnd.uniform(1000, 1300):.2f}"),
+            Decimal(f"{rnd.uniform(300, 500):.2f}"),
+            Decimal(f"{rnd.uniform(38, 48):.2f}"),
+            liquido,
+            Decimal(rnd.randint(150, 450)),
+            glucosa,
+            f"{rnd.randint(105, 140)}/{rnd.randint(65, 90)}"
+        )
+
+
+def insertar_lotes(con, sql: str, filas: Iterator[Tuple], etiqueta: str) -> int:
+    """Inserta las filas por lotes con executemany (una transacción por lote)."""
+    cursor = con.cursor()
+    total = 0
+    lote: List[Tuple] = []
+    inicio = time.monotonic()
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= TAMANO_LOTE:
+            cursor.executemany(sql, lote)
+            con.commit()
+            total += len(lote)
+            lote = []
+            print(f"\r{etiqueta}: {total}", end="", flush=True)
+    if lote:
+        cursor.executemany(sql, lote)
+        con.commit()
+        total += len(lote)
+    cursor.close()
+    print(f"\r{etiqueta}: {total} ({time.monotonic() - inicio:.1f} s)")
+    return total
+
+
+def generar(filas: int, semilla: int = 42):
+    """
+    Crea el esquema y genera los datos.
+
+    Args:
+        filas: Registros de bitácora a generar
+        semilla: Semilla del generador aleatorio
+    """
+    rnd = random.Random(semilla)
+    num_pacientes = max(1, -(-filas // REGISTROS_POR_PACIENTE))
+
+    con = conectar()
+    try:
+        crear_esquema(con)
+        cursor = con.cursor()
+        cursor.execute("SET foreign_key_checks = 0, unique_checks = 0")
+        cursor.close()
+
+        usuarios = [(1,) + USUARIO_ADMIN] + [
+            (i + 1, f"bench-paciente-{i}", "bench", "2") for i in range(1, num_pacientes + 1)
+        ]
+        insertar_lotes(con, "INSERT INTO usuario (idUsuario, nombre, contrasena, tipo_usuario) "
+                            "VALUES (%s, %s, %s, %s)", iter(usuarios), "usuario")
+        insertar_lotes(con, "INSERT INTO pacientes (idPaciente, nombreCompleto, edad, sexo, curp, idUsuario) "
+                            "VALUES (%s, %s, %s, %s, %s, %s)",
+                       pacientes(num_pacientes, rnd), "pacientes")
+        insertar_lotes(con, "INSERT INTO bitacora (idPaciente, fecha, horaInicio, horaFin, drenajeInicial, "
+                            "ufTotal, tiempoMedioPerm, liquidoIngerido, cantidadOrina, glucosa, presionArterial) "
+                            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                       registros(num_pacientes, filas, rnd), "bitacora")
+
+        cursor = con.cursor()
+        cursor.execute("SET foreign_key_checks = 1, unique_checks = 1")
+        cursor.execute("ANALYZE TABLE bitacora, pacientes, usuario")
+        cursor.fetchall()
+        cursor.close()
+    finally:
+        con.close()
+
+    dias = ResumenService(FuenteConexiones()).reconstruir()
+    print(f"bitacora_resumen_diario: {dias}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos para los benchmarks.")
+    parser.add_argument("--filas", type=int, choices=ESCALAS, default=ESCALAS[0],
+                        help="Registros de bitácora a generar")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+    generar(args.filas, args.semilla)
+
+
+if __name__ == "__main__":
+    main()
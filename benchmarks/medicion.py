@@ -0,0 +1,122 @@
+"""
+Medición de operaciones para los benchmarks: latencia (p50/p95/p99),
+asignaciones de memoria (tracemalloc) y consultas a la base de datos.
+"""
+
+import gc
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.entorno import ContadorConsultas
+
+
+class Escenario:
+    """
+    Operación a medir.
+
+    `operacion` recibe el índice de la iteración. `preparar` se ejecuta antes
+    de cada iteración y `despues` al terminarla (por ejemplo, esperar a los
+    observadores asíncronos); ninguno de los dos entra en la latencia, pero
+    las consultas de `despues` sí se cuentan como parte de la operación.
+    """
+
+    def __init__(self, nombre: str, grupo: str, operacion: Callable[[int], Any],
+                 preparar: Optional[Callable[[int], Any]] = None,
+                 despues: Optional[Callable[[int], Any]] = None,
+                 iteraciones: Optional[int] = None):
+        self.nombre = nombre
+        self.grupo = grupo
+        self.operacion = operacion
+        self.preparar = preparar
+        self.despues = despues
+        self.iteraciones = iteraciones
+
+
+def percentil(ordenados: List[float], p: float) -> float:
+    """Percentil con interpolación lineal sobre una lista ordenada."""
+    if len(ordenados) == 1:
+        return ordenados[0]
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def medir(escenario: Escenario, iteraciones: int = 200, calentamiento: int = 20,
+          iteraciones_memoria: int = 50) -> Dict[str, Any]:
+    """
+    Mide un escenario en tres pasadas: calentamiento, latencia con conteo de
+    consultas y memoria con tracemalloc (pico por operación y bytes que
+    siguen asignados al terminarla), por separado porque tracemalloc
+    distorsiona los tiempos.
+
+    Returns:
+        Diccionario con los resultados (tiempos en milisegundos)
+    """
+    iteraciones = escenario.iteraciones or iteraciones
+    indice = 0
+
+    def ejecutar(medir_tiempo: bool) -> float:
+        nonlocal indice
+        if escenario.preparar:
+            escenario.preparar(indice)
+        inicio = time.perf_counter()
+        escenario.operacion(indice)
+        duracion = time.perf_counter() - inicio
+        if escenario.despues:
+            escenario.despues(indice)
+        indice += 1
+        return duracion if medir_tiempo else 0.0
+
+    for _ in range(calentamiento):
+        ejecutar(False)
+
+    gc.collect()
+    tiempos = []
+    with ContadorConsultas() as contador:
+        for _ in range(iteraciones):
+            tiempos.append(ejecutar(True) * 1000)
+    tiempos.sort()
+
+    picos = []
+    retenidos = 0
+    muestras = min(iteraciones, iteraciones_memoria)
+    tracemalloc.start()
+    try:
+        for _ in range(muestras):
+            if escenario.preparar:
+                escenario.preparar(indice)
+            antes, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            escenario.operacion(indice)
+            actual, pico = tracemalloc.get_traced_memory()
+            if escenario.despues:
+                escenario.despues(indice)
+            indice += 1
+            picos.append(pico - antes)
+            retenidos += actual - antes
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'nombre': escenario.nombre,
+        'grupo': escenario.grupo,
+        'iteraciones': iteraciones,
+        'p50_ms': round(percentil(tiempos, 50), 4),
+        'p95_ms': round(percentil(tiempos, 95), 4),
+        'p99_ms': round(percentil(tiempos, 99), 4),
+        'media_ms': round(statistics.fmean(tiempos), 4),
+        'min_ms': round(tiempos[0], 4),
+        'max_ms': round(tiempos[-1], 4),
+        'consultas_por_op': round(contador.total / iteraciones, 2),
+        'preparaciones_por_op': round(contador.preparaciones / iteraciones, 2),
+        'comandos_por_op': {comando: round(cantidad / iteraciones, 2)
+                            for comando, cantidad in sorted(contador.comandos.items())},
+        'memoria': {
+            'muestras': muestras,
+            'pico_bytes_p50': int(percentil(sorted(picos), 50)) if picos else 0,
+            'retenido_bytes_por_op': int(retenidos / muestras) if muestras else 0
+        }
+    }
@@ -0,0 +1,219 @@
+"""
+Módulo para la exportación masiva de la bitácora en CSV o NDJSON
+(historiales completos para nefrólogos y aseguradoras).
+Lee con un cursor sin búfer del lado del servidor y genera la salida por
+bloques, opcionalmente comprimida con gzip, con memoria constante sin
+importar el número de registros.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from bitacora_service import CAMPOS_REGISTRO
+
+
+class BitacoraExportador:
+    """
+    Exportador de registros de bitácora.
+    Solo admite las columnas de COLUMNAS (lista blanca: el nombre solicitado
+    nunca se inserta en el SQL) y ordena por paciente y fecha, el orden del
+    índice (idPaciente, fecha).
+    """
+
+    FORMATOS = ('csv', 'ndjson')
+    TIPOS_CONTENIDO = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+    # Columna exportada -> expresión SQL
+    COLUMNAS: Dict[str, str] = dict(
+        [('idBitacora', 'b.idBitacora'), ('idPaciente', 'b.idPaciente'),
+         ('paciente', 'p.nombreCompleto')] +
+        [(campo, f'b.{campo}') for campo in CAMPOS_REGISTRO] +
+        [('fechaCreacion', 'b.fechaCreacion'), ('fechaActualizacion', 'b.fechaActualizacion')]
+    )
+
+    def __init__(self, connection_source, tamano_lote: int = 1000, tamano_bloque: int = 65536):
+        """
+        Args:
+            connection_source: Objeto con get_connection() (pool o fuente por petición)
+            tamano_lote: Registros leídos del servidor en cada fetchmany
+            tamano_bloque: Bytes aproximados de cada bloque de salida
+        """
+        self.connection_source = connection_source
+        self.tamano_lote = tamano_lote
+        self.tamano_bloque = tamano_bloque
+
+    def columnas(self, solicitadas: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        Valida las columnas solicitadas (todas si no se indican), sin duplicados
+        y en el orden solicitado.
+
+        Raises:
+            ValueError: Si alguna columna no está permitida
+        """
+        if not solicitadas:
+            return list(self.COLUMNAS)
+        columnas = list(dict.fromkeys(c.strip() for c in solicitadas if c.strip()))
+        desconocidas = [c for c in columnas if c not in self.COLUMNAS]
+        if desconocidas:
+            raise ValueError(f"Columnas no permitidas: {', '.join(desconocidas)}")
+        return columnas or list(self.COLUMNAS)
+
+    def construir_consulta(self, columnas: Sequence[str], id_usuario: Optional[int] = None,
+                           id_paciente: Optional[int] = None, desde: Optional[date] = None,
+                           hasta: Optional[date] = None) -> Tuple[str, tuple]:
+        """
+        Construye la consulta de exportación.
+
+        Args:
+            columnas: Columnas ya validadas
+            id_usuario: Restringe a los pacientes del usuario (no administradores)
+            id_paciente: Restringe a un paciente
+            desde: Fecha inicial (inclusive)
+            hasta: Fecha final (inclusive)
+
+        Returns:
+            Tupla (sql, valores)
+        """
+        condiciones = []
+        val: List[Any] = []
+        if id_paciente:
+            condiciones.append("b.idPaciente = %s")
+            val.append(id_paciente)
+        if id_usuario is not None:
+            condiciones.append("p.idUsuario = %s")
+            val.append(id_usuario)
+        if desde:
+            condiciones.append("b.fecha >= %s")
+            val.append(desde)
+        if hasta:
+            condiciones.append("b.fecha <= %s")
+            val.append(hasta)
+
+        sql = f"""
+        SELECT {', '.join(self.COLUMNAS[c] for c in columnas)}
+        FROM bitacora b
+        LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
+        {('WHERE ' + ' AND '.join(condiciones)) if condiciones else ''}
+        ORDER BY b.idPaciente, b.fecha, b.idBitacora
+        """
+        return sql, tuple(val)
+
+    def exportar(self, formato: str = 'csv', columnas: Optional[Sequence[str]] = None,
+                 comprimir: bool = False, **filtros) -> Iterator[bytes]:
+        """
+        Genera la exportación por bloques. La consulta se ejecuta al pedir el
+        primer bloque, de modo que los errores de la base de datos se pueden
+        reportar antes de enviar las cabeceras.
+
+        Args:
+            formato: 'csv' o 'ndjson'
+            columnas: Columnas a exportar (todas si no se indican)
+            comprimir: Si la salida se comprime con gzip
+            **filtros: id_usuario, id_paciente, desde y hasta (ver construir_consulta)
+
+        Yields:
+            Bloques de bytes (siempre al menos uno)
+
+        Raises:
+            ValueError: Si el formato o alguna columna no es válida
+        """
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}")
+        columnas = self.columnas(columnas)
+        sql, val = self.construir_consulta(columnas, **filtros)
+        return self._bloques(self._lineas(formato, columnas, sql, val), comprimir)
+
+    def _lineas(self, formato: str, columnas: List[str], sql: str, val: tuple) -> Iterator[str]:
+        """Genera el texto de la exportación (encabezado y un renglón por registro)."""
+        filas = self._filas(sql, val)
+        if formato == 'csv':
+            salida = io.StringIO()
+            escritor = csv.writer(salida, lineterminator="\n")
+            escritor.writerow(columnas)
+            for lote in filas:
+                escritor.writerows([[self._valor_csv(v) for v in fila] for fila in lote])
+                yield salida.getvalue()
+                salida.seek(0)
+                salida.truncate()
+            yield salida.getvalue()
+        else:
+            codificar = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'),
+                                         default=self._valor_json).encode
+            for lote in filas:
+                yield "".join(codificar(dict(zip(columnas, fila))) + "\n" for fila in lote)
+
+    def _filas(self, sql: str, val: tuple) -> Iterator[List[tuple]]:
+        """
+        Ejecuta la consulta con un cursor sin búfer y entrega las filas por
+        lotes. La conexión permanece ocupada hasta agotar o cerrar el iterador.
+        """
+        con = self.connection_source.get_connection()
+        cursor = None
+        completo = False
+        try:
+            cursor = con.cursor()
+            cursor.execute(sql, val)
+            while True:
+                lote = cursor.fetchmany(self.tamano_lote)
+                if not lote:
+                    break
+                yield lote
+            completo = True
+        finally:
+            if cursor:
+                if not completo:
+                    # Descartar las filas pendientes (descarga cancelada) para liberar la conexión
+                    con.consume_results()
+                cursor.close()
+            if con and con.is_connected():
+                con.close()
+
+    def _bloques(self, lineas: Iterator[str], comprimir: bool) -> Iterator[bytes]:
+        """Agrupa el texto en bloques de ~tamano_bloque bytes, comprimidos con gzip si se pide."""
+        # wbits=31: formato gzip (cabecera y CRC) en lugar de zlib
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None
+        bloque: List[bytes] = []
+        longitud = 0
+        for texto in lineas:
+            datos = texto.encode("utf-8")
+            if compresor:
+                datos = compresor.compress(datos)
+            if datos:
+                bloque.append(datos)
+                longitud += len(datos)
+            if longitud >= self.tamano_bloque:
+                yield b"".join(bloque)
+                bloque = []
+                longitud = 0
+        if compresor:
+            bloque.append(compresor.flush())
+        yield b"".join(bloque)
+
+    @staticmethod
+    def _valor_csv(valor: Any) -> Any:
+        """Convierte un valor de la base de datos en texto para CSV."""
+        if valor is None:
+            return ""
+        if isinstance(valor, datetime):
+            return valor.strftime("%Y-%m-%d %H:%M:%S")
+        if isinstance(valor, date):
+            return valor.isoformat()
+        return valor
+
+    @staticmethod
+    def _valor_json(valor: Any) -> Any:
+        """Convierte los tipos de la base de datos que json no serializa."""
+        if isinstance(valor, Decimal):
+            return float(valor)
+        if isinstance(valor, datetime):
+            return valor.strftime("%Y-%m-%d %H:%M:%S")
+        if isinstance(valor, date):
+            return valor.isoformat()
+        if isinstance(valor, timedelta):
+            return str(valor)
+        raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
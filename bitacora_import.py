@@ -0,0 +1,235 @@
+"""
+Módulo para la importación masiva de registros de bitácora desde CSV o NDJSON
+(hojas en papel capturadas, exportaciones de cicladoras, etc.).
+Aplica las mismas reglas que BitacoraValidationDecorator e inserta por lotes
+transaccionales.
+"""
+
+import csv
+import json
+import mysql.connector
+from datetime import datetime
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+from bitacora_service import (
+    BitacoraFacade,
+    BitacoraValidationDecorator,
+    CAMPOS_REGISTRO,
+    es_error_de_fila,
+    insertar_registros
+)
+
+
+class BitacoraImportador:
+    """
+    Importador masivo de registros de bitácora.
+    Resuelve cada nombre de paciente distinto una sola vez, inserta los
+    registros válidos por lotes (una transacción por lote) y genera un
+    reporte de errores por fila.
+    """
+
+    FORMATOS = ('csv', 'ndjson')
+    CAMPOS_REQUERIDOS = ('fecha', 'horaInicio', 'horaFin')
+    FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y")
+
+    def __init__(self, facade: BitacoraFacade, tamano_lote: int = 1000):
+        """
+        Args:
+            facade: Facade de bitácora (conexión, resolvedor de pacientes y observadores)
+            tamano_lote: Registros insertados por transacción
+        """
+        self.facade = facade
+        self.tamano_lote = tamano_lote
+        self._validador = BitacoraValidationDecorator(None)
+
+    @classmethod
+    def detectar_formato(cls, nombre_archivo: str) -> str:
+        """Deduce el formato a partir de la extensión del archivo (CSV por defecto)."""
+        nombre = (nombre_archivo or '').lower()
+        if nombre.endswith('.ndjson') or nombre.endswith('.jsonl'):
+            return 'ndjson'
+        return 'csv'
+
+    def importar(self, archivo: IO[str], formato: str = 'csv',
+                 tipo_usuario: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Importa los registros de un archivo de texto.
+
+        Args:
+            archivo: Archivo de texto abierto (CSV con encabezados o NDJSON)
+            formato: 'csv' o 'ndjson'
+            tipo_usuario: Tipo de usuario que realiza la importación (para los observadores)
+
+        Returns:
+            Reporte con 'total', 'insertados', 'lotes' y 'errores' (fila y mensaje)
+        """
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}")
+
+        reporte = {'total': 0, 'insertados': 0, 'lotes': 0, 'errores': []}
+        pacientes: Dict[str, Optional[int]] = {}
+        lote: List[Tuple[int, Dict[str, Any]]] = []
+
+        for numero_fila, fila, error in self._leer_filas(archivo, formato):
+            reporte['total'] += 1
+            datos = None
+            if error is None:
+                datos, error = self._normalizar_fila(fila, pacientes)
+            if error:
+                reporte['errores'].append({'fila': numero_fila, 'error': error})
+                continue
+            lote.append((numero_fila, datos))
+            if len(lote) >= self.tamano_lote:
+                self._insertar_lote(lote, reporte, tipo_usuario)
+                lote = []
+
+        if lote:
+            self._insertar_lote(lote, reporte, tipo_usuario)
+        reporte['errores'].sort(key=lambda error: error['fila'])
+        return reporte
+
+    def _leer_filas(self, archivo: IO[str], formato: str) -> Iterator[Tuple[int, Dict[str, Any], Optional[str]]]:
+        """Lee el archivo fila por fila: (número de línea, fila, error de lectura)."""
+        if formato == 'csv':
+            lector = csv.DictReader(archivo)
+            if lector.fieldnames:
+                lector.fieldnames = [campo.strip() for campo in lector.fieldnames]
+            for fila in lector:
+                yield lector.line_num, fila, None
+            return
+
+        for numero_linea, linea in enumerate(archivo, start=1):
+            if not linea.strip():
+                continue
+            try:
+                fila = json.loads(linea)
+            except ValueError:
+                yield numero_linea, {}, 'JSON inválido'
+                continue
+            if not isinstance(fila, dict):
+                yield numero_linea, {}, 'Se esperaba un objeto JSON'
+                continue
+            yield numero_linea, fila, None
+
+    def _normalizar_fila(self, fila: Dict[str, Any],
+                         pacientes: Dict[str, Optional[int]]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Convierte una fila leída en los datos de un registro y la valida.
+
+        Returns:
+            Tupla (datos, None) si es válida o (None, mensaje de error)
+        """
+        datos = {}
+        for campo in CAMPOS_REGISTRO + ('paciente', 'idPaciente'):
+            valor = fila.get(campo)
+            if isinstance(valor, str):
+                valor = valor.strip() or None
+            datos[campo] = valor
+
+        for campo in self.CAMPOS_REQUERIDOS:
+            if not datos.get(campo):
+                return None, f"El campo {campo} es obligatorio"
+
+        fecha = self._interpretar_fecha(datos['fecha'])
+        if fecha is None:
+            return None, f"Fecha inválida: {datos['fecha']}"
+        datos['fecha'] = fecha
+
+        for campo in BitacoraValidationDecorator.CAMPOS_NUMERICOS:
+            valor = datos.get(campo)
+            if valor is not None:
+                try:
+                    datos[campo] = float(valor)
+                except (ValueError, TypeError):
+                    return None, f"Valor numérico inválido en {campo}: {valor}"
+
+        # Resolver el paciente una sola vez por nombre distinto
+        id_paciente = datos.get('idPaciente')
+        nombre = datos.get('paciente')
+        if id_paciente is not None:
+            try:
+                id_paciente = int(id_paciente)
+            except (ValueError, TypeError):
+                return None, f"idPaciente inválido: {id_paciente}"
+            nombre = nombre or self.facade.paciente_resolver.obtener_nombre(id_paciente)
+        elif nombre:
+            if nombre not in pacientes:
+                pacientes[nombre] = self.facade.paciente_resolver.resolver_id(nombre)
+            id_paciente = pacientes[nombre]
+        if not nombre or not id_paciente:
+            return None, 'Paciente no encontrado en la base de datos'
+        datos['paciente'] = nombre
+        datos['idPaciente'] = id_paciente
+
+        # Mismas reglas que se aplican al mostrar los registros
+        if self._validador.procesar_fila(datos, None) is None:
+            return None, 'Registro inválido'
+        return datos, None
+
+    def _interpretar_fecha(self, valor: Any) -> Optional[str]:
+        """Convierte la fecha a formato ISO (AAAA-MM-DD) o None si no es válida."""
+        for formato in self.FORMATOS_FECHA:
+            try:
+                return datetime.strptime(str(valor), formato).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+        return None
+
+    def _insertar_lote(self, lote: List[Tuple[int, Dict[str, Any]]], reporte: Dict[str, Any],
+                       tipo_usuario: Optional[int]):
+        """
+        Inserta un lote en una transacción con un INSERT de varias filas. Si
+        alguna fila tiene datos inválidos se reintenta fila por fila dentro de
+        la misma transacción para aislar y reportar las filas con error; los
+        errores que abortan la transacción (interbloqueo, conexión perdida...)
+        descartan el lote completo.
+        """
+        con = None
+        cursor = None
+        insertados: List[Tuple[int, Dict[str, Any]]] = []
+        filas_con_error = set()
+        try:
+            con = self.facade.connection_singleton.get_connection()
+            cursor = con.cursor()
+            try:
+                ids = insertar_registros(cursor, [datos for _, datos in lote])
+                insertados = list(zip(ids, (datos for _, datos in lote)))
+            except mysql.connector.Error as error:
+                if not es_error_de_fila(error):
+                    raise
+                # La sentencia fallida no se aplicó; la transacción sigue abierta
+                for numero_fila, datos in lote:
+                    try:
+                        insertados.append((insertar_registros(cursor, [datos])[0], datos))
+                    except mysql.connector.Error as error_fila:
+                        if not es_error_de_fila(error_fila):
+                            raise
+                        filas_con_error.add(numero_fila)
+                        reporte['errores'].append({'fila': numero_fila, 'error': str(error_fila)})
+            con.commit()
+        except mysql.connector.Error as error:
+            print(f"[BitacoraImportador] Error al insertar lote: {error}")
+            if con:
+                try:
+                    con.rollback()
+                except mysql.connector.Error:
+                    pass
+            insertados = []
+            for numero_fila, _ in lote:
+                if numero_fila not in filas_con_error:
+                    reporte['errores'].append({'fila': numero_fila, 'error': str(error)})
+        finally:
+            if cursor:
+                cursor.close()
+            if con and con.is_connected():
+                con.close()
+
+        reporte['lotes'] += 1
+        reporte['insertados'] += len(insertados)
+        if insertados:
+            # Una sola notificación agregada por lote
+            self.facade.subject.notify('batch', {
+                'eventos': [{'tipo': 'created', 'id': id_bitacora, 'datos': datos}
+                            for id_bitacora, datos in insertados],
+                'tipo_usuario': tipo_usuario
+            })
@@ -2,10 +2,292 @@
 Módulo que implementa los patrones Singleton, Factory, Facade, Decorator y Observer para el servicio de bitácora.
 """
 
+import atexit
+import base64
+import queue
+import re
+import threading
+import time
 import mysql.connector
+from collections import OrderedDict
+from collections.abc import Mapping
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Callable
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterable, Iterator, Sequence
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+
+from metricas_service import REGISTRO
+from paciente_service import PacienteResolver
+from pool_service import consultar_filas
+
+
+# Métricas del servicio (se exportan en /metrics)
+METRICA_CONSULTAS = REGISTRO.histograma(
+    "vidadial_bitacora_consulta_segundos",
+    "Duración de las consultas de búsqueda por estrategia", ("estrategia",))
+METRICA_FACADE = REGISTRO.histograma(
+    "vidadial_bitacora_facade_segundos",
+    "Duración de las operaciones del Facade de bitácora", ("metodo",))
+METRICA_DECORADORES = REGISTRO.histograma(
+    "vidadial_bitacora_decoradores_segundos",
+    "Duración de la cadena de decoradores sobre un resultado", ("cadena",))
+METRICA_OBSERVADORES = REGISTRO.histograma(
+    "vidadial_bitacora_observador_segundos",
+    "Duración de la notificación a cada observador", ("observador", "modo"))
+
+
+def rango_mes(año: int, mes: int) -> Tuple[date, date]:
+    """
+    Calcula el rango semiabierto [inicio, fin) de un mes.
+
+    Permite filtrar por `fecha >= inicio AND fecha < fin`, predicado que sí
+    aprovecha los índices sobre `fecha` (a diferencia de MONTH()/YEAR()).
+
+    Args:
+        año: Año del rango
+        mes: Número del mes (1-12)
+
+    Returns:
+        Tupla (primer día del mes, primer día del mes siguiente)
+    """
+    inicio = date(año, mes, 1)
+    if mes == 12:
+        fin = date(año + 1, 1, 1)
+    else:
+        fin = date(año, mes + 1, 1)
+    return inicio, fin
+
+
+def codificar_cursor(id_bitacora: int) -> str:
+    """
+    Codifica el cursor de paginación (keyset sobre idBitacora DESC).
+
+    Args:
+        id_bitacora: ID del último registro entregado en la página
+
+    Returns:
+        Cursor opaco para solicitar la página siguiente
+    """
+    return base64.urlsafe_b64encode(f"b:{int(id_bitacora)}".encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> int:
+    """
+    Decodifica un cursor generado por `codificar_cursor`.
+
+    Args:
+        cursor: Cursor opaco recibido del cliente
+
+    Returns:
+        ID a partir del cual (exclusivo) continúa la paginación
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        contenido = base64.urlsafe_b64decode(cursor + relleno).decode()
+    except (ValueError, UnicodeDecodeError, TypeError):
+        raise ValueError("Cursor inválido")
+    prefijo, _, valor = contenido.partition(":")
+    if prefijo != "b" or not valor.isdigit():
+        raise ValueError("Cursor inválido")
+    return int(valor)
+
+
+def _paginacion_sql(params: Dict[str, Any], columna_id: str = "b.idBitacora") -> Tuple[str, str, tuple, tuple]:
+    """
+    Construye los fragmentos SQL de paginación por keyset.
+
+    Args:
+        params: Parámetros de búsqueda ('despues' y 'limite' opcionales)
+        columna_id: Columna de idBitacora en la consulta
+
+    Returns:
+        Tupla (condición para el WHERE, cláusula LIMIT, valores de la condición, valores del LIMIT)
+    """
+    despues = params.get('despues')
+    limite = params.get('limite')
+    condicion = f" AND {columna_id} < %s" if despues else ""
+    valores_condicion = (despues,) if despues else ()
+    clausula_limite = " LIMIT %s" if limite else ""
+    valores_limite = (limite,) if limite else ()
+    return condicion, clausula_limite, valores_condicion, valores_limite
+
+
+# ============================================================================
+# MODELO DE REGISTRO
+# ============================================================================
+
+_AUSENTE = object()
+
+
+class BitacoraRow(Mapping):
+    """
+    Registro de bitácora compacto, construido directamente sobre la tupla
+    que entrega el cursor. Las filas de un mismo resultado comparten el
+    índice de columnas, de modo que cada registro ocupa la tupla y unos
+    pocos slots en lugar de un diccionario propio.
+    
+    Se usa como un diccionario (get, [], in, keys, items...). Los campos
+    *_formateada que agregan los decoradores tienen su propio slot; asignar
+    una columna reemplaza la tupla y cualquier otra clave se guarda aparte.
+    """
+    
+    CAMPOS_FORMATEADOS = frozenset(('fecha_formateada', 'fechaCreacion_formateada',
+                                    'fechaActualizacion_formateada'))
+    # Índices ya creados por lista de columnas (los resultados de una misma consulta lo comparten)
+    MAX_INDICES = 64
+    _indices: Dict[Tuple[str, ...], Dict[str, int]] = {}
+    
+    __slots__ = ('_indice', '_valores', '_extra',
+                 'fecha_formateada', 'fechaCreacion_formateada', 'fechaActualizacion_formateada')
+    
+    def __init__(self, indice: Dict[str, int], valores: tuple):
+        """
+        Args:
+            indice: Posición de cada columna en la tupla (ver `indice`)
+            valores: Fila tal como la entrega el cursor
+        """
+        self._indice = indice
+        self._valores = valores
+        self._extra = None
+    
+    @classmethod
+    def indice(cls, columnas: Sequence[str]) -> Dict[str, int]:
+        """
+        Obtiene el índice columna -> posición que comparten las filas de un
+        resultado. Las consultas con las mismas columnas reciben el mismo
+        índice, lo que permite reconocer la forma de sus filas.
+        """
+        clave = tuple(columnas)
+        indice = cls._indices.get(clave)
+        if indice is None:
+            if len(cls._indices) >= cls.MAX_INDICES:
+                cls._indices.clear()
+            indice = cls._indices.setdefault(
+                clave, {columna: posicion for posicion, columna in enumerate(clave)})
+        return indice
+    
+    @classmethod
+    def desde_filas(cls, columnas: Sequence[str], filas: Iterable[tuple]) -> List['BitacoraRow']:
+        """
+        Construye los registros de un resultado.
+        
+        Args:
+            columnas: Nombres de las columnas (cursor.column_names)
+            filas: Filas como tuplas
+        
+        Returns:
+            Lista de BitacoraRow que comparten un solo índice
+        """
+        indice = cls.indice(columnas)
+        return [cls(indice, fila) for fila in filas]
+    
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> 'BitacoraRow':
+        """Construye un registro a partir de un diccionario."""
+        return cls(cls.indice(datos), tuple(datos.values()))
+    
+    @property
+    def columnas(self) -> Dict[str, int]:
+        """Índice columna -> posición (compartido; no debe modificarse)."""
+        return self._indice
+    
+    @property
+    def valores(self) -> tuple:
+        """Valores de las columnas, en el orden del índice."""
+        return self._valores
+    
+    def agregados(self) -> Tuple[str, ...]:
+        """Claves que no son columnas (campos formateados y extra), en orden."""
+        claves = tuple(campo for campo in self.__slots__[3:] if hasattr(self, campo))
+        if self._extra:
+            claves += tuple(self._extra)
+        return claves
+    
+    def _valor(self, clave: str) -> Any:
+        """Valor de la clave o _AUSENTE."""
+        posicion = self._indice.get(clave)
+        if posicion is not None:
+            return self._valores[posicion]
+        return self._agregado(clave)
+    
+    def _agregado(self, clave: str) -> Any:
+        """Valor de una clave que no es columna (formateada o extra) o _AUSENTE."""
+        if clave in self.CAMPOS_FORMATEADOS:
+            return getattr(self, clave, _AUSENTE)
+        if self._extra is not None:
+            return self._extra.get(clave, _AUSENTE)
+        return _AUSENTE
+    
+    def __getitem__(self, clave: str) -> Any:
+        valor = self._valor(clave)
+        if valor is _AUSENTE:
+            raise KeyError(clave)
+        return valor
+    
+    def get(self, clave: str, defecto: Any = None) -> Any:
+        # Camino rápido para las columnas (lo usan los decoradores en cada fila)
+        posicion = self._indice.get(clave)
+        if posicion is not None:
+            return self._valores[posicion]
+        valor = self._agregado(clave)
+        return defecto if valor is _AUSENTE else valor
+    
+    def __contains__(self, clave: object) -> bool:
+        return isinstance(clave, str) and self._valor(clave) is not _AUSENTE
+    
+    def __setitem__(self, clave: str, valor: Any):
+        posicion = self._indice.get(clave)
+        if posicion is not None:
+            # Las tuplas son inmutables: se reemplaza solo la de este registro
+            valores = list(self._valores)
+            valores[posicion] = valor
+            self._valores = tuple(valores)
+        elif clave in self.CAMPOS_FORMATEADOS:
+            setattr(self, clave, valor)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[clave] = valor
+    
+    def __iter__(self) -> Iterator[str]:
+        yield from self._indice
+        for campo in self.__slots__[3:]:
+            if getattr(self, campo, _AUSENTE) is not _AUSENTE:
+                yield campo
+        if self._extra:
+            yield from self._extra
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def __repr__(self) -> str:
+        return f"BitacoraRow({self.a_dict()!r})"
+    
+    def copy(self) -> 'BitacoraRow':
+        """Copia superficial; la tupla de valores se comparte (es inmutable)."""
+        copia = BitacoraRow(self._indice, self._valores)
+        for campo in self.__slots__[3:]:
+            valor = getattr(self, campo, _AUSENTE)
+            if valor is not _AUSENTE:
+                setattr(copia, campo, valor)
+        if self._extra:
+            copia._extra = dict(self._extra)
+        return copia
+    
+    def a_dict(self) -> Dict[str, Any]:
+        """Convierte el registro en un diccionario (por ejemplo, para serializarlo a JSON)."""
+        valores = self._valores
+        datos = {columna: valores[posicion] for columna, posicion in self._indice.items()}
+        for campo in self.__slots__[3:]:
+            valor = getattr(self, campo, _AUSENTE)
+            if valor is not _AUSENTE:
+                datos[campo] = valor
+        if self._extra:
+            datos.update(self._extra)
+        return datos
 
 
 class BitacoraConnectionSingleton:
@@ -43,10 +325,29 @@ class BitacoraSearchStrategy(ABC):
     """
     Interfaz abstracta para las estrategias de búsqueda de bitácora.
     Patrón Strategy que será usado por el Factory.
+    
+    Cada estrategia construye su consulta; la ejecución es común y admite
+    leer todo el resultado (`search`) o recorrerlo por lotes con un cursor
+    del lado del servidor (`iterar`). Las estrategias con `preparada = True`
+    ejecutan `search` con sentencias preparadas del pool.
     """
 
+    preparada = False
+
     @abstractmethod
-    def search(self, connection, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def construir_consulta(self, params: Dict[str, Any]) -> Optional[Tuple[str, tuple]]:
+        """
+        Construye la consulta según la estrategia específica.
+        
+        Args:
+            params: Diccionario con los parámetros de búsqueda
+            
+        Returns:
+            Tupla (sql, valores) o None si no hay nada que buscar
+        """
+        pass
+
+    def search(self, connection, params: Dict[str, Any]) -> List[BitacoraRow]:
         """
         Ejecuta la búsqueda según la estrategia específica.
         
@@ -55,158 +356,284 @@ class BitacoraSearchStrategy(ABC):
             params: Diccionario con los parámetros de búsqueda
             
         Returns:
-            Lista de registros encontrados
+            Lista de registros encontrados (BitacoraRow)
+        
+        Raises:
+            mysql.connector.Error: Si la consulta falla (un error no debe
+            confundirse con un resultado vacío, que sí se guarda en caché)
         """
-        pass
+        consulta = self.construir_consulta(params)
+        if consulta is None:
+            return []
+        
+        sql, val = consulta
+        with METRICA_CONSULTAS.cronometrar(type(self).__name__):
+            columnas, filas = consultar_filas(connection, sql, val, preparada=self.preparada)
+        return BitacoraRow.desde_filas(columnas, filas)
+
+    def iterar(self, connection, params: Dict[str, Any], tamano_lote: int = 500) -> Iterator[List[BitacoraRow]]:
+        """
+        Ejecuta la búsqueda con un cursor sin búfer y entrega los registros
+        por lotes (fetchmany), sin cargar el resultado completo en memoria.
+        
+        Args:
+            connection: Conexión a la base de datos (ocupada hasta agotar el iterador)
+            params: Diccionario con los parámetros de búsqueda
+            tamano_lote: Registros leídos del servidor en cada lote
+            
+        Yields:
+            Listas de registros (BitacoraRow)
+        """
+        consulta = self.construir_consulta(params)
+        if consulta is None:
+            return
+        
+        sql, val = consulta
+        cursor = connection.cursor()
+        completo = False
+        try:
+            with METRICA_CONSULTAS.cronometrar(type(self).__name__):
+                cursor.execute(sql, val)
+            indice = BitacoraRow.indice(cursor.column_names)
+            while True:
+                lote = cursor.fetchmany(tamano_lote)
+                if not lote:
+                    break
+                yield [BitacoraRow(indice, fila) for fila in lote]
+            completo = True
+        finally:
+            if not completo:
+                # Descartar las filas pendientes para poder liberar la conexión
+                connection.consume_results()
+            cursor.close()
 
 
 class BitacoraSearchByMonth(BitacoraSearchStrategy):
     """
-    Estrategia de búsqueda por mes específico.
-    Filtra los registros de bitácora por el mes proporcionado (en cualquier año).
+    Estrategia de búsqueda por mes y año específicos.
+    Filtra los registros con un rango semiabierto de fechas, respaldado por
+    el índice compuesto (idPaciente, fecha).
     """
 
-    def search(self, connection, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Busca registros de bitácora por mes (en cualquier año)."""
+    preparada = True
+
+    def construir_consulta(self, params: Dict[str, Any]) -> Optional[Tuple[str, tuple]]:
+        """Construye la búsqueda de registros de bitácora por mes y año."""
         mes = params.get('mes')
+        año = params.get('año')
         id_usuario = params.get('id_usuario')
         id_paciente = params.get('id_paciente')
         
-        if not mes:
-            return []
+        if not mes or not año:
+            return None
+
+        fecha_inicio, fecha_fin = rango_mes(año, mes)
+        condicion, limite, val_condicion, val_limite = _paginacion_sql(params)
+        # Buscamos registros dentro del rango filtrando primero por idPaciente
+        if id_paciente:
+            sql = f"""
+            SELECT b.*, p.nombreCompleto as paciente
+            FROM bitacora b
+            LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
+            WHERE b.idPaciente = %s AND b.fecha >= %s AND b.fecha < %s{condicion}
+            ORDER BY b.idBitacora DESC{limite};
+            """
+            val = (id_paciente, fecha_inicio, fecha_fin)
+        elif id_usuario is not None:
+            # Buscar por idUsuario a través de la relación con pacientes
+            sql = f"""
+            SELECT b.*, p.nombreCompleto as paciente
+            FROM pacientes p
+            INNER JOIN bitacora b ON b.idPaciente = p.idPaciente
+            WHERE p.idUsuario = %s AND b.fecha >= %s AND b.fecha < %s{condicion}
+            ORDER BY b.idBitacora DESC{limite};
+            """
+            val = (id_usuario, fecha_inicio, fecha_fin)
+        else:
+            sql = f"""
+            SELECT b.*, p.nombreCompleto as paciente
+            FROM bitacora b
+            LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
+            WHERE b.fecha >= %s AND b.fecha < %s{condicion}
+            ORDER BY b.idBitacora DESC{limite};
+            """
+            val = (fecha_inicio, fecha_fin)
+        
+        return sql, val + val_condicion + val_limite
+
+
+# Subconsultas por tipo de término; cada una se resuelve con un índice:
+# PRIMARY (idBitacora), idx_fecha, idx_glucosa, el FULLTEXT ft_nombre de
+# pacientes y, para palabras cortas que FULLTEXT no indexa, idx_nombre (prefijo)
+_SUBCONSULTAS_TEXTO = {
+    'id': "SELECT idBitacora FROM bitacora WHERE idBitacora = %s",
+    'fecha': "SELECT idBitacora FROM bitacora WHERE fecha = %s",
+    'valor': "SELECT idBitacora FROM bitacora WHERE glucosa = %s",
+    'nombre': """SELECT b2.idBitacora FROM pacientes p2
+                 INNER JOIN bitacora b2 ON b2.idPaciente = p2.idPaciente
+                 WHERE MATCH(p2.nombreCompleto) AGAINST (%s IN BOOLEAN MODE)""",
+    'prefijo': """SELECT b2.idBitacora FROM pacientes p2
+                  INNER JOIN bitacora b2 ON b2.idPaciente = p2.idPaciente
+                  WHERE p2.nombreCompleto LIKE %s""",
+}
+
+# Tamaño mínimo de palabra indexada por FULLTEXT en InnoDB (innodb_ft_min_token_size)
+_LONGITUD_MINIMA_TOKEN = 3
+_ID_MAXIMO = 2147483647
 
+
+def analizar_busqueda(texto: str) -> List[List[Tuple[str, Any]]]:
+    """
+    Separa una búsqueda libre en términos tipados.
+
+    Cada término es una lista de interpretaciones alternativas (OR), por
+    ejemplo "112" puede ser un idBitacora o un valor de glucosa. Los
+    términos entre sí se combinan con AND. Las palabras se agrupan en un
+    único término de nombre para la búsqueda FULLTEXT; si solo hay palabras
+    más cortas que _LONGITUD_MINIMA_TOKEN (que FULLTEXT no indexa) se buscan
+    como prefijo del nombre del paciente.
+
+    Args:
+        texto: Texto capturado por el usuario
+
+    Returns:
+        Lista de términos; vacía si el texto no contiene nada que buscar
+    """
+    terminos = []
+    palabras = []
+    cortas = []
+    for parte in (texto or '').split():
+        fecha = _interpretar_fecha(parte)
+        if fecha:
+            terminos.append([('fecha', fecha)])
+            continue
+        if parte.isdigit():
+            interpretaciones = [('valor', Decimal(parte))]
+            if int(parte) <= _ID_MAXIMO:
+                interpretaciones.insert(0, ('id', int(parte)))
+            terminos.append(interpretaciones)
+            continue
+        if re.fullmatch(r"\d+[.,]\d+", parte):
+            try:
+                terminos.append([('valor', Decimal(parte.replace(',', '.')))])
+                continue
+            except InvalidOperation:
+                pass
+        for palabra in re.findall(r"\w+", parte):
+            (palabras if len(palabra) >= _LONGITUD_MINIMA_TOKEN else cortas).append(palabra)
+
+    if palabras:
+        terminos.append([('nombre', ' '.join(f"+{p}*" for p in palabras))])
+    elif cortas:
+        # Sin palabras indexables se busca el inicio del nombre (índice idx_nombre)
+        # en lugar de ignorar el texto y devolver todos los registros
+        terminos.append([('prefijo', _escapar_like(' '.join(cortas)) + '%')])
+    return terminos
+
+
+def _escapar_like(texto: str) -> str:
+    """Escapa los comodines de LIKE (% y _) y la barra invertida."""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _interpretar_fecha(parte: str) -> Optional[date]:
+    """Interpreta una fecha ISO (AAAA-MM-DD) o en formato DD/MM/AAAA."""
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
         try:
-            cursor = connection.cursor(dictionary=True)
-            # Buscamos registros donde el mes coincida filtrando primero por idPaciente
-            if id_paciente:
-                sql = """
-                SELECT b.*, p.nombreCompleto as paciente
-                FROM bitacora b
-                LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
-                WHERE MONTH(b.fecha) = %s AND b.idPaciente = %s
-                ORDER BY b.idBitacora DESC;
-                """
-                val = (mes, id_paciente)
-            elif id_usuario is not None:
-                # Buscar por idUsuario a través de la relación con pacientes
-                sql = """
-                SELECT b.*, p.nombreCompleto as paciente
-                FROM bitacora b
-                LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
-                WHERE MONTH(b.fecha) = %s AND p.idUsuario = %s
-                ORDER BY b.idBitacora DESC;
-                """
-                val = (mes, id_usuario)
-            else:
-                sql = """
-                SELECT b.*, p.nombreCompleto as paciente
-                FROM bitacora b
-                LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
-                WHERE MONTH(b.fecha) = %s
-                ORDER BY b.idBitacora DESC;
-                """
-                val = (mes,)
-            
-            cursor.execute(sql, val)
-            registros = cursor.fetchall()
-            
-            if cursor:
-                cursor.close()
-                
-            return registros
-            
-        except mysql.connector.errors.ProgrammingError as error:
-            return []
-        except Exception as error:
-            return []
+            return datetime.strptime(parte, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _consulta_texto(terminos: List[List[Tuple[str, Any]]], params: Dict[str, Any],
+                    rango: Optional[Tuple[date, date]] = None) -> Tuple[str, tuple]:
+    """
+    Construye la consulta de búsqueda por texto a partir de términos tipados.
+
+    Cada término se resuelve en una tabla derivada (UNION de subconsultas
+    indexadas) y las tablas derivadas se intersectan con INNER JOIN, de modo
+    que el costo depende de las coincidencias y no del tamaño de la tabla.
+
+    Args:
+        terminos: Resultado de `analizar_busqueda` (no vacío)
+        params: Parámetros de búsqueda (filtros de paciente/usuario y paginación)
+        rango: Rango semiabierto de fechas opcional
+
+    Returns:
+        Tupla (sql, valores)
+    """
+    derivadas = []
+    val = ()
+    for i, interpretaciones in enumerate(terminos):
+        union = " UNION ".join(_SUBCONSULTAS_TEXTO[tipo] for tipo, _ in interpretaciones)
+        val += tuple(valor for _, valor in interpretaciones)
+        if i == 0:
+            derivadas.append(f"({union}) t0")
+        else:
+            derivadas.append(f"INNER JOIN ({union}) t{i} ON t{i}.idBitacora = t0.idBitacora")
+
+    condiciones = []
+    if params.get('id_paciente'):
+        condiciones.append("b.idPaciente = %s")
+        val += (params['id_paciente'],)
+    elif params.get('id_usuario') is not None:
+        condiciones.append("p.idUsuario = %s")
+        val += (params['id_usuario'],)
+    if rango:
+        condiciones.append("b.fecha >= %s AND b.fecha < %s")
+        val += rango
+
+    condicion, limite, val_condicion, val_limite = _paginacion_sql(params)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else "WHERE 1 = 1"
+    sql = f"""
+    SELECT b.*, p.nombreCompleto as paciente
+    FROM {' '.join(derivadas)}
+    INNER JOIN bitacora b ON b.idBitacora = t0.idBitacora
+    LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
+    {where}{condicion}
+    ORDER BY b.idBitacora DESC{limite};
+    """
+    return sql, val + val_condicion + val_limite
 
 
 class BitacoraSearchByText(BitacoraSearchStrategy):
     """
     Estrategia de búsqueda por texto general.
-    Busca en los campos idBitacora, fecha y glucosa.
+    Interpreta el texto como idBitacora, fecha, glucosa o nombre del paciente
+    y resuelve cada parte con su propio índice.
     """
 
-    def search(self, connection, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Busca registros de bitácora por texto."""
-        busqueda = params.get('busqueda', '')
-        busqueda = f"%{busqueda}%"
-
-        try:
-            cursor = connection.cursor(dictionary=True)
-            sql = """
-            SELECT b.*, p.nombreCompleto as paciente
-            FROM bitacora b
-            LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
-            WHERE 
-                b.idBitacora LIKE %s OR
-                b.fecha LIKE %s OR
-                b.glucosa LIKE %s OR
-                p.nombreCompleto LIKE %s
-            ORDER BY b.idBitacora DESC;
-            """
-            val = (busqueda, busqueda, busqueda, busqueda)
-            
-            cursor.execute(sql, val)
-            registros = cursor.fetchall()
-            
-            if cursor:
-                cursor.close()
-                
-            return registros
-            
-        except mysql.connector.errors.ProgrammingError as error:
-            return []
-        except Exception as error:
-            return []
+    def construir_consulta(self, params: Dict[str, Any]) -> Optional[Tuple[str, tuple]]:
+        """Construye la búsqueda de registros de bitácora por texto."""
+        terminos = analizar_busqueda(params.get('busqueda', ''))
+        if not terminos:
+            return None
+        return _consulta_texto(terminos, params)
 
 
 class BitacoraSearchByMonthAndText(BitacoraSearchStrategy):
     """
     Estrategia de búsqueda combinada: por mes y texto.
-    Filtra por mes y además busca texto en los campos.
+    Filtra por el rango de fechas del mes y además busca texto en los campos.
     """
 
-    def search(self, connection, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Busca registros de bitácora por mes y texto."""
+    def construir_consulta(self, params: Dict[str, Any]) -> Optional[Tuple[str, tuple]]:
+        """Construye la búsqueda de registros de bitácora por mes y texto."""
         mes = params.get('mes')
         año = params.get('año')
-        busqueda = params.get('busqueda', '')
-        busqueda = f"%{busqueda}%"
 
         if not mes or not año:
             # Si no hay mes, usar búsqueda por texto solamente
-            strategy = BitacoraSearchByText()
-            return strategy.search(connection, params)
+            return BitacoraSearchByText().construir_consulta(params)
 
-        try:
-            cursor = connection.cursor(dictionary=True)
-            sql = """
-            SELECT *
-            FROM bitacora
-            WHERE 
-                YEAR(fecha) = %s AND MONTH(fecha) = %s
-                AND (
-                    idBitacora LIKE %s OR
-                    fecha LIKE %s OR
-                    glucosa LIKE %s
-                )
-            ORDER BY idBitacora DESC;
-            """
-            val = (año, mes, busqueda, busqueda, busqueda)
-            
-            cursor.execute(sql, val)
-            registros = cursor.fetchall()
-            
-            if cursor:
-                cursor.close()
-                
-            return registros
-            
-        except mysql.connector.errors.ProgrammingError as error:
-            return []
-        except Exception as error:
-            return []
+        terminos = analizar_busqueda(params.get('busqueda', ''))
+        if not terminos:
+            # Hay texto pero nada que buscar (solo signos): ningún registro
+            # coincide, no se devuelve el mes completo
+            return None
+
+        return _consulta_texto(terminos, params, rango_mes(año, mes))
 
 
 class BitacoraSearchFactory:
@@ -223,11 +650,20 @@ class BitacoraSearchFactory:
         Args:
             params: Diccionario con los parámetros de búsqueda
                    - 'mes': mes a buscar (requerido)
+                   - 'año': año del mes a buscar (requerido junto con 'mes')
+                   - 'limite': máximo de registros a devolver (opcional)
+                   - 'despues': idBitacora a partir del cual continuar, exclusivo (opcional)
+                   - 'busqueda': texto libre a buscar (opcional)
         
         Returns:
             Instancia de la estrategia de búsqueda apropiada
         """
         mes = params.get('mes')
+        busqueda = (params.get('busqueda') or '').strip()
+        
+        # Si hay mes y texto, combinar ambos filtros
+        if mes and busqueda:
+            return BitacoraSearchByMonthAndText()
         
         # Si hay mes, buscar por mes
         if mes:
@@ -246,8 +682,17 @@ class BitacoraDecorator(ABC):
     """
     Clase base abstracta para los decoradores de bitácora.
     Patrón Decorator para agregar funcionalidades adicionales.
+    
+    Los decoradores que implementan el procesamiento por fila
+    (`iniciar`, `procesar_fila` y `finalizar`) pueden compilarse en un
+    BitacoraPipelineDecorator que recorre los registros una sola vez.
     """
     
+    # Indica si el decorador implementa el procesamiento por fila
+    soporta_fila = False
+    # Indica si `finalizar` devuelve una lista de registros (y no un resumen)
+    produce_lista = True
+    
     def __init__(self, component):
         self._component = component
     
@@ -255,6 +700,18 @@ class BitacoraDecorator(ABC):
     def process(self, data: Any) -> Any:
         """Procesa los datos según la funcionalidad del decorador."""
         pass
+    
+    def iniciar(self) -> Any:
+        """Crea el estado que el decorador acumula durante una pasada."""
+        return None
+    
+    def procesar_fila(self, registro: Dict[str, Any], estado: Any) -> Optional[Dict[str, Any]]:
+        """Procesa un registro; devuelve None para descartarlo."""
+        return registro
+    
+    def finalizar(self, registros: List[Dict[str, Any]], estado: Any) -> Any:
+        """Produce el resultado a partir de los registros procesados."""
+        return registros
 
 
 class BitacoraValidationDecorator(BitacoraDecorator):
@@ -263,6 +720,10 @@ class BitacoraValidationDecorator(BitacoraDecorator):
     Valida que los registros tengan los campos requeridos y valores válidos.
     """
     
+    soporta_fila = True
+    CAMPOS_NUMERICOS = ('drenajeInicial', 'ufTotal', 'tiempoMedioPerm',
+                        'liquidoIngerido', 'cantidadOrina', 'glucosa')
+    
     def process(self, registros: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Valida y filtra registros inválidos."""
         # Procesar con el componente anterior si existe
@@ -279,6 +740,10 @@ class BitacoraValidationDecorator(BitacoraDecorator):
         
         return registros_validos
     
+    def procesar_fila(self, registro: Dict[str, Any], estado: Any) -> Optional[Dict[str, Any]]:
+        """Devuelve el registro si es válido o None para descartarlo."""
+        return registro if self._validar_registro(registro) else None
+    
     def _validar_registro(self, registro: Dict[str, Any]) -> bool:
         """Valida que un registro tenga los campos mínimos requeridos."""
         # Validar que tenga fecha (campo requerido)
@@ -289,12 +754,10 @@ class BitacoraValidationDecorator(BitacoraDecorator):
             return False
         
         # Validar que los valores numéricos sean válidos si existen
-        campos_numericos = ['drenajeInicial', 'ufTotal', 'tiempoMedioPerm', 
-                           'liquidoIngerido', 'cantidadOrina', 'glucosa']
-        
-        for campo in campos_numericos:
+        for campo in self.CAMPOS_NUMERICOS:
             valor = registro.get(campo)
-            if valor is not None:
+            # Los valores que ya vienen tipados desde la BD no requieren conversión
+            if valor is not None and not isinstance(valor, (Decimal, int, float)):
                 try:
                     float(valor)
                 except (ValueError, TypeError):
@@ -309,6 +772,8 @@ class BitacoraDateFormatDecorator(BitacoraDecorator):
     Convierte las fechas a un formato legible.
     """
     
+    soporta_fila = True
+    
     def __init__(self, component, formato_fecha: str = "%d/%m/%Y"):
         super().__init__(component)
         self.formato_fecha = formato_fecha
@@ -322,30 +787,39 @@ class BitacoraDateFormatDecorator(BitacoraDecorator):
         if not isinstance(registros, list):
             return []
         
-        registros_formateados = []
-        for registro in registros.copy():
-            registro_formateado = registro.copy()
-            
-            # Formatear fecha
-            if registro_formateado.get('fecha'):
-                try:
-                    fecha_obj = datetime.strptime(str(registro_formateado['fecha']), "%Y-%m-%d")
-                    registro_formateado['fecha_formateada'] = fecha_obj.strftime(self.formato_fecha)
-                except (ValueError, TypeError):
-                    registro_formateado['fecha_formateada'] = registro_formateado['fecha']
-            
-            # Formatear fechaCreacion y fechaActualizacion si existen
-            for campo_fecha in ['fechaCreacion', 'fechaActualizacion']:
-                if registro_formateado.get(campo_fecha):
-                    try:
-                        fecha_obj = datetime.strptime(str(registro_formateado[campo_fecha]), "%Y-%m-%d %H:%M:%S")
-                        registro_formateado[f'{campo_fecha}_formateada'] = fecha_obj.strftime("%d/%m/%Y %H:%M")
-                    except (ValueError, TypeError):
-                        registro_formateado[f'{campo_fecha}_formateada'] = registro_formateado[campo_fecha]
-            
-            registros_formateados.append(registro_formateado)
+        # En la cadena clásica se trabaja sobre copias para no alterar la entrada
+        return [self.procesar_fila(registro.copy(), None) for registro in registros]
+    
+    def procesar_fila(self, registro: Dict[str, Any], estado: Any) -> Dict[str, Any]:
+        """Agrega los campos *_formateada al registro (lo modifica en sitio)."""
+        # Formatear fecha
+        fecha = registro.get('fecha')
+        if fecha:
+            registro['fecha_formateada'] = self._formatear(fecha, date, "%Y-%m-%d", self.formato_fecha)
+        
+        # Formatear fechaCreacion y fechaActualizacion si existen
+        for campo_fecha in ('fechaCreacion', 'fechaActualizacion'):
+            valor = registro.get(campo_fecha)
+            if valor:
+                registro[f'{campo_fecha}_formateada'] = self._formatear(
+                    valor, datetime, "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M"
+                )
         
-        return registros_formateados
+        return registro
+    
+    @staticmethod
+    def _formatear(valor: Any, tipo: type, formato_entrada: str, formato_salida: str) -> Any:
+        """
+        Formatea un valor de fecha. Los objetos date/datetime que ya vienen de
+        la BD se formatean directamente; el resto se interpreta como texto.
+        Si no es posible, se conserva el valor original.
+        """
+        if type(valor) is tipo and not getattr(valor, 'microsecond', 0):
+            return valor.strftime(formato_salida)
+        try:
+            return datetime.strptime(str(valor), formato_entrada).strftime(formato_salida)
+        except (ValueError, TypeError):
+            return valor
 
 
 class BitacoraCountDecorator(BitacoraDecorator):
@@ -354,6 +828,9 @@ class BitacoraCountDecorator(BitacoraDecorator):
     Agrega información sobre el total de registros.
     """
     
+    soporta_fila = True
+    produce_lista = False
+    
     def process(self, registros: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Agrega el conteo de registros a los resultados."""
         # Procesar con el componente anterior si existe
@@ -372,23 +849,122 @@ class BitacoraCountDecorator(BitacoraDecorator):
                 'metadata': {}
             }
         
+        estado = self.iniciar()
+        for registro in registros:
+            self.procesar_fila(registro, estado)
+        return self.finalizar(registros, estado)
+    
+    def iniciar(self) -> Dict[str, int]:
+        """Crea los contadores de campos importantes."""
+        return {'con_glucosa': 0, 'con_presion': 0, 'con_uf_total': 0}
+    
+    def procesar_fila(self, registro: Dict[str, Any], estado: Dict[str, int]) -> Dict[str, Any]:
+        """Cuenta los campos importantes del registro."""
+        if registro.get('glucosa') is not None:
+            estado['con_glucosa'] += 1
+        if registro.get('presionArterial') is not None:
+            estado['con_presion'] += 1
+        if registro.get('ufTotal') is not None:
+            estado['con_uf_total'] += 1
+        return registro
+    
+    def finalizar(self, registros: List[Dict[str, Any]], estado: Dict[str, int]) -> Dict[str, Any]:
+        """Construye el resultado con el total y los metadatos."""
         total = len(registros)
         
-        # Calcular estadísticas básicas si hay registros
-        metadata = {}
-        if total > 0:
-            # Contar registros con valores en campos importantes
-            metadata['con_glucosa'] = sum(1 for r in registros if r.get('glucosa') is not None)
-            metadata['con_presion'] = sum(1 for r in registros if r.get('presionArterial') is not None)
-            metadata['con_uf_total'] = sum(1 for r in registros if r.get('ufTotal') is not None)
-        
+        # Las estadísticas básicas solo se agregan si hay registros
         return {
             'registros': registros,
             'total': total,
-            'metadata': metadata
+            'metadata': dict(estado) if total > 0 else {}
         }
 
 
+class BitacoraPipelineDecorator(BitacoraDecorator):
+    """
+    Decorator que fusiona una cadena de decoradores en una sola pasada.
+    Cada registro atraviesa todas las etapas (en el orden de la cadena) sin
+    copias intermedias, y el resultado es el mismo que el de la cadena clásica.
+    """
+    
+    def __init__(self, component: BitacoraDecorator):
+        """
+        Args:
+            component: El último decorador de la cadena a fusionar
+        """
+        super().__init__(component)
+        self._etapas = self._linealizar(component)
+    
+    @classmethod
+    def compilar(cls, decorator: Optional[BitacoraDecorator]) -> Optional[BitacoraDecorator]:
+        """
+        Compila la cadena en un pipeline si todas sus etapas lo permiten;
+        si no, devuelve la cadena original.
+        
+        Args:
+            decorator: El último decorador de la cadena
+        
+        Returns:
+            BitacoraPipelineDecorator o el decorador original
+        """
+        if decorator is None or isinstance(decorator, cls):
+            return decorator
+        etapas = cls._linealizar(decorator)
+        if not all(etapa.soporta_fila for etapa in etapas):
+            return decorator
+        # Solo la última etapa puede convertir la lista en un resumen
+        if not all(etapa.produce_lista for etapa in etapas[:-1]):
+            return decorator
+        return cls(decorator)
+    
+    def process(self, registros: List[Dict[str, Any]]) -> Any:
+        """Aplica todas las etapas a cada registro en una sola pasada."""
+        if not isinstance(registros, list):
+            # Entradas atípicas: conservar el comportamiento de la cadena clásica
+            return self._component.process(registros)
+        
+        etapas = [(etapa, etapa.iniciar()) for etapa in self._etapas]
+        procesados = []
+        for registro in registros:
+            for etapa, estado in etapas:
+                registro = etapa.procesar_fila(registro, estado)
+                if registro is None:
+                    break
+            else:
+                procesados.append(registro)
+        
+        resultado = procesados
+        for etapa, estado in etapas:
+            resultado = etapa.finalizar(resultado, estado)
+        return resultado
+    
+    def procesar_flujo(self, registros: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Aplica las etapas fila por fila sobre un iterable y entrega cada
+        registro en cuanto se procesa. Las etapas de resumen (las que no
+        producen lista, como el conteo) se omiten.
+        """
+        etapas = [(etapa, etapa.iniciar()) for etapa in self._etapas if etapa.produce_lista]
+        for registro in registros:
+            for etapa, estado in etapas:
+                registro = etapa.procesar_fila(registro, estado)
+                if registro is None:
+                    break
+            else:
+                yield registro
+    
+    @staticmethod
+    def _linealizar(decorator: BitacoraDecorator) -> List[BitacoraDecorator]:
+        """Obtiene las etapas de la cadena, de la más interna a la más externa."""
+        etapas = []
+        actual = decorator
+        while actual is not None:
+            etapas.append(actual)
+            actual = actual._component
+        etapas.reverse()
+        return etapas
+
+
 # ============================================================================
 # PATRÓN OBSERVER
 # ============================================================================
@@ -397,38 +973,247 @@ class BitacoraObserver(ABC):
     """
     Interfaz abstracta para los observadores de bitácora.
     Patrón Observer para notificar cambios en los registros.
+    `asincrono` indica si, por defecto, se notifica desde el despachador en
+    segundo plano en lugar de dentro de la petición. `requiere_anterior`
+    pide al Facade que incluya en las modificaciones y bajas el idPaciente
+    y la fecha que tenía el registro antes del cambio ('anterior').
     """
     
+    asincrono = False
+    requiere_anterior = False
+    
     @abstractmethod
     def update(self, event_type: str, data: Dict[str, Any]):
         """
         Se llama cuando ocurre un evento en la bitácora.
         
         Args:
-            event_type: Tipo de evento ('created', 'updated', 'deleted')
-            data: Datos del evento (contiene 'id' y posiblemente 'datos')
+            event_type: Tipo de evento ('created', 'updated', 'deleted' o 'batch')
+            data: Datos del evento (contiene 'id' y posiblemente 'datos'). En los
+                  eventos 'batch' contiene 'eventos': lista de dicts con 'tipo',
+                  'id' y posiblemente 'datos', uno por cada cambio del lote
         """
         pass
 
 
+class BitacoraDespachador:
+    """
+    Despachador asíncrono de eventos para los observadores.
+    Encola las notificaciones en una cola acotada que atiende un grupo de
+    hilos, de modo que los observadores lentos no alargan las peticiones.
+    Cuando la cola está llena aplica la política configurada:
+    'bloquear' (espera hasta timeout_bloqueo y después notifica en línea),
+    'descartar' (pierde el evento) o 'sincrono' (notifica en línea).
+    Al terminar el proceso drena la cola pendiente.
+    """
+    
+    POLITICAS = ('bloquear', 'descartar', 'sincrono')
+    
+    def __init__(self, num_hilos: int = 2, max_cola: int = 1000,
+                 politica: str = 'bloquear', timeout_bloqueo: float = 1.0):
+        """
+        Args:
+            num_hilos: Hilos que atienden la cola
+            max_cola: Máximo de eventos pendientes
+            politica: Política cuando la cola está llena ('bloquear', 'descartar' o 'sincrono')
+            timeout_bloqueo: Segundos de espera de la política 'bloquear'
+        """
+        if politica not in self.POLITICAS:
+            raise ValueError(f"Política no soportada: {politica}")
+        self.num_hilos = num_hilos
+        self.politica = politica
+        self.timeout_bloqueo = timeout_bloqueo
+        self._cola: queue.Queue = queue.Queue(maxsize=max_cola)
+        self._hilos: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._cerrado = False
+        # Métricas
+        self.encolados = 0
+        self.procesados = 0
+        self.descartados = 0
+        self.en_linea = 0
+        self.errores = 0
+        self.profundidad_maxima = 0
+    
+    def enviar(self, observer: BitacoraObserver, event_type: str, data: Dict[str, Any]) -> bool:
+        """
+        Encola la notificación de un observador.
+        
+        Returns:
+            True si el evento se entregó (encolado o en línea), False si se descartó
+        """
+        if self._cerrado:
+            # Tras el cierre ya no hay hilos: notificar en línea
+            self._notificar(observer, event_type, data)
+            with self._lock:
+                self.en_linea += 1
+            return True
+        self._iniciar()
+        
+        tarea = (observer, event_type, data)
+        try:
+            if self.politica == 'bloquear':
+                self._cola.put(tarea, timeout=self.timeout_bloqueo)
+            else:
+                self._cola.put_nowait(tarea)
+        except queue.Full:
+            if self.politica == 'descartar':
+                with self._lock:
+                    self.descartados += 1
+                print(f"[BitacoraDespachador] Cola llena, evento {event_type} descartado")
+                return False
+            self._notificar(observer, event_type, data)
+            with self._lock:
+                self.en_linea += 1
+            return True
+        
+        with self._lock:
+            self.encolados += 1
+            self.profundidad_maxima = max(self.profundidad_maxima, self._cola.qsize())
+        return True
+    
+    def esperar(self, timeout: float = 5.0) -> bool:
+        """
+        Espera a que se procesen los eventos pendientes sin detener los hilos.
+        
+        Args:
+            timeout: Segundos máximos de espera
+        
+        Returns:
+            True si la cola quedó vacía
+        """
+        limite = time.monotonic() + timeout
+        with self._cola.all_tasks_done:
+            while self._cola.unfinished_tasks:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._cola.all_tasks_done.wait(restante)
+            return not self._cola.unfinished_tasks
+    
+    def drenar(self, timeout: float = 5.0) -> bool:
+        """
+        Espera a que se procesen los eventos pendientes y detiene los hilos.
+        
+        Args:
+            timeout: Segundos máximos de espera
+        
+        Returns:
+            True si la cola quedó vacía
+        """
+        with self._lock:
+            if self._cerrado:
+                return True
+            self._cerrado = True
+            hilos = list(self._hilos)
+        
+        limite = time.monotonic() + timeout
+        with self._cola.all_tasks_done:
+            while self._cola.unfinished_tasks:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._cola.all_tasks_done.wait(restante)
+            vacia = not self._cola.unfinished_tasks
+        
+        for _ in hilos:
+            try:
+                self._cola.put_nowait(None)
+            except queue.Full:
+                break
+        for hilo in hilos:
+            hilo.join(max(0.0, limite - time.monotonic()))
+        if not vacia:
+            print(f"[BitacoraDespachador] {self._cola.qsize()} eventos sin procesar al cerrar")
+        return vacia
+    
+    def metricas(self) -> Dict[str, Any]:
+        """Obtiene la profundidad de la cola y los contadores del despachador."""
+        with self._lock:
+            return {
+                'profundidad': self._cola.qsize(),
+                'max_cola': self._cola.maxsize,
+                'profundidad_maxima': self.profundidad_maxima,
+                'hilos': len(self._hilos),
+                'politica': self.politica,
+                'encolados': self.encolados,
+                'procesados': self.procesados,
+                'descartados': self.descartados,
+                'en_linea': self.en_linea,
+                'errores': self.errores,
+                'cerrado': self._cerrado
+            }
+    
+    def _iniciar(self):
+        """Arranca los hilos la primera vez que se encola un evento."""
+        if self._hilos:
+            return
+        with self._lock:
+            if self._hilos or self._cerrado:
+                return
+            for i in range(self.num_hilos):
+                hilo = threading.Thread(target=self._atender, name=f"bitacora-observador-{i}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+            atexit.register(self.drenar)
+    
+    def _atender(self):
+        """Bucle de cada hilo: procesa eventos hasta recibir la señal de cierre (None)."""
+        while True:
+            tarea = self._cola.get()
+            try:
+                if tarea is None:
+                    return
+                observer, event_type, data = tarea
+                if self._notificar(observer, event_type, data):
+                    with self._lock:
+                        self.procesados += 1
+            finally:
+                self._cola.task_done()
+    
+    def _notificar(self, observer: BitacoraObserver, event_type: str, data: Dict[str, Any]) -> bool:
+        """Notifica a un observador sin propagar sus errores."""
+        try:
+            with METRICA_OBSERVADORES.cronometrar(type(observer).__name__, 'asincrono'):
+                observer.update(event_type, data)
+            return True
+        except Exception as e:
+            # No fallar si un observador tiene error
+            with self._lock:
+                self.errores += 1
+            print(f"Error en observador: {e}")
+            return False
+
+
 class BitacoraSubject:
     """
     Sujeto observable que notifica a los observadores cuando ocurren eventos.
     Mantiene una lista de observadores y los notifica cuando hay cambios.
+    Los observadores asíncronos se notifican a través del despachador, si
+    hay uno configurado; los demás, dentro de la llamada a notify.
     """
     
-    def __init__(self):
+    def __init__(self, despachador: Optional[BitacoraDespachador] = None):
         self._observers: List[BitacoraObserver] = []
+        self._asincronos: set = set()
+        self.despachador = despachador
     
-    def attach(self, observer: BitacoraObserver):
+    def attach(self, observer: BitacoraObserver, asincrono: Optional[bool] = None):
         """
         Agrega un observador a la lista.
         
         Args:
             observer: Instancia de un observador
+            asincrono: Notificarlo en segundo plano (por defecto, observer.asincrono)
         """
         if observer not in self._observers:
             self._observers.append(observer)
+        if asincrono is None:
+            asincrono = observer.asincrono
+        if asincrono:
+            self._asincronos.add(observer)
+        else:
+            self._asincronos.discard(observer)
     
     def detach(self, observer: BitacoraObserver):
         """
@@ -439,18 +1224,28 @@ class BitacoraSubject:
         """
         if observer in self._observers:
             self._observers.remove(observer)
+        self._asincronos.discard(observer)
+    
+    @property
+    def requiere_anterior(self) -> bool:
+        """Indica si algún observador necesita el estado anterior de los registros."""
+        return any(observer.requiere_anterior for observer in self._observers)
     
     def notify(self, event_type: str, data: Dict[str, Any]):
         """
         Notifica a todos los observadores sobre un evento.
         
         Args:
-            event_type: Tipo de evento ('created', 'updated', 'deleted')
+            event_type: Tipo de evento ('created', 'updated', 'deleted' o 'batch')
             data: Datos del evento
         """
         for observer in self._observers:
+            if self.despachador is not None and observer in self._asincronos:
+                self.despachador.enviar(observer, event_type, data)
+                continue
             try:
-                observer.update(event_type, data)
+                with METRICA_OBSERVADORES.cronometrar(type(observer).__name__, 'sincrono'):
+                    observer.update(event_type, data)
             except Exception as e:
                 # No fallar si un observador tiene error
                 print(f"Error en observador: {e}")
@@ -463,70 +1258,407 @@ class BitacoraLogObserver(BitacoraObserver):
     Solo notifica a usuarios con tipo_usuario = 1.
     """
     
-    def update(self, event_type: str, data: Dict[str, Any]):
+    asincrono = True
+    
+    def update(self, event_type: str, data: Dict[str, Any]):
+        """
+        Registra el evento en el log solo si el usuario es tipo 1.
+        
+        Args:
+            event_type: Tipo de evento
+            data: Datos del evento (debe incluir 'tipo_usuario')
+        """
+        tipo_usuario = data.get('tipo_usuario')
+        
+        # Solo mostrar mensajes a usuarios tipo 1
+        if tipo_usuario != 1:
+            return
+        
+        if event_type == 'batch':
+            mensaje = f"[BITACORA LOG] Evento: BATCH, Cambios: {len(data.get('eventos', []))}"
+        else:
+            registro_id = data.get('id', 'N/A')
+            mensaje = f"[BITACORA LOG] Evento: {event_type.upper()}, Registro ID: {registro_id}"
+        print(mensaje)
+
+
+class BitacoraNotificationObserver(BitacoraObserver):
+    """
+    Observador concreto que envía notificaciones sobre eventos.
+    Puede extenderse para integrar con sistemas de notificaciones.
+    Solo notifica a usuarios con tipo_usuario = 1.
+    """
+    
+    asincrono = True
+    
+    def update(self, event_type: str, data: Dict[str, Any]):
+        """
+        Envía una notificación sobre el evento solo si el usuario es tipo 1.
+        
+        Args:
+            event_type: Tipo de evento
+            data: Datos del evento (debe incluir 'tipo_usuario')
+        """
+        tipo_usuario = data.get('tipo_usuario')
+        
+        # Solo mostrar notificaciones a usuarios tipo 1
+        if tipo_usuario != 1:
+            return
+        
+        registro_id = data.get('id', 'N/A')
+        
+        if event_type == 'created':
+            mensaje = f"Notificación: Nuevo registro de bitácora creado (ID: {registro_id})"
+        elif event_type == 'updated':
+            mensaje = f"Notificación: Registro de bitácora actualizado (ID: {registro_id})"
+        elif event_type == 'deleted':
+            mensaje = f"Notificación: Registro de bitácora eliminado (ID: {registro_id})"
+        elif event_type == 'batch':
+            mensaje = f"Notificación: Lote de {len(data.get('eventos', []))} cambios en la bitácora"
+        else:
+            mensaje = f"Notificación: Evento desconocido '{event_type}' en registro (ID: {registro_id})"
+        
+        print(mensaje)
+
+
+# ============================================================================
+# CACHÉ DE RESULTADOS POR MES
+# ============================================================================
+
+class BitacoraCacheMes:
+    """
+    Caché LRU con caducidad (TTL) de los resultados de `buscar_por_mes`.
+    Las entradas se indexan por (año, mes) y por idBitacora para poder
+    expulsar exactamente las afectadas por cada evento de escritura.
+    """
+    
+    def __init__(self, max_entradas: int = 256, ttl: float = 300.0):
+        """
+        Args:
+            max_entradas: Número máximo de resultados almacenados
+            ttl: Segundos de vida de cada entrada
+        """
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._por_mes: Dict[Tuple[int, int], set] = {}
+        self._por_registro: Dict[int, set] = {}
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        # Se incrementa en cada invalidación para no guardar lecturas que
+        # comenzaron antes de una escritura concurrente
+        self.generacion = 0
+    
+    @staticmethod
+    def crear_clave(año: int, mes: int, id_usuario: Optional[int], id_paciente: Optional[int],
+                    **extra) -> tuple:
+        """
+        Construye la clave de caché. El alcance sigue la misma prioridad que
+        la estrategia de búsqueda: paciente, después usuario, después todos.
+        """
+        if id_paciente:
+            alcance = ('paciente', id_paciente)
+        elif id_usuario is not None:
+            alcance = ('usuario', id_usuario)
+        else:
+            alcance = ('todos', None)
+        return (año, mes, alcance) + tuple(sorted(extra.items()))
+    
+    def obtener(self, clave: tuple) -> Optional[Dict[str, Any]]:
+        """Obtiene un resultado vigente de la caché (None si no existe o caducó)."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    self._eliminar(clave)
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+    
+    def guardar(self, clave: tuple, resultado: Dict[str, Any], ids_registros: List[int],
+                generacion: Optional[int] = None):
         """
-        Registra el evento en el log solo si el usuario es tipo 1.
+        Guarda un resultado en la caché.
         
         Args:
-            event_type: Tipo de evento
-            data: Datos del evento (debe incluir 'tipo_usuario')
+            clave: Clave generada con `crear_clave`
+            resultado: Resultado final (ya decorado) de la búsqueda
+            ids_registros: idBitacora de los registros incluidos en el resultado
+            generacion: Valor de `generacion` leído antes de consultar la BD;
+                        si hubo invalidaciones desde entonces no se guarda
         """
-        tipo_usuario = data.get('tipo_usuario')
-        
-        # Solo mostrar mensajes a usuarios tipo 1
-        if tipo_usuario != 1:
+        ids = set(ids_registros)
+        with self._lock:
+            if generacion is not None and generacion != self.generacion:
+                return
+            if clave in self._entradas:
+                self._eliminar(clave)
+            self._entradas[clave] = (time.monotonic() + self.ttl, resultado, ids)
+            self._por_mes.setdefault(clave[:2], set()).add(clave)
+            for id_bitacora in ids:
+                self._por_registro.setdefault(id_bitacora, set()).add(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._eliminar(next(iter(self._entradas)))
+    
+    def invalidar_registro(self, id_bitacora: int):
+        """Expulsa las entradas que contienen el registro indicado."""
+        with self._lock:
+            self.generacion += 1
+            for clave in list(self._por_registro.get(id_bitacora, ())):
+                self._eliminar(clave)
+    
+    def invalidar_mes(self, año: int, mes: int, id_paciente: Optional[int] = None):
+        """
+        Expulsa las entradas del mes que pueden incluir registros del paciente:
+        las de ese paciente, las filtradas por usuario y las generales.
+        """
+        with self._lock:
+            self.generacion += 1
+            for clave in list(self._por_mes.get((año, mes), ())):
+                tipo, valor = clave[2]
+                if id_paciente is None or tipo != 'paciente' or valor == id_paciente:
+                    self._eliminar(clave)
+    
+    def limpiar(self):
+        """Vacía la caché por completo."""
+        with self._lock:
+            self.generacion += 1
+            self.expulsiones += len(self._entradas)
+            self._entradas.clear()
+            self._por_mes.clear()
+            self._por_registro.clear()
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        """Retorna los contadores de la caché."""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'expulsiones': self.expulsiones,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0
+            }
+    
+    def _eliminar(self, clave: tuple):
+        """Elimina una entrada y sus referencias en los índices (requiere el lock)."""
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None:
             return
-        
-        registro_id = data.get('id', 'N/A')
-        mensaje = f"[BITACORA LOG] Evento: {event_type.upper()}, Registro ID: {registro_id}"
-        print(mensaje)
+        self.expulsiones += 1
+        claves_mes = self._por_mes.get(clave[:2])
+        if claves_mes is not None:
+            claves_mes.discard(clave)
+            if not claves_mes:
+                del self._por_mes[clave[:2]]
+        for id_bitacora in entrada[2]:
+            claves_registro = self._por_registro.get(id_bitacora)
+            if claves_registro is not None:
+                claves_registro.discard(clave)
+                if not claves_registro:
+                    del self._por_registro[id_bitacora]
 
 
-class BitacoraNotificationObserver(BitacoraObserver):
+class BitacoraCacheObserver(BitacoraObserver):
     """
-    Observador concreto que envía notificaciones sobre eventos.
-    Puede extenderse para integrar con sistemas de notificaciones.
-    Solo notifica a usuarios con tipo_usuario = 1.
+    Observador concreto que mantiene coherente la caché de meses.
+    Expulsa las entradas afectadas por cada alta, modificación o baja.
+    Debe notificarse de forma síncrona para no servir resultados obsoletos.
     """
     
+    asincrono = False
+    
+    def __init__(self, cache: BitacoraCacheMes):
+        self.cache = cache
+    
     def update(self, event_type: str, data: Dict[str, Any]):
         """
-        Envía una notificación sobre el evento solo si el usuario es tipo 1.
+        Expulsa de la caché las entradas afectadas por el evento.
         
         Args:
-            event_type: Tipo de evento
-            data: Datos del evento (debe incluir 'tipo_usuario')
+            event_type: Tipo de evento ('created', 'updated', 'deleted' o 'batch')
+            data: Datos del evento ('id' y, en altas y modificaciones, 'datos')
         """
-        tipo_usuario = data.get('tipo_usuario')
-        
-        # Solo mostrar notificaciones a usuarios tipo 1
-        if tipo_usuario != 1:
+        if event_type == 'batch':
+            for evento in data.get('eventos', []):
+                self.update(evento.get('tipo'), evento)
             return
         
-        registro_id = data.get('id', 'N/A')
-        
-        if event_type == 'created':
-            mensaje = f"Notificación: Nuevo registro de bitácora creado (ID: {registro_id})"
-        elif event_type == 'updated':
-            mensaje = f"Notificación: Registro de bitácora actualizado (ID: {registro_id})"
-        elif event_type == 'deleted':
-            mensaje = f"Notificación: Registro de bitácora eliminado (ID: {registro_id})"
-        else:
-            mensaje = f"Notificación: Evento desconocido '{event_type}' en registro (ID: {registro_id})"
+        registro_id = data.get('id')
+        if registro_id is not None:
+            self.cache.invalidar_registro(registro_id)
         
-        print(mensaje)
+        if event_type in ('created', 'updated'):
+            datos = data.get('datos') or {}
+            fecha = datos.get('fecha')
+            if isinstance(fecha, str):
+                try:
+                    fecha = datetime.strptime(fecha, "%Y-%m-%d").date()
+                except ValueError:
+                    fecha = None
+            if isinstance(fecha, date):
+                self.cache.invalidar_mes(fecha.year, fecha.month, datos.get('idPaciente'))
+            else:
+                # Sin fecha reconocible no se puede acotar el mes afectado
+                self.cache.limpiar()
+        elif event_type != 'deleted':
+            self.cache.limpiar()
 
 
 # ============================================================================
 # PATRÓN FACADE
 # ============================================================================
 
+# Columnas editables de un registro, en el orden de las sentencias de escritura
+CAMPOS_REGISTRO = ('fecha', 'horaInicio', 'horaFin', 'drenajeInicial', 'ufTotal',
+                   'tiempoMedioPerm', 'liquidoIngerido', 'cantidadOrina', 'glucosa',
+                   'presionArterial')
+
+SQL_INSERTAR_REGISTRO = """
+INSERT INTO bitacora (fecha, horaInicio, horaFin, drenajeInicial, ufTotal, 
+                     tiempoMedioPerm, liquidoIngerido, cantidadOrina, glucosa, presionArterial, idPaciente)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+SQL_ACTUALIZAR_REGISTRO = """
+UPDATE bitacora 
+SET fecha = %s, horaInicio = %s, horaFin = %s, drenajeInicial = %s, 
+    ufTotal = %s, tiempoMedioPerm = %s, liquidoIngerido = %s, 
+    cantidadOrina = %s, glucosa = %s, presionArterial = %s, idPaciente = %s
+WHERE idBitacora = %s
+"""
+
+# Variantes que verifican la pertenencia dentro de la propia sentencia;
+# se completan con las condiciones de _condiciones_propietario
+SQL_ACTUALIZAR_REGISTRO_PROPIO = """
+UPDATE bitacora b
+INNER JOIN pacientes p ON p.idPaciente = b.idPaciente
+SET b.fecha = %s, b.horaInicio = %s, b.horaFin = %s, b.drenajeInicial = %s, 
+    b.ufTotal = %s, b.tiempoMedioPerm = %s, b.liquidoIngerido = %s, 
+    b.cantidadOrina = %s, b.glucosa = %s, b.presionArterial = %s, b.idPaciente = %s
+WHERE b.idBitacora = %s"""
+
+SQL_ELIMINAR_REGISTRO_PROPIO = """
+DELETE b FROM bitacora b
+INNER JOIN pacientes p ON p.idPaciente = b.idPaciente
+WHERE b.idBitacora = %s"""
+
+
+# INSERT de varias filas: una sentencia (un viaje) por grupo de registros
+SQL_INSERTAR_REGISTROS = """
+INSERT INTO bitacora (fecha, horaInicio, horaFin, drenajeInicial, ufTotal, 
+                     tiempoMedioPerm, liquidoIngerido, cantidadOrina, glucosa, presionArterial, idPaciente)
+VALUES {filas}"""
+_MARCADORES_REGISTRO = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+FILAS_POR_INSERCION = 500
+
+# Capacidades del servidor, detectadas en la primera inserción:
+# 'returning' (INSERT ... RETURNING, MariaDB 10.5+) y 'paso' (incremento entre
+# ids consecutivos de un INSERT de varias filas, o None si no son consecutivos)
+_CAPACIDADES_INSERCION: Dict[str, Any] = {}
+
+
+def insertar_registros(cursor, registros: Iterable[Dict[str, Any]]) -> List[int]:
+    """
+    Inserta registros en la transacción del cursor y devuelve sus ids.
+    
+    Cada grupo de hasta FILAS_POR_INSERCION registros se inserta con un solo
+    INSERT de varias filas. Los ids se obtienen con RETURNING idBitacora
+    cuando el servidor lo admite; si no, se calculan a partir de lastrowid
+    solo si innodb_autoinc_lock_mode garantiza ids consecutivos para la
+    sentencia (modos 0 y 1) y, en el modo intercalado, se inserta fila por
+    fila leyendo lastrowid.
+    
+    Args:
+        cursor: Cursor de la conexión (la transacción la confirma quien llama)
+        registros: Datos de los registros (con 'idPaciente')
+    
+    Returns:
+        Lista de ids en el orden de los registros
+    """
+    filas = [valores_registro(datos, datos['idPaciente']) for datos in registros]
+    ids: List[int] = []
+    for i in range(0, len(filas), FILAS_POR_INSERCION):
+        ids.extend(_insertar_grupo(cursor, filas[i:i + FILAS_POR_INSERCION]))
+    return ids
+
+
+def _insertar_grupo(cursor, filas: List[tuple]) -> List[int]:
+    """Inserta un grupo de filas con una sola sentencia y devuelve sus ids."""
+    sql = SQL_INSERTAR_REGISTROS.format(filas=", ".join([_MARCADORES_REGISTRO] * len(filas)))
+    parametros = tuple(valor for fila in filas for valor in fila)
+    
+    if _CAPACIDADES_INSERCION.get('returning', True):
+        try:
+            cursor.execute(sql + "\nRETURNING idBitacora", parametros)
+            ids = [fila[0] for fila in cursor.fetchall()]
+            _CAPACIDADES_INSERCION['returning'] = True
+            return ids
+        except mysql.connector.Error as error:
+            # 1064: el servidor no reconoce RETURNING (la sentencia no se aplicó)
+            if error.errno != 1064 or 'returning' in _CAPACIDADES_INSERCION:
+                raise
+            _CAPACIDADES_INSERCION['returning'] = False
+    
+    if 'paso' not in _CAPACIDADES_INSERCION:
+        cursor.execute("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment")
+        modo, incremento = cursor.fetchone()
+        _CAPACIDADES_INSERCION['paso'] = int(incremento) if int(modo) < 2 else None
+    paso = _CAPACIDADES_INSERCION['paso']
+    if paso is None:
+        ids = []
+        for fila in filas:
+            cursor.execute(SQL_INSERTAR_REGISTRO, fila)
+            ids.append(cursor.lastrowid)
+        return ids
+    # En los modos 0 y 1 un INSERT de varias filas reserva ids consecutivos
+    # y lastrowid es el primero de ellos
+    cursor.execute(sql, parametros)
+    return [cursor.lastrowid + i * paso for i in range(len(filas))]
+
+
+# Errores de datos de una fila (duplicado, clave foránea, valor fuera de rango
+# o truncado...): solo deshacen la sentencia que los produjo
+ERRORES_DE_FILA = frozenset((1048, 1062, 1216, 1264, 1265, 1292, 1366, 1406, 1451, 1452))
+
+
+def es_error_de_fila(error: mysql.connector.Error) -> bool:
+    """
+    Indica si el error se debe a los datos de la fila y la transacción sigue
+    abierta. Los demás (interbloqueo 1213, espera de bloqueo 1205, conexión
+    perdida...) pueden haber deshecho toda la transacción.
+    """
+    if error.errno in (1205, 1213):
+        return False
+    return isinstance(error, (mysql.connector.errors.DataError, mysql.connector.errors.IntegrityError)) \
+        or error.errno in ERRORES_DE_FILA
+
+
+def valores_registro(datos: Dict[str, Any], id_paciente: int) -> tuple:
+    """
+    Obtiene los valores de un registro en el orden de CAMPOS_REGISTRO,
+    seguidos del idPaciente.
+    """
+    return tuple(datos.get(campo) for campo in CAMPOS_REGISTRO) + (id_paciente,)
+
+
 class BitacoraFacade:
     """
     Patrón Facade para simplificar el acceso a la base de datos y la lógica de bitácora.
     Proporciona una interfaz simple y unificada para todas las operaciones de bitácora.
     """
     
+    # Tamaño de página para la búsqueda paginada por keyset
+    LIMITE_POR_DEFECTO = 500
+    LIMITE_MAXIMO = 1000
+    
+    # Máximo de operaciones aceptadas por guardar_registros
+    LIMITE_OPERACIONES = 1000
+    
     def __init__(self, connection_singleton: BitacoraConnectionSingleton):
         """
         Inicializa el Facade con el Singleton de conexión.
@@ -537,25 +1669,58 @@ class BitacoraFacade:
         self.connection_singleton = connection_singleton
         self.decorator_chain = None
         self.subject = BitacoraSubject()  # Sujeto observable para el patrón Observer
+        self.paciente_resolver = PacienteResolver(connection_singleton)
+        self.cache_mes: Optional[BitacoraCacheMes] = None
     
     def set_decorator_chain(self, decorator: BitacoraDecorator):
         """
         Establece la cadena de decoradores. El decorador pasado debe ser el último
-        de la cadena, que envuelve a los anteriores.
+        de la cadena, que envuelve a los anteriores. Si todas sus etapas lo
+        permiten, la cadena se compila en un pipeline de una sola pasada.
         
         Args:
             decorator: El último decorador de la cadena
         """
-        self.decorator_chain = decorator
+        self.decorator_chain = BitacoraPipelineDecorator.compilar(decorator)
+    
+    def set_cache(self, cache: Optional[BitacoraCacheMes]):
+        """
+        Establece la caché de resultados de `buscar_por_mes`. Debe acompañarse
+        de un BitacoraCacheObserver para expulsar entradas en cada escritura.
+        
+        Args:
+            cache: Instancia de BitacoraCacheMes (None para desactivarla)
+        """
+        self.cache_mes = cache
+    
+    def set_paciente_resolver(self, resolver: PacienteResolver):
+        """
+        Establece el resolvedor de pacientes compartido con el resto de la aplicación.
+        
+        Args:
+            resolver: Instancia de PacienteResolver
+        """
+        self.paciente_resolver = resolver
+    
+    def set_despachador(self, despachador: Optional[BitacoraDespachador]):
+        """
+        Establece el despachador de los observadores asíncronos.
+        Sin despachador todos los observadores se notifican en línea.
+        
+        Args:
+            despachador: Instancia de BitacoraDespachador (o None)
+        """
+        self.subject.despachador = despachador
     
-    def attach_observer(self, observer: BitacoraObserver):
+    def attach_observer(self, observer: BitacoraObserver, asincrono: Optional[bool] = None):
         """
         Agrega un observador para recibir notificaciones de eventos.
         
         Args:
             observer: Instancia de un observador
+            asincrono: Notificarlo en segundo plano (por defecto, observer.asincrono)
         """
-        self.subject.attach(observer)
+        self.subject.attach(observer, asincrono)
     
     def detach_observer(self, observer: BitacoraObserver):
         """
@@ -566,28 +1731,68 @@ class BitacoraFacade:
         """
         self.subject.detach(observer)
     
-    def buscar_por_mes(self, mes: int, id_usuario: Optional[int] = None,
-                        id_paciente: Optional[int] = None, aplicar_decoradores: bool = True) -> Dict[str, Any]:
+    @METRICA_FACADE.cronometrar('buscar_por_mes')
+    def buscar_por_mes(self, mes: int, año: Optional[int] = None, id_usuario: Optional[int] = None,
+                        id_paciente: Optional[int] = None, aplicar_decoradores: bool = True,
+                        limite: Optional[int] = None, despues: Optional[str] = None,
+                        busqueda: Optional[str] = None) -> Dict[str, Any]:
         """
-        Busca registros de bitácora por mes.
+        Busca registros de bitácora por mes y año, paginando por keyset
+        sobre idBitacora descendente.
         
         Args:
             mes: Número del mes (1-12)
+            año: Año del mes a buscar (opcional, por defecto el año actual)
             id_usuario: ID del usuario (opcional, para filtros secundarios)
             id_paciente: ID del paciente (opcional, prioridad alta en filtros)
             aplicar_decoradores: Si se deben aplicar los decoradores configurados
+            limite: Tamaño de página (opcional, acotado a LIMITE_MAXIMO)
+            despues: Cursor opaco devuelto en 'siguiente_cursor' de la página anterior
+            busqueda: Texto libre para acotar el mes (id, fecha, glucosa o nombre)
         
         Returns:
-            Diccionario con los registros y metadatos
+            Diccionario con los registros, metadatos y 'siguiente_cursor'
+            (None si no hay más páginas). Si hay caché configurada el
+            diccionario puede ser compartido y no debe modificarse. Si la
+            consulta falla, 'metadata' trae 'error' y no se guarda en caché.
+        
+        Raises:
+            ValueError: Si el cursor no es válido
         """
         if not mes or mes < 1 or mes > 12:
             return {'registros': [], 'total': 0, 'metadata': {}}
         
-        params = {'mes': mes}
+        if año is None:
+            año = datetime.now().year
+        if año < 1 or año > 9999:
+            return {'registros': [], 'total': 0, 'metadata': {}}
+        
+        if not limite or limite < 1:
+            limite = self.LIMITE_POR_DEFECTO
+        limite = min(limite, self.LIMITE_MAXIMO)
+        
+        # Se pide un registro extra para saber si existe una página siguiente
+        params = {'mes': mes, 'año': año, 'limite': limite + 1}
+        if despues:
+            params['despues'] = decodificar_cursor(despues)
         if id_usuario is not None:
             params['id_usuario'] = id_usuario
         if id_paciente:
             params['id_paciente'] = id_paciente
+        if busqueda:
+            params['busqueda'] = busqueda
+        
+        clave_cache = None
+        if self.cache_mes is not None:
+            clave_cache = BitacoraCacheMes.crear_clave(
+                año, mes, id_usuario, id_paciente, limite=limite, despues=despues,
+                busqueda=busqueda, decoradores=aplicar_decoradores
+            )
+            generacion_cache = self.cache_mes.generacion
+            resultado = self.cache_mes.obtener(clave_cache)
+            if resultado is not None:
+                return resultado
+        
         search_strategy = BitacoraSearchFactory.create_search_strategy(params)
         
         con = None
@@ -595,28 +1800,122 @@ class BitacoraFacade:
             con = self.connection_singleton.get_connection()
             registros = search_strategy.search(con, params)
             
+            # El cursor se calcula antes de los decoradores, que pueden descartar filas
+            siguiente_cursor = None
+            if len(registros) > limite:
+                registros = registros[:limite]
+                siguiente_cursor = codificar_cursor(registros[-1]['idBitacora'])
+            
+            ids_registros = [registro['idBitacora'] for registro in registros]
+            
             # Aplicar cadena de decoradores si está configurada
+            resultado = None
             if aplicar_decoradores and self.decorator_chain:
-                resultado = self.decorator_chain.process(registros)
-                # Si el decorador devolvió un diccionario (como CountDecorator), retornarlo
+                with METRICA_DECORADORES.cronometrar(type(self.decorator_chain).__name__):
+                    resultado = self.decorator_chain.process(registros)
+                # Si el decorador devolvió un diccionario (como CountDecorator), usarlo
                 if isinstance(resultado, dict):
-                    return resultado
-                # Si devolvió una lista, crear estructura estándar
-                registros = resultado
+                    resultado['siguiente_cursor'] = siguiente_cursor
+                else:
+                    # Si devolvió una lista, crear estructura estándar
+                    registros = resultado
+                    resultado = None
             
             # Crear estructura estándar
-            return {
-                'registros': registros,
-                'total': len(registros),
-                'metadata': {}
-            }
+            if resultado is None:
+                resultado = {
+                    'registros': registros,
+                    'total': len(registros),
+                    'metadata': {},
+                    'siguiente_cursor': siguiente_cursor
+                }
+            
+            # Solo llega aquí si la consulta tuvo éxito: los errores no se guardan en caché
+            if clave_cache is not None:
+                self.cache_mes.guardar(clave_cache, resultado, ids_registros, generacion_cache)
+            return resultado
             
         except Exception as error:
+            print(f"[BitacoraFacade] Error al buscar por mes: {error}")
             return {'registros': [], 'total': 0, 'metadata': {'error': str(error)}}
         finally:
             if con and con.is_connected():
                 con.close()
     
+    def iterar_por_mes(self, mes: int, año: Optional[int] = None, id_usuario: Optional[int] = None,
+                       id_paciente: Optional[int] = None, aplicar_decoradores: bool = True,
+                       despues: Optional[str] = None, busqueda: Optional[str] = None,
+                       tamano_lote: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre los registros de un mes en modo streaming: lee del servidor por
+        lotes y aplica los decoradores fila por fila, sin construir la lista
+        completa. Los metadatos de resumen (conteos) no se calculan. No usa la
+        caché ni aplica límite de página.
+        
+        La conexión permanece ocupada hasta agotar o cerrar el iterador.
+        
+        Args:
+            mes: Número del mes (1-12)
+            año: Año del mes a buscar (opcional, por defecto el año actual)
+            id_usuario: ID del usuario (opcional, para filtros secundarios)
+            id_paciente: ID del paciente (opcional, prioridad alta en filtros)
+            aplicar_decoradores: Si se deben aplicar los decoradores configurados
+            despues: Cursor opaco a partir del cual continuar (opcional)
+            busqueda: Texto libre para acotar el mes (opcional)
+            tamano_lote: Registros leídos del servidor en cada lote
+        
+        Yields:
+            Registros de bitácora ya decorados
+        
+        Raises:
+            ValueError: Si el cursor no es válido (al iniciar la iteración)
+        """
+        if not mes or mes < 1 or mes > 12:
+            return
+        if año is None:
+            año = datetime.now().year
+        if año < 1 or año > 9999:
+            return
+        
+        params = {'mes': mes, 'año': año}
+        if despues:
+            params['despues'] = decodificar_cursor(despues)
+        if id_usuario is not None:
+            params['id_usuario'] = id_usuario
+        if id_paciente:
+            params['id_paciente'] = id_paciente
+        if busqueda:
+            params['busqueda'] = busqueda
+        search_strategy = BitacoraSearchFactory.create_search_strategy(params)
+        
+        con = None
+        lotes = None
+        try:
+            con = self.connection_singleton.get_connection()
+            lotes = search_strategy.iterar(con, params, tamano_lote)
+            
+            if not (aplicar_decoradores and self.decorator_chain):
+                for lote in lotes:
+                    yield from lote
+            elif isinstance(self.decorator_chain, BitacoraPipelineDecorator):
+                yield from self.decorator_chain.procesar_flujo(
+                    registro for lote in lotes for registro in lote
+                )
+            else:
+                # Cadena no compilable: se aplica completa a cada lote
+                for lote in lotes:
+                    resultado = self.decorator_chain.process(lote)
+                    if isinstance(resultado, dict):
+                        resultado = resultado.get('registros', [])
+                    yield from resultado
+        finally:
+            # Cerrar primero el cursor (descarta filas pendientes) y luego la conexión
+            if lotes is not None:
+                lotes.close()
+            if con and con.is_connected():
+                con.close()
+    
+    @METRICA_FACADE.cronometrar('obtener_registro')
     def obtener_registro(self, id_bitacora: int, id_usuario: Optional[int] = None,
                          id_paciente: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -633,7 +1932,6 @@ class BitacoraFacade:
         con = None
         try:
             con = self.connection_singleton.get_connection()
-            cursor = con.cursor(dictionary=True)
             
             if id_paciente:
                 sql = """
@@ -660,11 +1958,8 @@ class BitacoraFacade:
                 """
                 val = (id_bitacora,)
             
-            cursor.execute(sql, val)
-            registro = cursor.fetchone()
-            
-            if cursor:
-                cursor.close()
+            columnas, filas = consultar_filas(con, sql, val)
+            registro = BitacoraRow(BitacoraRow.indice(columnas), filas[0]) if filas else None
             
             if registro:
                 return {
@@ -687,15 +1982,21 @@ class BitacoraFacade:
             if con and con.is_connected():
                 con.close()
     
+    @METRICA_FACADE.cronometrar('guardar_registro')
     def guardar_registro(self, datos: Dict[str, Any], tipo_usuario: Optional[int] = None,
                          id_usuario: Optional[int] = None, es_admin: bool = False,
-                         paciente_contexto: Optional[str] = None) -> Dict[str, Any]:
+                         paciente_contexto: Optional[str] = None,
+                         id_paciente_contexto: Optional[int] = None) -> Dict[str, Any]:
         """
         Guarda un nuevo registro o actualiza uno existente en la bitácora.
         
         Args:
             datos: Diccionario con los datos del registro (debe incluir 'id' si es actualización)
             tipo_usuario: Tipo de usuario que realiza la operación (opcional)
+            id_usuario: ID del usuario (opcional, para verificar permisos)
+            es_admin: Si el usuario es administrador (omite la verificación de permisos)
+            paciente_contexto: Nombre del paciente de la sesión (opcional)
+            id_paciente_contexto: ID del paciente de la sesión (opcional, evita buscarlo por nombre)
         
         Returns:
             Diccionario con el resultado de la operación
@@ -716,28 +2017,8 @@ class BitacoraFacade:
             
             # Si no viene idPaciente pero sí nombre, intentar buscar (fallback)
             if nombre_paciente and not id_paciente:
-                cursor_paciente = con.cursor(dictionary=True)
-                # Buscar por coincidencia exacta case-insensitive
-                cursor_paciente.execute("""
-                    SELECT idPaciente 
-                    FROM pacientes 
-                    WHERE LOWER(TRIM(nombreCompleto)) = LOWER(TRIM(%s))
-                    LIMIT 1
-                """, (nombre_paciente,))
-                paciente_data = cursor_paciente.fetchone()
-                if not paciente_data:
-                    # Si no encuentra, buscar por coincidencia parcial
-                    cursor_paciente.execute("""
-                        SELECT idPaciente 
-                        FROM pacientes 
-                        WHERE LOWER(nombreCompleto) LIKE LOWER(%s)
-                        LIMIT 1
-                    """, (f"%{nombre_paciente}%",))
-                    paciente_data = cursor_paciente.fetchone()
-                cursor_paciente.close()
-                if paciente_data:
-                    id_paciente = paciente_data['idPaciente']
-                else:
+                id_paciente = self.paciente_resolver.resolver_id(nombre_paciente)
+                if not id_paciente:
                     return {
                         'success': False,
                         'error': 'Paciente no encontrado en la base de datos'
@@ -745,63 +2026,14 @@ class BitacoraFacade:
             
             if id_bitacora:
                 # Actualizar registro existente
-                # Verificar que el registro pertenezca al usuario si se proporciona id_usuario
-                if not es_admin:
-                    cursor_check = con.cursor(dictionary=True)
-                    cursor_check.execute("""
-                        SELECT b.idPaciente, p.idUsuario 
-                        FROM bitacora b
-                        LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
-                        WHERE b.idBitacora = %s
-                    """, (id_bitacora,))
-                    registro_existente = cursor_check.fetchone()
-                    cursor_check.close()
-                    
-                    if not registro_existente:
-                        return {
-                            'success': False,
-                            'error': 'Registro no encontrado'
-                        }
-                    
-                    if id_usuario and registro_existente.get('idUsuario') != id_usuario:
-                        return {
-                            'success': False,
-                            'error': 'No tienes permiso para modificar este registro'
-                        }
-                    
-                    if paciente_contexto:
-                        # Obtener idPaciente del contexto
-                        cursor_paciente_ctx = con.cursor(dictionary=True)
-                        cursor_paciente_ctx.execute("SELECT idPaciente FROM pacientes WHERE nombreCompleto = %s", (paciente_contexto,))
-                        paciente_ctx_data = cursor_paciente_ctx.fetchone()
-                        cursor_paciente_ctx.close()
-                        if paciente_ctx_data and registro_existente.get('idPaciente') != paciente_ctx_data['idPaciente']:
-                            return {
-                                'success': False,
-                                'error': 'No tienes permiso para modificar este registro'
-                            }
-                
-                sql = """
-                UPDATE bitacora 
-                SET fecha = %s, horaInicio = %s, horaFin = %s, drenajeInicial = %s, 
-                    ufTotal = %s, tiempoMedioPerm = %s, liquidoIngerido = %s, 
-                    cantidadOrina = %s, glucosa = %s, presionArterial = %s, idPaciente = %s
-                WHERE idBitacora = %s
-                """
-                val = (
-                    datos.get('fecha'),
-                    datos.get('horaInicio'),
-                    datos.get('horaFin'),
-                    datos.get('drenajeInicial'),
-                    datos.get('ufTotal'),
-                    datos.get('tiempoMedioPerm'),
-                    datos.get('liquidoIngerido'),
-                    datos.get('cantidadOrina'),
-                    datos.get('glucosa'),
-                    datos.get('presionArterial'),
-                    id_paciente,
-                    id_bitacora
-                )
+                # La pertenencia se verifica dentro del mismo UPDATE (sin consultas previas)
+                condiciones, val_condiciones = ([], []) if es_admin else \
+                    self._condiciones_propietario(id_usuario, paciente_contexto, id_paciente_contexto)
+                if condiciones:
+                    sql = SQL_ACTUALIZAR_REGISTRO_PROPIO + "".join(f" AND {c}" for c in condiciones)
+                else:
+                    sql = SQL_ACTUALIZAR_REGISTRO
+                val = valores_registro(datos, id_paciente) + (id_bitacora,) + tuple(val_condiciones)
             else:
                 # Insertar nuevo registro
                 if not id_paciente:
@@ -810,26 +2042,25 @@ class BitacoraFacade:
                         'error': 'idPaciente es requerido para crear un registro'
                     }
                 
-                sql = """
-                INSERT INTO bitacora (fecha, horaInicio, horaFin, drenajeInicial, ufTotal, 
-                                     tiempoMedioPerm, liquidoIngerido, cantidadOrina, glucosa, presionArterial, idPaciente)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                val = (
-                    datos.get('fecha'),
-                    datos.get('horaInicio'),
-                    datos.get('horaFin'),
-                    datos.get('drenajeInicial'),
-                    datos.get('ufTotal'),
-                    datos.get('tiempoMedioPerm'),
-                    datos.get('liquidoIngerido'),
-                    datos.get('cantidadOrina'),
-                    datos.get('glucosa'),
-                    datos.get('presionArterial'),
-                    id_paciente
-                )
+                sql = SQL_INSERTAR_REGISTRO
+                val = valores_registro(datos, id_paciente)
+            
+            anterior = None
+            if id_bitacora and self.subject.requiere_anterior:
+                anterior = self._leer_anteriores(cursor, [id_bitacora]).get(id_bitacora)
             
             cursor.execute(sql, val)
+            if id_bitacora and not es_admin and cursor.rowcount == 0:
+                # Sin filas afectadas: registro inexistente, ajeno o sin cambios
+                error = self._diagnosticar_escritura(con, id_bitacora, id_usuario,
+                                                     paciente_contexto, id_paciente_contexto,
+                                                     'No tienes permiso para modificar este registro')
+                if error:
+                    con.rollback()
+                    return {
+                        'success': False,
+                        'error': error
+                    }
             con.commit()
             registro_id = id_bitacora if id_bitacora else cursor.lastrowid
             
@@ -849,6 +2080,8 @@ class BitacoraFacade:
                 'datos': datos,
                 'tipo_usuario': tipo_usuario  # Incluir tipo de usuario para filtrado
             }
+            if anterior:
+                notification_data['anterior'] = anterior
             self.subject.notify(event_type, notification_data)
             
             return resultado
@@ -865,9 +2098,11 @@ class BitacoraFacade:
             if con and con.is_connected():
                 con.close()
     
+    @METRICA_FACADE.cronometrar('eliminar_registro')
     def eliminar_registro(self, id_bitacora: int, tipo_usuario: Optional[int] = None,
                            id_usuario: Optional[int] = None, es_admin: bool = False,
-                           paciente_contexto: Optional[str] = None) -> Dict[str, Any]:
+                           paciente_contexto: Optional[str] = None,
+                           id_paciente_contexto: Optional[int] = None) -> Dict[str, Any]:
         """
         Elimina un registro de la bitácora.
         
@@ -875,6 +2110,9 @@ class BitacoraFacade:
             id_bitacora: ID del registro a eliminar
             tipo_usuario: Tipo de usuario que realiza la operación (opcional)
             id_usuario: ID del usuario (opcional, para verificar permisos)
+            es_admin: Si el usuario es administrador (omite la verificación de permisos)
+            paciente_contexto: Nombre del paciente de la sesión (opcional)
+            id_paciente_contexto: ID del paciente de la sesión (opcional, evita buscarlo por nombre)
         
         Returns:
             Diccionario con el resultado de la operación
@@ -884,48 +2122,34 @@ class BitacoraFacade:
             con = self.connection_singleton.get_connection()
             cursor = con.cursor()
             
-            # Si se proporciona id_usuario, verificar que el registro pertenezca al usuario
-            if not es_admin and (id_usuario or paciente_contexto):
-                cursor_check = con.cursor(dictionary=True)
-                cursor_check.execute("""
-                    SELECT b.idPaciente, p.idUsuario 
-                    FROM bitacora b
-                    LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
-                    WHERE b.idBitacora = %s
-                """, (id_bitacora,))
-                registro_existente = cursor_check.fetchone()
-                cursor_check.close()
-                
-                if not registro_existente:
-                    return {
-                        'success': False,
-                        'error': 'Registro no encontrado'
-                    }
-                
-                if id_usuario and registro_existente.get('idUsuario') != id_usuario:
+            # La pertenencia se verifica dentro del mismo DELETE (sin consultas previas)
+            condiciones, val_condiciones = ([], []) if es_admin else \
+                self._condiciones_propietario(id_usuario, paciente_contexto, id_paciente_contexto)
+            
+            if condiciones:
+                sql = SQL_ELIMINAR_REGISTRO_PROPIO + "".join(f" AND {c}" for c in condiciones)
+            else:
+                sql = "DELETE FROM bitacora WHERE idBitacora = %s"
+            val = (id_bitacora,) + tuple(val_condiciones)
+            
+            anterior = None
+            if self.subject.requiere_anterior:
+                anterior = self._leer_anteriores(cursor, [id_bitacora]).get(id_bitacora)
+            
+            cursor.execute(sql, val)
+            filas_afectadas = cursor.rowcount
+            if condiciones and filas_afectadas == 0:
+                # Sin filas afectadas: distinguir registro inexistente de registro ajeno
+                error = self._diagnosticar_escritura(con, id_bitacora, id_usuario,
+                                                     paciente_contexto, id_paciente_contexto,
+                                                     'No tienes permiso para eliminar este registro')
+                if error:
+                    con.rollback()
                     return {
                         'success': False,
-                        'error': 'No tienes permiso para eliminar este registro'
+                        'error': error
                     }
-                
-                if paciente_contexto:
-                    # Obtener idPaciente del contexto
-                    cursor_paciente_ctx = con.cursor(dictionary=True)
-                    cursor_paciente_ctx.execute("SELECT idPaciente FROM pacientes WHERE nombreCompleto = %s", (paciente_contexto,))
-                    paciente_ctx_data = cursor_paciente_ctx.fetchone()
-                    cursor_paciente_ctx.close()
-                    if paciente_ctx_data and registro_existente.get('idPaciente') != paciente_ctx_data['idPaciente']:
-                        return {
-                            'success': False,
-                            'error': 'No tienes permiso para eliminar este registro'
-                        }
-            
-            sql = "DELETE FROM bitacora WHERE idBitacora = %s"
-            val = (id_bitacora,)
-            
-            cursor.execute(sql, val)
             con.commit()
-            filas_afectadas = cursor.rowcount
             
             if cursor:
                 cursor.close()
@@ -938,10 +2162,13 @@ class BitacoraFacade:
             
             # Notificar a los observadores si se eliminó exitosamente
             if filas_afectadas > 0:
-                self.subject.notify('deleted', {
+                notification_data = {
                     'id': id_bitacora,
                     'tipo_usuario': tipo_usuario  # Incluir tipo de usuario para filtrado
-                })
+                }
+                if anterior:
+                    notification_data['anterior'] = anterior
+                self.subject.notify('deleted', notification_data)
             
             return resultado
             
@@ -956,4 +2183,247 @@ class BitacoraFacade:
         finally:
             if con and con.is_connected():
                 con.close()
-
+    
+    @METRICA_FACADE.cronometrar('guardar_registros')
+    def guardar_registros(self, operaciones: List[Dict[str, Any]], tipo_usuario: Optional[int] = None,
+                          id_usuario: Optional[int] = None, es_admin: bool = False,
+                          id_paciente_contexto: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Crea, actualiza y elimina varios registros en una sola transacción.
+        Los permisos se verifican con una sola consulta para todos los registros
+        existentes y los observadores reciben un único evento 'batch'.
+        Si alguna operación no es válida no se aplica ninguna.
+        
+        Args:
+            operaciones: Lista de operaciones {'accion': 'guardar', 'datos': {...}}
+                         (con 'id' en los datos si es actualización) o
+                         {'accion': 'eliminar', 'id': idBitacora}
+            tipo_usuario: Tipo de usuario que realiza la operación (opcional)
+            id_usuario: ID del usuario (opcional, para verificar permisos)
+            es_admin: Si el usuario es administrador (omite la verificación de permisos)
+            id_paciente_contexto: ID del paciente de la sesión (opcional)
+        
+        Returns:
+            Diccionario con el resultado; 'resultados' trae por operación la
+            acción y el id, y 'errores' el índice y el mensaje de cada operación rechazada
+        """
+        if len(operaciones) > self.LIMITE_OPERACIONES:
+            return {
+                'success': False,
+                'error': f'Se admiten como máximo {self.LIMITE_OPERACIONES} operaciones por lote'
+            }
+        
+        inserciones: List[Tuple[int, Dict[str, Any]]] = []
+        actualizaciones: List[Tuple[int, Dict[str, Any]]] = []
+        eliminaciones: List[Tuple[int, int]] = []
+        errores = []
+        pacientes: Dict[str, Optional[int]] = {}
+        
+        for indice, operacion in enumerate(operaciones):
+            accion = operacion.get('accion')
+            if accion == 'eliminar':
+                try:
+                    eliminaciones.append((indice, int(operacion.get('id'))))
+                except (TypeError, ValueError):
+                    errores.append({'indice': indice, 'error': 'ID inválido'})
+                continue
+            if accion != 'guardar':
+                errores.append({'indice': indice, 'error': f'Acción no soportada: {accion}'})
+                continue
+            
+            datos = operacion.get('datos') or {}
+            if id_usuario:
+                datos['idUsuario'] = id_usuario
+            # Resolver cada nombre de paciente distinto una sola vez
+            nombre_paciente = datos.get('paciente')
+            if nombre_paciente and not datos.get('idPaciente'):
+                if nombre_paciente not in pacientes:
+                    pacientes[nombre_paciente] = self.paciente_resolver.resolver_id(nombre_paciente)
+                datos['idPaciente'] = pacientes[nombre_paciente]
+            if not datos.get('idPaciente'):
+                errores.append({'indice': indice, 'error': 'Paciente no encontrado en la base de datos'})
+            elif datos.get('id'):
+                actualizaciones.append((indice, datos))
+            else:
+                inserciones.append((indice, datos))
+        
+        if errores:
+            return {'success': False, 'error': 'Operaciones inválidas', 'errores': errores}
+        
+        con = None
+        cursor = None
+        try:
+            con = self.connection_singleton.get_connection()
+            cursor = con.cursor()
+            
+            # Verificar de una vez los permisos sobre todos los registros existentes;
+            # FOR UPDATE los bloquea hasta el commit para que no cambien de dueño
+            # (la misma consulta da el estado anterior si algún observador lo necesita)
+            ids_existentes = [datos['id'] for _, datos in actualizaciones] + [id_b for _, id_b in eliminaciones]
+            propietarios = {}
+            if ids_existentes and (not es_admin or self.subject.requiere_anterior):
+                marcadores = ", ".join(["%s"] * len(set(ids_existentes)))
+                cursor.execute(f"""
+                    SELECT b.idBitacora, b.idPaciente, p.idUsuario, b.fecha
+                    FROM bitacora b
+                    LEFT JOIN pacientes p ON b.idPaciente = p.idPaciente
+                    WHERE b.idBitacora IN ({marcadores})
+                    FOR UPDATE
+                """, tuple(set(ids_existentes)))
+                propietarios = {fila[0]: fila[1:] for fila in cursor.fetchall()}
+            
+            if ids_existentes and not es_admin:
+                operaciones_existentes = ([(indice, datos['id']) for indice, datos in actualizaciones]
+                                          + eliminaciones)
+                for indice, id_b in operaciones_existentes:
+                    if id_b not in propietarios:
+                        errores.append({'indice': indice, 'error': 'Registro no encontrado'})
+                        continue
+                    id_paciente_registro, id_usuario_registro, _ = propietarios[id_b]
+                    if ((id_usuario and id_usuario_registro != id_usuario) or
+                            (id_paciente_contexto and id_paciente_registro != id_paciente_contexto)):
+                        errores.append({'indice': indice, 'error': 'No tienes permiso para modificar este registro'})
+                if errores:
+                    con.rollback()
+                    errores.sort(key=lambda error: error['indice'])
+                    return {'success': False, 'error': 'Operaciones no permitidas', 'errores': errores}
+            
+            resultados: List[Optional[Dict[str, Any]]] = [None] * len(operaciones)
+            eventos = []
+            
+            if inserciones:
+                ids_insertados = insertar_registros(cursor, (datos for _, datos in inserciones))
+                for id_bitacora, (indice, datos) in zip(ids_insertados, inserciones):
+                    resultados[indice] = {'accion': 'creado', 'id': id_bitacora}
+                    eventos.append({'tipo': 'created', 'id': id_bitacora, 'datos': datos})
+            
+            if actualizaciones:
+                cursor.executemany(SQL_ACTUALIZAR_REGISTRO,
+                                   [valores_registro(datos, datos['idPaciente']) + (datos['id'],)
+                                    for _, datos in actualizaciones])
+                for indice, datos in actualizaciones:
+                    resultados[indice] = {'accion': 'actualizado', 'id': datos['id']}
+                    evento = {'tipo': 'updated', 'id': datos['id'], 'datos': datos}
+                    if datos['id'] in propietarios:
+                        evento['anterior'] = self._anterior(propietarios[datos['id']])
+                    eventos.append(evento)
+            
+            filas_eliminadas = 0
+            if eliminaciones:
+                ids_eliminar = sorted({id_b for _, id_b in eliminaciones})
+                marcadores = ", ".join(["%s"] * len(ids_eliminar))
+                cursor.execute(f"DELETE FROM bitacora WHERE idBitacora IN ({marcadores})", tuple(ids_eliminar))
+                filas_eliminadas = cursor.rowcount
+                for indice, id_b in eliminaciones:
+                    resultados[indice] = {'accion': 'eliminado', 'id': id_b}
+                for id_b in ids_eliminar:
+                    evento = {'tipo': 'deleted', 'id': id_b}
+                    if id_b in propietarios:
+                        evento['anterior'] = self._anterior(propietarios[id_b])
+                    eventos.append(evento)
+            
+            con.commit()
+        except Exception as error:
+            if con:
+                con.rollback()
+            return {
+                'success': False,
+                'error': str(error),
+                'message': 'Error al guardar los registros'
+            }
+        finally:
+            if cursor:
+                cursor.close()
+            if con and con.is_connected():
+                con.close()
+        
+        # Una sola notificación agregada para todo el lote
+        if eventos:
+            self.subject.notify('batch', {
+                'eventos': eventos,
+                'tipo_usuario': tipo_usuario
+            })
+        
+        return {
+            'success': True,
+            'resultados': resultados,
+            'creados': len(inserciones),
+            'actualizados': len(actualizaciones),
+            'eliminados': filas_eliminadas,
+            'message': 'Registros guardados exitosamente'
+        }
+    
+    def _condiciones_propietario(self, id_usuario: Optional[int], paciente_contexto: Optional[str],
+                                 id_paciente_contexto: Optional[int]) -> Tuple[List[str], List[Any]]:
+        """
+        Construye las condiciones de pertenencia de un registro (alias b de
+        bitacora y p de pacientes) para un usuario no administrador.
+        
+        Returns:
+            Tupla (condiciones SQL, valores)
+        """
+        condiciones = []
+        valores = []
+        if id_usuario:
+            condiciones.append("p.idUsuario = %s")
+            valores.append(id_usuario)
+        if not id_paciente_contexto and paciente_contexto:
+            # Sin idPaciente de sesión: resolverlo desde el índice en memoria
+            id_paciente_contexto = self.paciente_resolver.resolver_id(paciente_contexto)
+        if id_paciente_contexto:
+            condiciones.append("b.idPaciente = %s")
+            valores.append(id_paciente_contexto)
+        return condiciones, valores
+    
+    def _diagnosticar_escritura(self, con, id_bitacora: int, id_usuario: Optional[int],
+                                paciente_contexto: Optional[str], id_paciente_contexto: Optional[int],
+                                error_permiso: str) -> Optional[str]:
+        """
+        Determina por qué una escritura con verificación de pertenencia no
+        afectó ninguna fila. Solo se consulta en ese caso.
+        
+        Returns:
+            Mensaje de error, o None si el registro es del usuario y no tenía cambios
+        """
+        condiciones, valores = self._condiciones_propietario(id_usuario, paciente_contexto,
+                                                             id_paciente_contexto)
+        pertenece = " AND ".join(condiciones) if condiciones else "TRUE"
+        cursor = con.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT {pertenece}
+                FROM bitacora b
+                LEFT JOIN pacientes p ON p.idPaciente = b.idPaciente
+                WHERE b.idBitacora = %s
+            """, tuple(valores) + (id_bitacora,))
+            fila = cursor.fetchone()
+        finally:
+            cursor.close()
+        
+        if not fila:
+            return 'Registro no encontrado'
+        if not fila[0]:
+            return error_permiso
+        return None
+    
+    def _leer_anteriores(self, cursor, ids_bitacora: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Lee (y bloquea hasta el commit) el idPaciente y la fecha actuales de
+        los registros, antes de modificarlos o eliminarlos.
+        
+        Returns:
+            Diccionario idBitacora -> {'idPaciente', 'fecha'}
+        """
+        marcadores = ", ".join(["%s"] * len(ids_bitacora))
+        cursor.execute(f"""
+            SELECT idBitacora, idPaciente, fecha
+            FROM bitacora
+            WHERE idBitacora IN ({marcadores})
+            FOR UPDATE
+        """, tuple(ids_bitacora))
+        return {fila[0]: {'idPaciente': fila[1], 'fecha': fila[2]} for fila in cursor.fetchall()}
+    
+    @staticmethod
+    def _anterior(propietario: tuple) -> Dict[str, Any]:
+        """Convierte (idPaciente, idUsuario, fecha) de la verificación de permisos en 'anterior'."""
+        return {'idPaciente': propietario[0], 'fecha': propietario[2]}
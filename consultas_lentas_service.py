@@ -0,0 +1,331 @@
+"""
+Módulo con el registro de consultas lentas.
+Las conexiones del pool miden cada sentencia (ejecución y lectura de filas);
+las que superan el umbral se agrupan por huella (la sentencia sin valores
+literales), se escriben en un archivo rotativo y, para las de lectura o
+modificación, se captura su plan con EXPLAIN en un hilo aparte y sobre una
+conexión propia, fuera del camino de la petición.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import mysql.connector
+
+_CADENA = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_MARCADOR = re.compile(r"%\(\w+\)s|%s|\?")
+_NUMERO = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+_EXPLICABLE = re.compile(r"^\s*(SELECT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+
+def huella_sql(sql: str) -> str:
+    """
+    Normaliza una sentencia para agrupar sus ejecuciones: sustituye
+    literales y marcadores por ?, colapsa las listas IN (?, ?, ...) y los
+    espacios.
+    """
+    huella = _CADENA.sub("?", sql)
+    huella = _MARCADOR.sub("?", huella)
+    huella = _NUMERO.sub("?", huella)
+    huella = _LISTA.sub("(?+)", huella)
+    return _ESPACIOS.sub(" ", huella).strip().rstrip(";").strip()
+
+
+def forma_parametros(val: Any, muchos: bool = False) -> str:
+    """
+    Describe los parámetros por su tipo, sin sus valores (pueden contener
+    datos personales o contraseñas), por ejemplo "(int, date, date)" o,
+    en executemany, "[500 x (str, ..., int)]".
+    """
+    if muchos:
+        filas = list(val or [])
+        return f"[{len(filas)} x {forma_parametros(filas[0]) if filas else '()'}]"
+    if val is None:
+        return "()"
+    if isinstance(val, dict):
+        return "{" + ", ".join(f"{clave}: {type(valor).__name__}" for clave, valor in val.items()) + "}"
+    tipos: List[List] = []
+    for valor in val:
+        nombre = type(valor).__name__
+        if tipos and tipos[-1][0] == nombre:
+            tipos[-1][1] += 1
+        else:
+            tipos.append([nombre, 1])
+    return "(" + ", ".join(nombre if n == 1 else f"{nombre}*{n}" for nombre, n in tipos) + ")"
+
+
+class RegistroConsultasLentas:
+    """
+    Registro de las sentencias que superan el umbral de duración, con
+    estadísticas acumuladas por huella (en memoria, por proceso) y un
+    archivo rotativo con una línea JSON por ejecución lenta y por plan.
+    """
+
+    ORDENES = ('total', 'maximo', 'ejecuciones')
+
+    def __init__(self, umbral: float = 0.2, archivo: str = "logs/consultas-lentas.log",
+                 max_bytes: int = 1024 * 1024, respaldos: int = 5,
+                 conectar: Optional[Callable[[], Any]] = None, intervalo_explain: float = 600.0,
+                 max_huellas: int = 500, max_cola: int = 100):
+        """
+        Args:
+            umbral: Segundos a partir de los cuales una sentencia se registra
+            archivo: Archivo de registro (rota al llegar a max_bytes)
+            max_bytes: Tamaño máximo de cada archivo
+            respaldos: Archivos rotados que se conservan
+            conectar: Función que abre la conexión aparte para EXPLAIN (None lo desactiva)
+            intervalo_explain: Segundos mínimos entre dos EXPLAIN de la misma huella
+            max_huellas: Huellas distintas que se conservan (se descartan las menos recientes)
+            max_cola: Planes pendientes de capturar
+        """
+        self.umbral = umbral
+        self.conectar = conectar
+        self.intervalo_explain = intervalo_explain
+        self.max_huellas = max_huellas
+        self._huellas: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._cola: queue.Queue = queue.Queue(maxsize=max_cola)
+        self._hilo: Optional[threading.Thread] = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+        self._logger = logging.getLogger(f"{__name__}.{os.path.abspath(archivo)}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            manejador = RotatingFileHandler(archivo, maxBytes=max_bytes, backupCount=respaldos,
+                                            encoding="utf-8", delay=True)
+            manejador.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(manejador)
+
+    @classmethod
+    def desde_entorno(cls, conectar: Optional[Callable[[], Any]] = None) -> 'RegistroConsultasLentas':
+        """
+        Crea el registro con SLOW_QUERY_MS (umbral en milisegundos, 200 por
+        defecto), SLOW_QUERY_LOG (archivo) y SLOW_QUERY_EXPLAIN (0 para no
+        capturar planes).
+        """
+        explain = os.environ.get("SLOW_QUERY_EXPLAIN", "1").lower() not in ("0", "false", "no")
+        return cls(
+            umbral=float(os.environ.get("SLOW_QUERY_MS", "200")) / 1000,
+            archivo=os.environ.get("SLOW_QUERY_LOG", "logs/consultas-lentas.log"),
+            conectar=conectar if explain else None
+        )
+
+    def registrar(self, sql: str, val: Any, duracion: float, filas: int, muchos: bool = False):
+        """
+        Registra una sentencia ejecutada; solo hace trabajo si supera el umbral.
+
+        Args:
+            sql: Sentencia con marcadores
+            val: Parámetros (solo se registra su forma)
+            duracion: Segundos de ejecución y lectura de filas
+            filas: Filas leídas o afectadas
+            muchos: Si se ejecutó con executemany
+        """
+        if duracion < self.umbral:
+            return
+        huella = huella_sql(sql)
+        id_huella = hashlib.sha1(huella.encode("utf-8")).hexdigest()[:12]
+        forma = forma_parametros(val, muchos)
+        ahora = time.time()
+
+        with self._lock:
+            entrada = self._huellas.get(id_huella)
+            if entrada is None:
+                entrada = self._huellas[id_huella] = {
+                    'id': id_huella, 'huella': huella, 'ejemplo': sql.strip()[:2000], 'formas': [],
+                    'ejecuciones': 0, 'total_s': 0.0, 'maximo_s': 0.0, 'filas_max': 0,
+                    'ultima_vez': None, 'explain': None, '_ultimo_explain': 0.0
+                }
+                while len(self._huellas) > self.max_huellas:
+                    self._huellas.popitem(last=False)
+            self._huellas.move_to_end(id_huella)
+            entrada['ejecuciones'] += 1
+            entrada['total_s'] += duracion
+            entrada['maximo_s'] = max(entrada['maximo_s'], duracion)
+            entrada['filas_max'] = max(entrada['filas_max'], filas)
+            entrada['ultima_vez'] = ahora
+            if forma not in entrada['formas']:
+                entrada['formas'] = (entrada['formas'] + [forma])[-5:]
+            explicar = (self.conectar is not None and not muchos and _EXPLICABLE.match(sql) is not None
+                        and ahora - entrada['_ultimo_explain'] >= self.intervalo_explain)
+            if explicar:
+                entrada['_ultimo_explain'] = ahora
+
+        self._escribir({'tipo': 'consulta', 'fecha': datetime.fromtimestamp(ahora).isoformat(timespec="milliseconds"),
+                        'id': id_huella, 'duracion_ms': round(duracion * 1000, 2), 'filas': filas,
+                        'parametros': forma, 'huella': huella})
+        if explicar:
+            self._encolar_explain(id_huella, sql, val)
+
+    def top(self, n: int = 20, orden: str = 'total') -> List[Dict[str, Any]]:
+        """
+        Obtiene las huellas más costosas.
+
+        Args:
+            n: Número de huellas
+            orden: 'total' (tiempo acumulado), 'maximo' o 'ejecuciones'
+        """
+        campo = {'total': 'total_s', 'maximo': 'maximo_s', 'ejecuciones': 'ejecuciones'}[orden]
+        with self._lock:
+            entradas = sorted(self._huellas.values(), key=lambda e: e[campo], reverse=True)[:n]
+            resultado = []
+            for entrada in entradas:
+                publica = {clave: valor for clave, valor in entrada.items() if not clave.startswith('_')}
+                publica['promedio_ms'] = round(entrada['total_s'] / entrada['ejecuciones'] * 1000, 2)
+                publica['total_s'] = round(entrada['total_s'], 4)
+                publica['maximo_ms'] = round(publica.pop('maximo_s') * 1000, 2)
+                publica['ultima_vez'] = datetime.fromtimestamp(entrada['ultima_vez']).isoformat(timespec="seconds")
+                publica['formas'] = list(entrada['formas'])
+                resultado.append(publica)
+        return resultado
+
+    def _escribir(self, entrada: Dict[str, Any]):
+        """Escribe una línea JSON en el archivo rotativo."""
+        try:
+            self._logger.info(json.dumps(entrada, ensure_ascii=False, default=str))
+        except Exception as error:
+            print(f"[ConsultasLentas] Error al escribir el registro: {error}")
+
+    def _encolar_explain(self, id_huella: str, sql: str, val: Any):
+        """Pide el plan de una sentencia al hilo de EXPLAIN (se descarta si la cola está llena)."""
+        self._iniciar()
+        try:
+            self._cola.put_nowait((id_huella, sql, val))
+        except queue.Full:
+            pass
+
+    def _iniciar(self):
+        """Arranca el hilo de EXPLAIN la primera vez que se necesita."""
+        if self._hilo:
+            return
+        with self._lock:
+            if self._hilo:
+                return
+            self._hilo = threading.Thread(target=self._atender, name="consultas-lentas-explain", daemon=True)
+            self._hilo.start()
+
+    def _atender(self):
+        """Bucle del hilo: ejecuta EXPLAIN en su propia conexión (se reabre si falla)."""
+        conexion = None
+        while True:
+            id_huella, sql, val = self._cola.get()
+            try:
+                if conexion is None or not conexion.is_connected():
+                    conexion = self.conectar()
+                plan = self._explicar(conexion, sql, val)
+            except mysql.connector.Error as error:
+                print(f"[ConsultasLentas] Error al obtener el plan de {id_huella}: {error}")
+                conexion = None
+                continue
+            with self._lock:
+                entrada = self._huellas.get(id_huella)
+                if entrada is not None:
+                    entrada['explain'] = plan
+            self._escribir({'tipo': 'explain', 'fecha': datetime.now().isoformat(timespec="milliseconds"),
+                            'id': id_huella, 'plan': plan})
+
+    @staticmethod
+    def _explicar(conexion, sql: str, val: Any) -> List[Dict[str, Any]]:
+        """Ejecuta EXPLAIN de la sentencia con sus parámetros originales."""
+        cursor = conexion.cursor(dictionary=True)
+        try:
+            cursor.execute("EXPLAIN " + sql.strip(), tuple(val) if isinstance(val, (list, tuple)) else val)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conexion.rollback()
+
+
+class CursorMedido:
+    """
+    Envoltorio de un cursor que mide cada sentencia desde execute hasta la
+    última lectura de filas (o el siguiente execute/close) y la informa al
+    registro de consultas lentas.
+    """
+
+    def __init__(self, cursor, registro: RegistroConsultasLentas):
+        self._cursor = cursor
+        self._registro = registro
+        # [sql, parámetros, segundos, filas leídas, executemany]
+        self._actual: Optional[List] = None
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self._cursor, nombre)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def execute(self, operation: str, params: Any = (), *args, **kwargs):
+        return self._ejecutar(self._cursor.execute, operation, params, False, *args, **kwargs)
+
+    def executemany(self, operation: str, seq_params: Sequence[Any], *args, **kwargs):
+        return self._ejecutar(self._cursor.executemany, operation, seq_params, True, *args, **kwargs)
+
+    def fetchone(self):
+        fila = self._leer(self._cursor.fetchone)
+        if fila is not None and self._actual:
+            self._actual[3] += 1
+        return fila
+
+    def fetchmany(self, *args, **kwargs):
+        filas = self._leer(self._cursor.fetchmany, *args, **kwargs)
+        if self._actual:
+            self._actual[3] += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self._leer(self._cursor.fetchall)
+        if self._actual:
+            self._actual[3] += len(filas)
+        return filas
+
+    def close(self):
+        self._terminar()
+        return self._cursor.close()
+
+    def _ejecutar(self, metodo: Callable, operation: str, params: Any, muchos: bool, *args, **kwargs):
+        self._terminar()
+        inicio = time.perf_counter()
+        try:
+            return metodo(operation, params, *args, **kwargs)
+        finally:
+            self._actual = [operation, params, time.perf_counter() - inicio, 0, muchos]
+
+    def _leer(self, metodo: Callable, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            if self._actual:
+                self._actual[2] += time.perf_counter() - inicio
+
+    def _terminar(self):
+        """Informa la sentencia en curso al registro."""
+        if self._actual is None:
+            return
+        sql, params, duracion, filas, muchos = self._actual
+        self._actual = None
+        if not filas:
+            # Sin lecturas: filas afectadas (INSERT/UPDATE/DELETE)
+            filas = max(getattr(self._cursor, 'rowcount', 0) or 0, 0)
+        self._registro.registrar(sql, params, duracion, filas, muchos)
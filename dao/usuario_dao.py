@@ -1,5 +1,7 @@
 import mysql.connector
 
+from pool_service import consultar
+
 
 class UsuarioDAO:
     """
@@ -7,6 +9,13 @@ class UsuarioDAO:
     Encapsula el acceso a datos del módulo de autenticación.
     """
 
+    SQL_AUTENTICAR = """
+    SELECT idUsuario, nombre, tipo_usuario
+    FROM usuario
+    WHERE nombre = %s
+    AND contrasena = %s
+    """
+
     def __init__(self, connection_pool):
         self.connection_pool = connection_pool
 
@@ -18,25 +27,15 @@ class UsuarioDAO:
             Lista de registros (puede estar vacía si no hay coincidencias).
         """
         con = None
-        cursor = None
         try:
             con = self.connection_pool.get_connection()
-            cursor = con.cursor(dictionary=True)
-            sql = """
-            SELECT idUsuario, nombre, tipo_usuario
-            FROM usuario
-            WHERE nombre = %s
-            AND contrasena = %s
-            """
-            cursor.execute(sql, (nombre, contrasena))
-            registros = cursor.fetchall()
+            # Consulta frecuente: se ejecuta como sentencia preparada
+            registros = consultar(con, self.SQL_AUTENTICAR, (nombre, contrasena))
             return registros
         except mysql.connector.Error as error:
             print(f"[UsuarioDAO] Error al autenticar usuario: {error}")
             return []
         finally:
-            if cursor:
-                cursor.close()
             if con and con.is_connected():
                 con.close()
 
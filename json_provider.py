@@ -0,0 +1,260 @@
+"""
+Módulo con el proveedor JSON de la aplicación (app.json).
+Serializa de forma uniforme los tipos que devuelve la base de datos:
+Decimal como número, date/datetime/time en ISO 8601 y timedelta (columnas
+TIME) como HH:MM:SS. Los registros de bitácora (BitacoraRow) se codifican
+con un codificador compilado una sola vez por forma de fila, sin pasar por
+los ganchos de respaldo objeto por objeto. Si orjson está instalado puede
+usarse como backend.
+"""
+
+import json
+import math
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from json.encoder import encode_basestring, encode_basestring_ascii
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask.json.provider import DefaultJSONProvider
+
+from bitacora_service import BitacoraRow
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ('auto', 'json', 'orjson')
+
+
+def formatear_hora(valor: timedelta) -> str:
+    """
+    Formatea un timedelta como los valores TIME de MySQL ([-]HH:MM:SS[.ffffff]).
+
+    Args:
+        valor: Duración (mysql.connector devuelve así las columnas TIME)
+
+    Returns:
+        Texto con las horas totales, minutos y segundos
+    """
+    microsegundos = (valor.days * 86400 + valor.seconds) * 1000000 + valor.microseconds
+    signo = "-" if microsegundos < 0 else ""
+    segundos, micro = divmod(abs(microsegundos), 1000000)
+    minutos, segundos = divmod(segundos, 60)
+    horas, minutos = divmod(minutos, 60)
+    texto = f"{signo}{horas:02d}:{minutos:02d}:{segundos:02d}"
+    return f"{texto}.{micro:06d}" if micro else texto
+
+
+def _decimal(valor: Decimal) -> str:
+    # str() de un Decimal finito ya es un número JSON válido y conserva la escala
+    return str(valor) if valor.is_finite() else "null"
+
+
+def _flotante(valor: float) -> str:
+    return float.__repr__(valor) if math.isfinite(valor) else json.dumps(valor)
+
+
+def _fecha(valor: date) -> str:
+    return '"' + valor.isoformat() + '"'
+
+
+class CodificadorFilas:
+    """
+    Codificador de registros de bitácora compilado por forma de fila.
+    La forma (índice de columnas compartido y claves agregadas por los
+    decoradores) se compila una vez en un plan con el prefijo '"clave":' ya
+    escapado y la posición de cada valor; cada valor se codifica según su
+    tipo con funciones de la biblioteca estándar.
+    """
+
+    MAX_FORMAS = 64
+
+    def __init__(self, ensure_ascii: bool = True, sort_keys: bool = True,
+                 respaldo: Optional[Callable[[Any], str]] = None):
+        """
+        Args:
+            ensure_ascii: Escapar los caracteres no ASCII
+            sort_keys: Ordenar las claves (como el proveedor de Flask)
+            respaldo: Codifica los valores de tipos sin codificador propio
+        """
+        self.sort_keys = sort_keys
+        self.escapar = encode_basestring_ascii if ensure_ascii else encode_basestring
+        self.respaldo = respaldo or json.dumps
+        self.por_tipo: Dict[type, Callable[[Any], str]] = {
+            type(None): lambda valor: "null",
+            bool: lambda valor: "true" if valor else "false",
+            int: int.__repr__,
+            float: _flotante,
+            str: self.escapar,
+            Decimal: _decimal,
+            date: _fecha,
+            datetime: _fecha,
+            time: _fecha,
+            timedelta: lambda valor: '"' + formatear_hora(valor) + '"'
+        }
+        # (id del índice, claves agregadas) -> (índice, plan)
+        self._formas: Dict[Tuple[int, Tuple[str, ...]], Tuple[Dict[str, int], List[Tuple[str, Optional[int], str]]]] = {}
+
+    def plan(self, fila: BitacoraRow) -> List[Tuple[str, Optional[int], str]]:
+        """
+        Obtiene (o compila) el plan de la forma de la fila: lista de
+        (prefijo, posición en la tupla o None si no es columna, clave).
+        """
+        indice = fila.columnas
+        agregados = fila.agregados()
+        clave_forma = (id(indice), agregados)
+        entrada = self._formas.get(clave_forma)
+        # Se conserva el índice en la entrada para que su id no pueda reutilizarse
+        if entrada is not None and entrada[0] is indice:
+            return entrada[1]
+
+        claves = list(indice) + [clave for clave in agregados if clave not in indice]
+        if self.sort_keys:
+            claves.sort()
+        plan = [(("{" if i == 0 else ",") + self.escapar(clave) + ":", indice.get(clave), clave)
+                for i, clave in enumerate(claves)]
+        if len(self._formas) >= self.MAX_FORMAS:
+            self._formas.clear()
+        self._formas[clave_forma] = (indice, plan)
+        return plan
+
+    def codificar(self, fila: BitacoraRow) -> str:
+        """Codifica un registro como objeto JSON."""
+        valores = fila.valores
+        por_tipo = self.por_tipo
+        partes = []
+        for prefijo, posicion, clave in self.plan(fila):
+            valor = valores[posicion] if posicion is not None else fila[clave]
+            codificador = por_tipo.get(type(valor))
+            partes.append(prefijo)
+            partes.append(codificador(valor) if codificador else self.respaldo(valor))
+        return "".join(partes) + "}" if partes else "{}"
+
+    def preparar(self, fila: BitacoraRow) -> Dict[str, Any]:
+        """
+        Convierte un registro en diccionario con los Decimal como float
+        (para backends que no admiten Decimal, como orjson).
+        """
+        valores = fila.valores
+        datos = {}
+        for _, posicion, clave in self.plan(fila):
+            valor = valores[posicion] if posicion is not None else fila[clave]
+            datos[clave] = float(valor) if type(valor) is Decimal else valor
+        return datos
+
+
+class VidaDialJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de la aplicación. Mantiene las opciones del proveedor de
+    Flask (ensure_ascii, sort_keys, compact) y cambia la representación de
+    Decimal (número), fechas (ISO 8601) y timedelta (HH:MM:SS).
+
+    Backends:
+        'json': biblioteca estándar; los BitacoraRow (sueltos o en listas)
+                usan el codificador compilado por forma de fila
+        'orjson': orjson (salida UTF-8 sin escapar; si un valor no es
+                  compatible se usa el backend 'json')
+        'auto': orjson si está instalado, si no 'json'
+    """
+
+    def __init__(self, app, backend: str = 'auto'):
+        """
+        Args:
+            app: Aplicación de Flask
+            backend: 'auto', 'json' u 'orjson'
+
+        Raises:
+            ValueError: Si el backend no es válido o no está instalado
+        """
+        super().__init__(app)
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend JSON no soportado: {backend}")
+        if backend == 'orjson' and orjson is None:
+            raise ValueError("El backend orjson no está instalado")
+        if backend == 'auto':
+            backend = 'orjson' if orjson is not None else 'json'
+        self.backend = backend
+        self._filas: Optional[CodificadorFilas] = None
+
+    @staticmethod
+    def default(o: Any) -> Any:
+        """Convierte los tipos que json no serializa (gancho de respaldo)."""
+        if isinstance(o, BitacoraRow):
+            return o.a_dict()
+        if isinstance(o, Decimal):
+            return float(o) if o.is_finite() else None
+        if isinstance(o, (date, time)):
+            return o.isoformat()
+        if isinstance(o, timedelta):
+            return formatear_hora(o)
+        return DefaultJSONProvider.default(o)
+
+    @property
+    def filas(self) -> CodificadorFilas:
+        """Codificador de registros con las opciones actuales del proveedor."""
+        filas = self._filas
+        if filas is None or filas.sort_keys != self.sort_keys or \
+                filas.escapar is not (encode_basestring_ascii if self.ensure_ascii else encode_basestring):
+            filas = self._filas = CodificadorFilas(self.ensure_ascii, self.sort_keys, self._dumps_json)
+        return filas
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """
+        Serializa a JSON. Sin argumentos de formato (o con los separadores
+        compactos que usa response) se usa el camino rápido del backend;
+        con otros argumentos (indent...) se usa json.dumps.
+        """
+        if not self._compacto(kwargs):
+            return self._dumps_json(obj, **kwargs)
+        if self.backend == 'orjson':
+            datos = self._dumps_orjson(obj)
+            if datos is not None:
+                return datos.decode()
+        return self._dumps_rapido(obj)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Como el de Flask, pero con orjson escribe directamente los bytes."""
+        if self.backend != 'orjson' or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        datos = self._dumps_orjson(obj)
+        if datos is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(datos + b"\n", mimetype=self.mimetype)
+
+    @staticmethod
+    def _compacto(kwargs: Dict[str, Any]) -> bool:
+        return not kwargs or (len(kwargs) == 1 and tuple(kwargs.get('separators', ())) == (",", ":"))
+
+    def _dumps_json(self, obj: Any, **kwargs: Any) -> str:
+        if "indent" not in kwargs:
+            kwargs.setdefault("separators", (",", ":"))
+        return super().dumps(obj, **kwargs)
+
+    def _dumps_rapido(self, obj: Any) -> str:
+        """Biblioteca estándar con el codificador compilado para los registros."""
+        if isinstance(obj, BitacoraRow):
+            return self.filas.codificar(obj)
+        if isinstance(obj, (list, tuple)) and obj and isinstance(obj[0], BitacoraRow):
+            filas = self.filas
+            return "[" + ",".join(filas.codificar(elemento) if isinstance(elemento, BitacoraRow)
+                                  else self._dumps_json(elemento) for elemento in obj) + "]"
+        return self._dumps_json(obj)
+
+    def _dumps_orjson(self, obj: Any) -> Optional[bytes]:
+        """Serializa con orjson; None si algún valor no es compatible."""
+        opciones = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=self._default_orjson, option=opciones)
+        except TypeError:
+            return None
+
+    def _default_orjson(self, o: Any) -> Any:
+        if isinstance(o, BitacoraRow):
+            return self.filas.preparar(o)
+        if isinstance(o, timedelta):
+            return formatear_hora(o)
+        return self.default(o)
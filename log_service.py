@@ -0,0 +1,239 @@
+"""
+Módulo con el registro de actividad de solo anexado (antes log-busquedas.txt).
+Las entradas se acumulan en un búfer y se escriben en segmentos que rotan
+por tamaño; cada segmento se nombra con el desplazamiento (en bytes) de su
+primera entrada dentro del registro completo, lo que permite leer las
+últimas N entradas o las posteriores a un desplazamiento sin recorrer todo
+el historial.
+"""
+
+import atexit
+import os
+import re
+import threading
+import time
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se sincronizan los hilos del proceso
+    fcntl = None
+
+
+class RegistroActividad:
+    """
+    Registro de actividad con escrituras en búfer, seguras entre procesos
+    (flock sobre un archivo de bloqueo, para varios workers de gunicorn),
+    rotación de segmentos por tamaño y lectura por cola o desplazamiento.
+    """
+
+    TAMANO_BLOQUE = 8192
+
+    def __init__(self, directorio: str = "logs", prefijo: str = "actividad",
+                 max_segmento: int = 1024 * 1024, max_segmentos: int = 20,
+                 max_buffer: int = 50, intervalo_escritura: float = 1.0,
+                 archivo_legado: Optional[str] = None):
+        """
+        Args:
+            directorio: Carpeta de los segmentos
+            prefijo: Prefijo del nombre de los segmentos
+            max_segmento: Tamaño en bytes a partir del cual se abre un segmento nuevo
+            max_segmentos: Segmentos que se conservan (los más antiguos se eliminan)
+            max_buffer: Entradas acumuladas antes de escribir
+            intervalo_escritura: Segundos máximos que una entrada espera en el búfer
+            archivo_legado: Archivo de log anterior que se migra como primer segmento
+        """
+        self.directorio = directorio
+        self.prefijo = prefijo
+        self.max_segmento = max_segmento
+        self.max_segmentos = max_segmentos
+        self.max_buffer = max_buffer
+        self.intervalo_escritura = intervalo_escritura
+        self._patron = re.compile(rf"^{re.escape(prefijo)}-(\d{{20}})\.log$")
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._primera_pendiente: Optional[float] = None
+        self._temporizador: Optional[threading.Timer] = None
+
+        os.makedirs(directorio, exist_ok=True)
+        if archivo_legado:
+            self._migrar(archivo_legado)
+        atexit.register(self.escribir)
+
+    def agregar(self, *campos: str):
+        """
+        Agrega una entrada (campos separados por tabuladores) al búfer.
+        Se escribe al llenarse el búfer o al vencer el intervalo de escritura
+        (un temporizador lo vacía aunque no lleguen más entradas).
+        """
+        linea = "\t".join(" ".join(str(campo).split()) for campo in campos) + "\n"
+        with self._lock:
+            self._buffer.append(linea)
+            if self._primera_pendiente is None:
+                self._primera_pendiente = time.monotonic()
+            pendiente = (len(self._buffer) >= self.max_buffer or
+                         time.monotonic() - self._primera_pendiente >= self.intervalo_escritura)
+            if not pendiente and self._temporizador is None:
+                self._temporizador = threading.Timer(self.intervalo_escritura, self._vencer)
+                self._temporizador.name = "registro-actividad-escritura"
+                self._temporizador.daemon = True
+                self._temporizador.start()
+        if pendiente:
+            self.escribir()
+
+    def _vencer(self):
+        """Escribe el búfer al vencer el intervalo de escritura."""
+        with self._lock:
+            self._temporizador = None
+        self.escribir()
+
+    def escribir(self):
+        """Escribe las entradas del búfer en el segmento actual, rotando si es necesario."""
+        with self._lock:
+            if not self._buffer:
+                return
+            datos = "".join(self._buffer).encode("utf-8")
+            self._buffer = []
+            self._primera_pendiente = None
+
+            with self._bloqueo_archivo():
+                segmentos = self._segmentos()
+                if segmentos:
+                    inicio, ruta = segmentos[-1]
+                    tamano = os.path.getsize(ruta)
+                    if tamano >= self.max_segmento:
+                        inicio, ruta = inicio + tamano, self._ruta(inicio + tamano)
+                        segmentos.append((inicio, ruta))
+                else:
+                    ruta = self._ruta(0)
+                    segmentos.append((0, ruta))
+                with open(ruta, "ab") as f:
+                    f.write(datos)
+                for _, antiguo in segmentos[:-self.max_segmentos]:
+                    os.remove(antiguo)
+
+    def ultimas(self, n: int = 100) -> Tuple[List[str], int]:
+        """
+        Obtiene las últimas n entradas leyendo solo el final de los segmentos.
+
+        Returns:
+            Tupla (entradas, desplazamiento del final del registro)
+        """
+        self.escribir()
+        segmentos = self._segmentos()
+        if not segmentos:
+            return [], 0
+        inicio, ruta = segmentos[-1]
+        fin = inicio + os.path.getsize(ruta)
+
+        entradas: List[str] = []
+        for _, ruta in reversed(segmentos):
+            if len(entradas) >= n:
+                break
+            entradas = self._cola_segmento(ruta, n - len(entradas)) + entradas
+        return entradas[-n:] if n > 0 else [], fin
+
+    def desde(self, desplazamiento: int, limite: int = 1000) -> Tuple[List[str], int]:
+        """
+        Obtiene las entradas que empiezan en el desplazamiento indicado o después.
+
+        Args:
+            desplazamiento: Desplazamiento devuelto por una lectura anterior
+            limite: Máximo de entradas a devolver
+
+        Returns:
+            Tupla (entradas, desplazamiento para continuar la lectura)
+        """
+        self.escribir()
+        segmentos = self._segmentos()
+        if not segmentos:
+            return [], 0
+        # Si el desplazamiento ya se eliminó por rotación, empezar en el segmento más antiguo
+        desplazamiento = max(desplazamiento, segmentos[0][0])
+
+        entradas: List[str] = []
+        for i, (inicio, ruta) in enumerate(segmentos):
+            siguiente = segmentos[i + 1][0] if i + 1 < len(segmentos) else None
+            if siguiente is not None and siguiente <= desplazamiento:
+                continue
+            with open(ruta, "rb") as f:
+                posicion = max(0, desplazamiento - inicio)
+                if posicion > 0:
+                    # Alinear al inicio de la siguiente entrada si cae a mitad de una
+                    f.seek(posicion - 1)
+                    if f.read(1) != b"\n" and f.readline().endswith(b"\n"):
+                        posicion = f.tell()
+                    f.seek(posicion)
+                while len(entradas) < limite:
+                    linea = f.readline()
+                    if not linea.endswith(b"\n"):
+                        break
+                    entradas.append(linea.decode("utf-8", errors="replace"))
+                    posicion = f.tell()
+                # Continuar tras la última entrada completa: una línea a medio
+                # escribir (otro proceso) se leerá entera en la siguiente lectura
+                desplazamiento = inicio + posicion
+            if len(entradas) >= limite:
+                break
+        return entradas, desplazamiento
+
+    def _cola_segmento(self, ruta: str, n: int) -> List[str]:
+        """Lee las últimas n líneas completas de un segmento, por bloques desde el final."""
+        with open(ruta, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            posicion = f.tell()
+            datos = b""
+            while posicion > 0 and datos.count(b"\n") <= n:
+                leer = min(self.TAMANO_BLOQUE, posicion)
+                posicion -= leer
+                f.seek(posicion)
+                datos = f.read(leer) + datos
+        lineas = datos.splitlines(keepends=True)
+        if posicion > 0:
+            # La primera línea puede estar incompleta
+            lineas = lineas[1:]
+        return [linea.decode("utf-8", errors="replace") for linea in lineas[-n:]]
+
+    def _segmentos(self) -> List[Tuple[int, str]]:
+        """Lista los segmentos (desplazamiento inicial, ruta) ordenados."""
+        segmentos = []
+        for nombre in os.listdir(self.directorio):
+            coincidencia = self._patron.match(nombre)
+            if coincidencia:
+                segmentos.append((int(coincidencia.group(1)), os.path.join(self.directorio, nombre)))
+        segmentos.sort()
+        return segmentos
+
+    def _ruta(self, inicio: int) -> str:
+        """Ruta del segmento que empieza en el desplazamiento indicado."""
+        return os.path.join(self.directorio, f"{self.prefijo}-{inicio:020d}.log")
+
+    def _migrar(self, archivo_legado: str):
+        """Convierte el archivo de log anterior en el primer segmento, si aún no hay segmentos."""
+        with self._bloqueo_archivo():
+            if os.path.exists(archivo_legado) and not self._segmentos():
+                os.replace(archivo_legado, self._ruta(0))
+
+    def _bloqueo_archivo(self):
+        """Bloqueo exclusivo entre procesos sobre el archivo .lock del directorio."""
+        return _BloqueoArchivo(os.path.join(self.directorio, f".{self.prefijo}.lock"))
+
+
+class _BloqueoArchivo:
+    """Administrador de contexto para flock exclusivo sobre un archivo."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._archivo = None
+
+    def __enter__(self):
+        self._archivo = open(self.ruta, "a")
+        if fcntl:
+            fcntl.flock(self._archivo.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self._archivo.fileno(), fcntl.LOCK_UN)
+        self._archivo.close()
+        return False
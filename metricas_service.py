@@ -0,0 +1,250 @@
+"""
+Módulo de métricas de la aplicación en formato de texto de Prometheus.
+Define histogramas con etiquetas (latencias) y medidores calculados al
+exportar (estado del pool, colas, cachés), registrados en un registro
+global que expone la ruta /metrics.
+"""
+
+import math
+import threading
+import time
+from contextlib import ContextDecorator
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Límites de los buckets en segundos: de 0.5 ms a 10 s
+BUCKETS_POR_DEFECTO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                       0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor: str) -> str:
+    """Escapa un valor de etiqueta para el formato de texto."""
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    """Forma el bloque {nombre="valor",...} de una serie."""
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor: float) -> str:
+    """Formatea un valor numérico (incluye +Inf y NaN)."""
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if math.isnan(valor):
+        return "NaN"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Cronometro(ContextDecorator):
+    """Mide la duración de un bloque (o de una función decorada) en un histograma."""
+
+    def __init__(self, histograma: 'Histograma', valores: Tuple[str, ...]):
+        self.histograma = histograma
+        self.valores = valores
+        self._inicio = 0.0
+
+    def _recreate_cm(self):
+        # Como decorador, cada llamada usa su propio cronómetro (llamadas concurrentes)
+        return _Cronometro(self.histograma, self.valores)
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observar(time.perf_counter() - self._inicio, *self.valores)
+        return False
+
+
+class Histograma:
+    """
+    Histograma acumulado por combinación de etiquetas
+    (serie _bucket por límite, _sum y _count).
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_POR_DEFECTO):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores: str):
+        """
+        Registra una observación.
+
+        Args:
+            valor: Valor observado (segundos)
+            *valores: Valores de las etiquetas, en el orden de `etiquetas`
+        """
+        clave = tuple(str(v) for v in valores)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                # [conteos por bucket (sin acumular), suma, total]
+                serie = self._series[clave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def cronometrar(self, *valores: str) -> _Cronometro:
+        """Administrador de contexto (o decorador) que observa la duración del bloque."""
+        return _Cronometro(self, tuple(str(v) for v in valores))
+
+    def exportar(self) -> List[str]:
+        """Líneas de texto de todas las series del histograma."""
+        with self._lock:
+            series = [(clave, list(conteos), suma, total)
+                      for clave, (conteos, suma, total) in sorted(self._series.items())]
+        lineas = []
+        for clave, conteos, suma, total in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                lineas.append(self._bucket(clave, limite, acumulado))
+            lineas.append(self._bucket(clave, math.inf, total))
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {total}")
+        return lineas
+
+    def _bucket(self, clave: Tuple[str, ...], limite: float, acumulado: int) -> str:
+        """Línea _bucket de una serie para un límite."""
+        le = 'le="' + _numero(limite) + '"'
+        return f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}"
+
+
+class Medidor:
+    """
+    Valor calculado al exportar a partir de una función (gauge o, si
+    crece de forma monótona, counter).
+    """
+
+    def __init__(self, nombre: str, ayuda: str, funcion: Callable[[], float], tipo: str = "gauge"):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.funcion = funcion
+        self.tipo = tipo
+
+    def exportar(self) -> List[str]:
+        try:
+            valor = float(self.funcion())
+        except Exception as error:
+            print(f"[Metricas] Error al calcular {self.nombre}: {error}")
+            return []
+        return [f"{self.nombre} {_numero(valor)}"]
+
+
+class GrupoMedidores:
+    """
+    Medidores calculados a partir de un mismo diccionario de estadísticas:
+    la fuente se llama una sola vez por exportación y cada clave se exporta
+    como su propia métrica (con sus líneas HELP y TYPE).
+    """
+
+    tipo = "grupo"
+
+    def __init__(self, prefijo: str, ayuda: str, fuente: Callable[[], Dict[str, float]],
+                 claves: Sequence[str], contadores: Sequence[str] = ()):
+        self.nombre = prefijo
+        self.ayuda = ayuda
+        self.fuente = fuente
+        # (nombre de la métrica, clave, tipo)
+        self.series = [(f"{prefijo}_{clave}" + ("_total" if clave in contadores else ""), clave,
+                        "counter" if clave in contadores else "gauge") for clave in claves]
+
+    def exportar(self) -> List[str]:
+        try:
+            estadisticas = self.fuente()
+        except Exception as error:
+            print(f"[Metricas] Error al calcular {self.nombre}: {error}")
+            return []
+        lineas = []
+        for nombre, clave, tipo in self.series:
+            try:
+                valor = float(estadisticas[clave])
+            except (KeyError, TypeError, ValueError) as error:
+                print(f"[Metricas] Error al calcular {nombre}: {error}")
+                continue
+            lineas.append(f"# HELP {nombre} {self.ayuda}: {clave}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            lineas.append(f"{nombre} {_numero(valor)}")
+        return lineas
+
+
+class RegistroMetricas:
+    """
+    Registro de métricas. Registrar dos veces el mismo nombre devuelve la
+    métrica existente, de modo que los módulos pueden declarar las suyas al
+    importarse.
+    """
+
+    def __init__(self):
+        self._metricas: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   buckets: Sequence[float] = BUCKETS_POR_DEFECTO) -> Histograma:
+        """Registra (u obtiene) un histograma."""
+        with self._lock:
+            if nombre not in self._metricas:
+                self._metricas[nombre] = Histograma(nombre, ayuda, etiquetas, buckets)
+            return self._metricas[nombre]
+
+    def medidor(self, nombre: str, ayuda: str, funcion: Callable[[], float],
+                tipo: str = "gauge") -> Medidor:
+        """Registra (o reemplaza) un medidor calculado con `funcion` al exportar."""
+        with self._lock:
+            medidor = self._metricas[nombre] = Medidor(nombre, ayuda, funcion, tipo)
+            return medidor
+
+    def medidores(self, prefijo: str, ayuda: str, fuente: Callable[[], Dict[str, float]],
+                  claves: Sequence[str], contadores: Sequence[str] = ()) -> GrupoMedidores:
+        """
+        Registra (o reemplaza) un grupo con un medidor por cada clave del
+        diccionario que devuelve `fuente` (por ejemplo, las estadísticas del
+        pool); `fuente` se llama una sola vez por exportación. Las claves de
+        `contadores` crecen de forma monótona y se exportan como counter (_total).
+
+        Args:
+            prefijo: Prefijo de los nombres de las métricas
+            ayuda: Descripción común
+            fuente: Función que devuelve las estadísticas
+            claves: Claves numéricas a exportar
+            contadores: Claves monótonas
+        """
+        with self._lock:
+            grupo = self._metricas[prefijo] = GrupoMedidores(prefijo, ayuda, fuente, claves, contadores)
+            return grupo
+
+    def exportar(self) -> str:
+        """Texto de todas las métricas en el formato de exposición de Prometheus 0.0.4."""
+        with self._lock:
+            metricas = sorted(self._metricas.items())
+        lineas = []
+        for nombre, metrica in metricas:
+            cuerpo = metrica.exportar()
+            if isinstance(metrica, GrupoMedidores):
+                # El grupo ya incluye las líneas HELP y TYPE de cada métrica
+                lineas.extend(cuerpo)
+                continue
+            if not cuerpo and metrica.tipo != "histogram":
+                continue
+            lineas.append(f"# HELP {nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {nombre} {metrica.tipo}")
+            lineas.extend(cuerpo)
+        return "\n".join(lineas) + "\n"
+
+
+# Registro global compartido por los módulos de la aplicación
+REGISTRO = RegistroMetricas()
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,10 @@
+-- Índices para la búsqueda por mes/año de la bitácora.
+-- El predicado `fecha >= inicio AND fecha < fin` usa idx_paciente_fecha cuando
+-- se filtra por paciente e idx_fecha en la búsqueda sin filtro (administradores).
+-- idx_paciente_fecha también cubre la llave foránea, por eso se elimina el
+-- índice simple sobre idPaciente.
+
+ALTER TABLE `bitacora`
+  ADD KEY `idx_paciente_fecha` (`idPaciente`,`fecha`),
+  ADD KEY `idx_fecha` (`fecha`),
+  DROP KEY `idPaciente`;
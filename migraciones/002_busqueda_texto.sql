@@ -0,0 +1,10 @@
+-- Índices para la búsqueda por texto de la bitácora (BitacoraSearchByText).
+-- Cada parte de la búsqueda se resuelve con su propio índice: idBitacora por
+-- PRIMARY, fecha por idx_fecha, glucosa por idx_glucosa y el nombre del
+-- paciente por el índice FULLTEXT ft_nombre.
+
+ALTER TABLE `bitacora`
+  ADD KEY `idx_glucosa` (`glucosa`);
+
+ALTER TABLE `pacientes`
+  ADD FULLTEXT KEY `ft_nombre` (`nombreCompleto`);
@@ -0,0 +1,6 @@
+-- Índice para resolver el paciente asociado a un usuario al iniciar sesión
+-- (SELECT ... FROM pacientes WHERE idUsuario = ?) y para los filtros por
+-- p.idUsuario de la bitácora.
+
+ALTER TABLE `pacientes`
+  ADD KEY `idx_usuario` (`idUsuario`);
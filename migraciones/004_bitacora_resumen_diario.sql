@@ -0,0 +1,19 @@
+-- Resúmenes preagregados de la bitácora por paciente y día. Se mantienen de
+-- forma incremental desde la aplicación (BitacoraResumenObserver); tras
+-- crear la tabla, poblarla con `flask reconstruir-resumen`.
+
+CREATE TABLE `bitacora_resumen_diario` (
+  `idPaciente` int(11) NOT NULL,
+  `anio` smallint(6) NOT NULL,
+  `mes` tinyint(4) NOT NULL,
+  `dia` tinyint(4) NOT NULL,
+  `sesiones` int(11) NOT NULL DEFAULT 0,
+  `sumaUfTotal` decimal(14,2) NOT NULL DEFAULT 0.00,
+  `conteoUfTotal` int(11) NOT NULL DEFAULT 0,
+  `sumaLiquidoIngerido` decimal(14,2) NOT NULL DEFAULT 0.00,
+  `sumaCantidadOrina` decimal(14,2) NOT NULL DEFAULT 0.00,
+  `glucosaMinima` decimal(10,2) DEFAULT NULL,
+  `glucosaMaxima` decimal(10,2) DEFAULT NULL,
+  `fechaActualizacion` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  PRIMARY KEY (`idPaciente`,`anio`,`mes`,`dia`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,169 @@
+"""
+Módulo con el resolvedor en memoria de nombres de pacientes.
+Sustituye las búsquedas LOWER(TRIM(nombreCompleto)) / LIKE '%...%' sobre la
+tabla pacientes por consultas a un índice exacto y de n-gramas en memoria.
+"""
+
+import threading
+import time
+import unicodedata
+import mysql.connector
+from typing import Dict, Optional, Set, Tuple
+
+
+def normalizar_nombre(nombre: str) -> str:
+    """
+    Normaliza un nombre para compararlo sin distinguir mayúsculas, acentos
+    ni espacios repetidos (equivalente a la collation utf8mb4_unicode_ci).
+
+    Args:
+        nombre: Nombre a normalizar
+
+    Returns:
+        Nombre normalizado
+    """
+    descompuesto = unicodedata.normalize("NFKD", nombre or "")
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_acentos.casefold().split())
+
+
+class PacienteResolver:
+    """
+    Resolvedor compartido de pacientes por nombre.
+    Mantiene en memoria un índice exacto (nombre normalizado -> idPaciente) y
+    un índice de n-gramas para las coincidencias parciales. Se precarga al
+    iniciar la aplicación y se recarga al invalidarse, al caducar o cuando un
+    nombre no se encuentra (como máximo una vez por intervalo).
+    """
+
+    TAMANO_NGRAMA = 3
+
+    def __init__(self, connection_source, ttl: float = 300.0, intervalo_recarga: float = 30.0):
+        """
+        Args:
+            connection_source: Objeto con get_connection() (pool o Singleton de conexión)
+            ttl: Segundos tras los cuales el índice se recarga aunque no haya cambios
+            intervalo_recarga: Segundos mínimos entre recargas provocadas por nombres no encontrados
+        """
+        self._connection_source = connection_source
+        self.ttl = ttl
+        self.intervalo_recarga = intervalo_recarga
+        self._lock = threading.Lock()
+        self._indice: Optional[Tuple[Dict[str, int], Dict[int, Tuple[str, str]], Dict[str, Set[int]]]] = None
+        self._cargado_en: Optional[float] = None
+
+    def cargar(self) -> int:
+        """
+        Carga (o recarga) el índice de pacientes desde la base de datos.
+
+        Returns:
+            Número de pacientes indexados (-1 si hubo un error)
+        """
+        with self._lock:
+            con = None
+            cursor = None
+            try:
+                con = self._connection_source.get_connection()
+                cursor = con.cursor()
+                cursor.execute("SELECT idPaciente, nombreCompleto FROM pacientes ORDER BY idPaciente")
+                filas = cursor.fetchall()
+            except mysql.connector.Error as error:
+                print(f"[PacienteResolver] Error al cargar pacientes: {error}")
+                return -1
+            finally:
+                if cursor:
+                    cursor.close()
+                if con and con.is_connected():
+                    con.close()
+
+            exactos: Dict[str, int] = {}
+            nombres: Dict[int, Tuple[str, str]] = {}
+            ngramas: Dict[str, Set[int]] = {}
+            for id_paciente, nombre in filas:
+                normalizado = normalizar_nombre(nombre)
+                nombres[id_paciente] = (nombre, normalizado)
+                # Ante nombres repetidos gana el idPaciente menor, como en ORDER BY
+                exactos.setdefault(normalizado, id_paciente)
+                for ngrama in self._ngramas(normalizado):
+                    ngramas.setdefault(ngrama, set()).add(id_paciente)
+
+            self._indice = (exactos, nombres, ngramas)
+            self._cargado_en = time.monotonic()
+            return len(nombres)
+
+    def invalidar(self):
+        """Marca el índice como obsoleto; se recargará en la siguiente consulta."""
+        self._cargado_en = None
+
+    def resolver_id(self, nombre_paciente: str) -> Optional[int]:
+        """
+        Obtiene el idPaciente a partir del nombre del paciente.
+        Busca primero la coincidencia exacta y después una coincidencia parcial.
+
+        Args:
+            nombre_paciente: Nombre (completo o parcial) del paciente
+
+        Returns:
+            idPaciente o None si no se encuentra
+        """
+        consulta = normalizar_nombre(nombre_paciente)
+        if not consulta:
+            return None
+
+        if self._indice is None or self._caducado(self.ttl):
+            self.cargar()
+        id_paciente = self._buscar(consulta)
+        if id_paciente is None and self._caducado(self.intervalo_recarga):
+            # El paciente pudo darse de alta después de la última carga
+            self.cargar()
+            id_paciente = self._buscar(consulta)
+        return id_paciente
+
+    def obtener_nombre(self, id_paciente: int) -> Optional[str]:
+        """
+        Obtiene el nombre completo de un paciente desde el índice.
+
+        Args:
+            id_paciente: ID del paciente
+
+        Returns:
+            Nombre completo o None si no se encuentra
+        """
+        if not id_paciente:
+            return None
+        if self._indice is None or self._caducado(self.ttl):
+            self.cargar()
+        if self._indice is None:
+            return None
+        datos = self._indice[1].get(id_paciente)
+        return datos[0] if datos else None
+
+    def _caducado(self, segundos: float) -> bool:
+        """Indica si la última carga es más antigua que los segundos indicados."""
+        return self._cargado_en is None or time.monotonic() - self._cargado_en > segundos
+
+    def _buscar(self, consulta: str) -> Optional[int]:
+        """Busca en el índice actual: exacto y, si no, por subcadena."""
+        if self._indice is None:
+            return None
+        exactos, nombres, ngramas = self._indice
+
+        id_paciente = exactos.get(consulta)
+        if id_paciente is not None:
+            return id_paciente
+
+        if len(consulta) < self.TAMANO_NGRAMA:
+            candidatos = nombres.keys()
+        else:
+            conjuntos = [ngramas.get(ngrama, set()) for ngrama in self._ngramas(consulta)]
+            conjuntos.sort(key=len)
+            candidatos = set(conjuntos[0]).intersection(*conjuntos[1:])
+
+        coincidencias = [id_p for id_p in candidatos if consulta in nombres[id_p][1]]
+        return min(coincidencias) if coincidencias else None
+
+    @classmethod
+    def _ngramas(cls, texto: str) -> Set[str]:
+        """Obtiene los n-gramas de un texto normalizado."""
+        n = cls.TAMANO_NGRAMA
+        return {texto[i:i + n] for i in range(len(texto) - n + 1)}
@@ -0,0 +1,434 @@
+"""
+Módulo con el pool de conexiones MySQL de la aplicación.
+A diferencia de MySQLConnectionPool, espera (hasta un plazo) a que se libere
+una conexión cuando el pool está agotado, valida con ping solo las conexiones
+que llevan tiempo inactivas y expone métricas de espera y uso.
+También puede mantener, por conexión, un registro de sentencias preparadas para
+las consultas frecuentes (protocolo binario).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import mysql.connector
+from flask import g, has_request_context
+from mysql.connector.errors import PoolError
+
+from consultas_lentas_service import CursorMedido, RegistroConsultasLentas
+from metricas_service import REGISTRO
+
+# Tiempo de cada préstamo (cero si había una conexión libre), exportado en /metrics
+METRICA_ESPERA = REGISTRO.histograma(
+    "vidadial_pool_espera_segundos",
+    "Tiempo para obtener una conexión del pool (incluye conexión y validación)")
+
+
+def consultar(con, sql: str, val: Sequence[Any] = (), preparada: bool = True) -> List[Dict[str, Any]]:
+    """
+    Ejecuta una consulta y retorna sus filas como diccionarios.
+    Con una conexión de PoolConexiones usa la sentencia preparada registrada
+    para esa conexión (si el pool las tiene habilitadas); con cualquier otra
+    conexión, o con preparada=False, usa el protocolo de texto.
+
+    Args:
+        con: Conexión (ConexionPool o conexión de mysql.connector)
+        sql: Consulta con marcadores %s
+        val: Valores de la consulta
+        preparada: Si puede usarse una sentencia preparada
+
+    Returns:
+        Lista de filas como diccionarios
+    """
+    columnas, filas = consultar_filas(con, sql, val, preparada)
+    return [dict(zip(columnas, fila)) for fila in filas]
+
+
+def consultar_filas(con, sql: str, val: Sequence[Any] = (),
+                    preparada: bool = True) -> Tuple[Tuple[str, ...], List[tuple]]:
+    """
+    Igual que consultar(), pero retorna las filas como las entrega el cursor
+    (tuplas) junto con los nombres de las columnas, sin crear un diccionario
+    por fila.
+
+    Returns:
+        Tupla (nombres de las columnas, lista de filas como tuplas)
+    """
+    if preparada and isinstance(con, (ConexionPool, ConexionCompartida)):
+        return con.consultar_filas(sql, val)
+    cursor = con.cursor()
+    try:
+        cursor.execute(sql, tuple(val))
+        filas = cursor.fetchall()
+        return tuple(cursor.column_names), filas
+    finally:
+        cursor.close()
+
+
+class ConexionPool:
+    """
+    Conexión prestada por PoolConexiones.
+    Delega en la conexión real; close() la devuelve al pool en lugar de
+    cerrarla e is_connected() no consulta al servidor.
+    """
+
+    def __init__(self, pool: 'PoolConexiones', conexion):
+        self._pool = pool
+        self._conexion = conexion
+
+    def __getattr__(self, nombre: str) -> Any:
+        if self._conexion is None:
+            raise PoolError("La conexión ya fue devuelta al pool")
+        return getattr(self._conexion, nombre)
+
+    def cursor(self, *args, **kwargs):
+        """Crea un cursor; si el pool registra consultas lentas, lo envuelve para medirlo."""
+        if self._conexion is None:
+            raise PoolError("La conexión ya fue devuelta al pool")
+        cursor = self._conexion.cursor(*args, **kwargs)
+        registro = self._pool.consultas_lentas
+        return CursorMedido(cursor, registro) if registro is not None else cursor
+
+    def consultar(self, sql: str, val: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """Ejecuta una consulta con la sentencia preparada de esta conexión."""
+        if self._conexion is None:
+            raise PoolError("La conexión ya fue devuelta al pool")
+        return self._pool.consultar(self._conexion, sql, val)
+
+    def consultar_filas(self, sql: str, val: Sequence[Any] = ()) -> Tuple[Tuple[str, ...], List[tuple]]:
+        """Como consultar(), pero retorna (columnas, filas como tuplas)."""
+        if self._conexion is None:
+            raise PoolError("La conexión ya fue devuelta al pool")
+        return self._pool.consultar_filas(self._conexion, sql, val)
+
+    def is_connected(self) -> bool:
+        """Indica si la conexión sigue prestada (sin hacer ping al servidor)."""
+        return self._conexion is not None
+
+    def close(self):
+        """Devuelve la conexión al pool."""
+        conexion, self._conexion = self._conexion, None
+        if conexion is not None:
+            self._pool.devolver(conexion)
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones con espera ante el agotamiento.
+    Las conexiones se crean bajo demanda hasta `tamano`; cuando no hay
+    ninguna libre, get_connection espera hasta `tiempo_espera` segundos
+    antes de lanzar PoolError. Las conexiones libres se reutilizan en orden
+    LIFO y solo se validan con ping si estuvieron inactivas más de
+    `validar_tras` segundos.
+    Opcionalmente (preparadas=True), cada conexión prepara una sola vez las
+    consultas ejecutadas con consultar() y reutiliza la sentencia (hasta
+    max_preparadas por conexión). Está desactivado por defecto: el cursor
+    preparado de mysql.connector envía COM_STMT_RESET antes de cada
+    ejecución, así que una sentencia reutilizada cuesta dos viajes al
+    servidor frente a uno del protocolo de texto.
+    """
+
+    def __init__(self, tamano: int = 5, tiempo_espera: float = 5.0,
+                 validar_tras: float = 30.0, preparadas: bool = False,
+                 max_preparadas: int = 32, **config):
+        """
+        Args:
+            tamano: Máximo de conexiones abiertas
+            tiempo_espera: Segundos máximos de espera por una conexión libre
+            validar_tras: Segundos de inactividad tras los cuales se valida la conexión
+            preparadas: Usar sentencias preparadas en consultar() (False: protocolo de texto)
+            max_preparadas: Sentencias preparadas que se conservan por conexión
+            **config: Parámetros de mysql.connector.connect (host, database, user, ...)
+        """
+        self.tamano = tamano
+        self.tiempo_espera = tiempo_espera
+        self.validar_tras = validar_tras
+        self.preparadas = preparadas
+        self.max_preparadas = max_preparadas
+        self.config = config
+        self.consultas_lentas: Optional[RegistroConsultasLentas] = None
+        # id(conexión) -> {sql: (sql, cursor preparado)}, en orden de uso
+        self._sentencias: Dict[int, OrderedDict] = {}
+        self._condicion = threading.Condition()
+        self._libres: deque = deque()  # (conexión, momento en que se liberó)
+        self._total = 0
+        self._en_uso = 0
+        # Métricas
+        self.prestamos = 0
+        self.esperas = 0
+        self.tiempo_espera_total = 0.0
+        self.tiempo_espera_maximo = 0.0
+        self.agotamientos = 0
+        self.validaciones = 0
+        self.descartadas = 0
+        self.preparaciones = 0
+        self.reutilizaciones = 0
+
+    @classmethod
+    def desde_entorno(cls) -> 'PoolConexiones':
+        """
+        Crea el pool con la configuración de las variables de entorno DB_HOST,
+        DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, DB_POOL_SIZE, DB_POOL_TIMEOUT,
+        DB_POOL_VALIDAR, DB_CONNECT_TIMEOUT y DB_PREPARED ('1' activa las
+        sentencias preparadas; desactivadas por defecto).
+        """
+        return cls(
+            tamano=int(os.environ.get("DB_POOL_SIZE", "5")),
+            tiempo_espera=float(os.environ.get("DB_POOL_TIMEOUT", "5")),
+            validar_tras=float(os.environ.get("DB_POOL_VALIDAR", "30")),
+            preparadas=os.environ.get("DB_PREPARED", "0").lower() in ("1", "true", "si", "sí"),
+            host=os.environ.get("DB_HOST", "185.232.14.52"),
+            port=int(os.environ.get("DB_PORT", "3306")),
+            database=os.environ.get("DB_NAME", "u760464709_23005102_bd"),
+            user=os.environ.get("DB_USER", "u760464709_23005102_usr"),
+            password=os.environ.get("DB_PASSWORD", "*Q~ic:$9XVr2"),
+            connection_timeout=int(os.environ.get("DB_CONNECT_TIMEOUT", "10"))
+        )
+
+    def get_connection(self) -> ConexionPool:
+        """
+        Presta una conexión, esperando hasta tiempo_espera si el pool está agotado.
+
+        Raises:
+            PoolError: Si no se libera ninguna conexión dentro del plazo
+        """
+        inicio = time.monotonic()
+        limite = inicio + self.tiempo_espera
+        espero = False
+        while True:
+            conexion = None
+            crear = False
+            with self._condicion:
+                while not self._libres and self._total >= self.tamano:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self.agotamientos += 1
+                        raise PoolError(f"Pool agotado: sin conexiones libres tras {self.tiempo_espera} s")
+                    espero = True
+                    self._condicion.wait(restante)
+                if self._libres:
+                    conexion, liberada = self._libres.pop()
+                    validar = time.monotonic() - liberada > self.validar_tras
+                    if validar:
+                        self.validaciones += 1
+                else:
+                    crear = True
+                    validar = False
+                    self._total += 1
+                self._en_uso += 1
+
+            # Conectar o validar fuera del candado para no bloquear a los demás
+            try:
+                if crear:
+                    conexion = mysql.connector.connect(**self.config)
+                elif validar:
+                    try:
+                        conexion.ping()
+                    except mysql.connector.Error:
+                        # Al reconectar se pierden las sentencias preparadas en el servidor
+                        self._olvidar_sentencias(conexion)
+                        conexion.reconnect(attempts=1)
+            except mysql.connector.Error:
+                self._descartar(conexion)
+                if crear:
+                    raise
+                continue
+
+            espera = time.monotonic() - inicio
+            METRICA_ESPERA.observar(espera)
+            with self._condicion:
+                self.prestamos += 1
+                if espero:
+                    self.esperas += 1
+                    self.tiempo_espera_total += espera
+                    self.tiempo_espera_maximo = max(self.tiempo_espera_maximo, espera)
+            return ConexionPool(self, conexion)
+
+    def set_consultas_lentas(self, registro: Optional[RegistroConsultasLentas]):
+        """Mide todas las sentencias de las conexiones prestadas con el registro indicado."""
+        self.consultas_lentas = registro
+
+    def conexion_aparte(self):
+        """Abre una conexión con la misma configuración, fuera del pool (tareas auxiliares)."""
+        return mysql.connector.connect(**self.config)
+
+    def consultar(self, conexion, sql: str, val: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """
+        Ejecuta una consulta en una conexión del pool reutilizando su sentencia
+        preparada (la prepara la primera vez). Las filas se retornan como diccionarios.
+        """
+        columnas, filas = self.consultar_filas(conexion, sql, val)
+        return [dict(zip(columnas, fila)) for fila in filas]
+
+    def consultar_filas(self, conexion, sql: str, val: Sequence[Any] = ()) -> Tuple[Tuple[str, ...], List[tuple]]:
+        """Como consultar(), pero retorna (columnas, filas como tuplas)."""
+        inicio = time.perf_counter()
+        columnas, filas = self._consultar(conexion, sql, val)
+        if self.consultas_lentas is not None:
+            self.consultas_lentas.registrar(sql, val, time.perf_counter() - inicio, len(filas))
+        return columnas, filas
+
+    def _consultar(self, conexion, sql: str, val: Sequence[Any]) -> Tuple[Tuple[str, ...], List[tuple]]:
+        """Ejecuta la consulta (preparada o, si están desactivadas, por protocolo de texto)."""
+        if not self.preparadas:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute(sql, tuple(val))
+                filas = cursor.fetchall()
+                return tuple(cursor.column_names), filas
+            finally:
+                cursor.close()
+
+        with self._condicion:
+            sentencias = self._sentencias.setdefault(id(conexion), OrderedDict())
+        entrada = sentencias.get(sql)
+        if entrada is None:
+            # El cursor preparado reutiliza la sentencia solo si recibe el mismo objeto str
+            entrada = (sql, conexion.cursor(prepared=True))
+            sentencias[sql] = entrada
+            self.preparaciones += 1
+            if len(sentencias) > self.max_preparadas:
+                _, (_, antiguo) = sentencias.popitem(last=False)
+                antiguo.close()
+        else:
+            sentencias.move_to_end(sql)
+            self.reutilizaciones += 1
+
+        clave, cursor = entrada
+        try:
+            cursor.execute(clave, tuple(val))
+            filas = cursor.fetchall()
+        except mysql.connector.Error:
+            sentencias.pop(sql, None)
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+            raise
+        return tuple(cursor.column_names), filas
+
+    def devolver(self, conexion):
+        """
+        Recibe una conexión devuelta. Solo se comunica con el servidor si quedó
+        una transacción o un resultado pendiente; si falla, la conexión se descarta.
+        """
+        try:
+            if conexion.unread_result:
+                conexion.consume_results()
+            if conexion.in_transaction:
+                conexion.rollback()
+        except mysql.connector.Error:
+            self._descartar(conexion)
+            return
+        with self._condicion:
+            self._en_uso -= 1
+            self._libres.append((conexion, time.monotonic()))
+            self._condicion.notify()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Obtiene el uso del pool y los contadores de espera."""
+        with self._condicion:
+            return {
+                'tamano': self.tamano,
+                'abiertas': self._total,
+                'en_uso': self._en_uso,
+                'libres': len(self._libres),
+                'prestamos': self.prestamos,
+                'esperas': self.esperas,
+                'tiempo_espera_promedio': self.tiempo_espera_total / self.esperas if self.esperas else 0.0,
+                'tiempo_espera_maximo': self.tiempo_espera_maximo,
+                'agotamientos': self.agotamientos,
+                'validaciones': self.validaciones,
+                'descartadas': self.descartadas,
+                'preparadas': self.preparadas,
+                'preparaciones': self.preparaciones,
+                'reutilizaciones': self.reutilizaciones
+            }
+
+    def _olvidar_sentencias(self, conexion):
+        """Elimina el registro de sentencias preparadas de una conexión."""
+        with self._condicion:
+            self._sentencias.pop(id(conexion), None)
+
+    def _descartar(self, conexion: Optional[Any]):
+        """Cierra una conexión inservible y libera su lugar en el pool."""
+        if conexion is not None:
+            self._olvidar_sentencias(conexion)
+            try:
+                conexion.close()
+            except Exception:
+                pass
+        with self._condicion:
+            self._total -= 1
+            self._en_uso -= 1
+            self.descartadas += 1
+            self._condicion.notify()
+
+
+class ConexionCompartida:
+    """
+    Conexión de la petición en curso, compartida por todos los componentes.
+    close() no la devuelve al pool: eso ocurre una sola vez al terminar la
+    petición (ConexionesPorPeticion.liberar).
+    """
+
+    def __init__(self, conexion: ConexionPool):
+        self._conexion = conexion
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self._conexion, nombre)
+
+    def consultar(self, sql: str, val: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """Ejecuta una consulta con la sentencia preparada de la conexión."""
+        return consultar(self._conexion, sql, val)
+
+    def consultar_filas(self, sql: str, val: Sequence[Any] = ()) -> Tuple[Tuple[str, ...], List[tuple]]:
+        """Como consultar(), pero retorna (columnas, filas como tuplas)."""
+        return consultar_filas(self._conexion, sql, val)
+
+    def is_connected(self) -> bool:
+        """La conexión permanece prestada mientras dure la petición."""
+        return self._conexion.is_connected()
+
+    def close(self):
+        """No hace nada: la conexión se libera al terminar la petición."""
+
+
+class ConexionesPorPeticion:
+    """
+    Fuente de conexiones con unidad de trabajo por petición de Flask.
+    Dentro de una petición presta siempre la misma conexión (guardada en g)
+    a los helpers de app.py, al Facade y a UsuarioDAO; fuera de una petición
+    (hilos en segundo plano, arranque, CLI) presta conexiones del pool.
+    """
+
+    ATRIBUTO = "_conexion_bd"
+
+    def __init__(self, pool: PoolConexiones):
+        """
+        Args:
+            pool: Pool del que se toman las conexiones
+        """
+        self.pool = pool
+
+    def get_connection(self):
+        """Obtiene la conexión de la petición en curso (la toma del pool la primera vez)."""
+        if not has_request_context():
+            return self.pool.get_connection()
+        compartida = g.get(self.ATRIBUTO)
+        if compartida is None:
+            compartida = ConexionCompartida(self.pool.get_connection())
+            setattr(g, self.ATRIBUTO, compartida)
+        return compartida
+
+    def liberar(self, error: Optional[BaseException] = None):
+        """
+        Devuelve al pool la conexión de la petición, si se tomó alguna.
+        Se llama desde teardown_request; el pool deshace cualquier
+        transacción que haya quedado abierta.
+        """
+        compartida = g.pop(self.ATRIBUTO, None)
+        if compartida is not None:
+            compartida._conexion.close()
@@ -0,0 +1,216 @@
+"""
+Módulo con el publicador de eventos de Pusher.
+Mantiene un único cliente (y su sesión HTTP) para toda la aplicación,
+encola los eventos fuera del hilo de la petición y los envía agrupados
+con trigger_batch, reintentando con espera exponencial.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class PusherLocal:
+    """
+    Backend local que sustituye a pusher.Pusher sin acceso a la red.
+    Guarda los eventos recibidos para pruebas y benchmarks.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.eventos: List[Dict[str, Any]] = []
+
+    def trigger(self, channels, event_name: str, data: Any):
+        """Registra un evento con la misma firma que pusher.Pusher.trigger."""
+        canales = channels if isinstance(channels, (list, tuple)) else [channels]
+        with self._lock:
+            for canal in canales:
+                self.eventos.append({'channel': canal, 'name': event_name, 'data': data})
+        return {}
+
+    def trigger_batch(self, batch: List[Dict[str, Any]]):
+        """Registra un lote con la misma firma que pusher.Pusher.trigger_batch."""
+        with self._lock:
+            self.eventos.extend(dict(evento) for evento in batch)
+        return {}
+
+
+class PusherPublicador:
+    """
+    Publicador de eventos con un cliente de Pusher de larga duración.
+    Los eventos se encolan y un hilo los agrupa dentro de una ventana corta:
+    los eventos idénticos de una ráfaga se envían una sola vez y el resto se
+    manda en llamadas a trigger_batch de hasta MAX_LOTE eventos.
+    """
+
+    # Máximo de eventos por llamada a trigger_batch (límite de Pusher)
+    MAX_LOTE = 10
+
+    def __init__(self, cliente, ventana: float = 0.05, max_cola: int = 1000,
+                 reintentos: int = 3, espera_base: float = 0.5):
+        """
+        Args:
+            cliente: Cliente con trigger_batch (pusher.Pusher o PusherLocal)
+            ventana: Segundos durante los que se agrupan los eventos de una ráfaga
+            max_cola: Máximo de eventos pendientes
+            reintentos: Reintentos de cada lote antes de descartarlo
+            espera_base: Espera inicial entre reintentos (se duplica en cada uno)
+        """
+        self.cliente = cliente
+        self.ventana = ventana
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self._cola: queue.Queue = queue.Queue(maxsize=max_cola)
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._cerrado = False
+        # Métricas
+        self.publicados = 0
+        self.enviados = 0
+        self.agrupados = 0
+        self.lotes = 0
+        self.reintentos_realizados = 0
+        self.fallidos = 0
+        self.descartados = 0
+
+    @classmethod
+    def desde_entorno(cls) -> 'PusherPublicador':
+        """
+        Crea el publicador con la configuración de las variables de entorno
+        PUSHER_APP_ID, PUSHER_KEY, PUSHER_SECRET, PUSHER_CLUSTER y
+        PUSHER_BACKEND ('pusher' o 'local' para trabajar sin red).
+        """
+        if os.environ.get("PUSHER_BACKEND", "pusher").lower() == "local":
+            return cls(PusherLocal())
+
+        import pusher
+        cliente = pusher.Pusher(
+            app_id=os.environ.get("PUSHER_APP_ID", "2046005"),
+            key=os.environ.get("PUSHER_KEY", "12cb9c6b5319b2989000"),
+            secret=os.environ.get("PUSHER_SECRET", "7c193405c24182d96965"),
+            cluster=os.environ.get("PUSHER_CLUSTER", "us2"),
+            ssl=True
+        )
+        return cls(cliente)
+
+    def publicar(self, canal: str, evento: str, datos: Any) -> bool:
+        """
+        Encola un evento sin bloquear la petición.
+
+        Returns:
+            True si se encoló, False si la cola estaba llena o el publicador cerrado
+        """
+        if self._cerrado:
+            return False
+        self._iniciar()
+        try:
+            self._cola.put_nowait((canal, evento, datos))
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+            print(f"[PusherPublicador] Cola llena, evento {evento} descartado")
+            return False
+        with self._lock:
+            self.publicados += 1
+        return True
+
+    def cerrar(self, timeout: float = 5.0):
+        """Envía los eventos pendientes y detiene el hilo del publicador."""
+        with self._lock:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            hilo = self._hilo
+        if hilo:
+            try:
+                self._cola.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            hilo.join(timeout)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Obtiene la profundidad de la cola y los contadores del publicador."""
+        with self._lock:
+            return {
+                'profundidad': self._cola.qsize(),
+                'publicados': self.publicados,
+                'enviados': self.enviados,
+                'agrupados': self.agrupados,
+                'lotes': self.lotes,
+                'reintentos': self.reintentos_realizados,
+                'fallidos': self.fallidos,
+                'descartados': self.descartados
+            }
+
+    def _iniciar(self):
+        """Arranca el hilo la primera vez que se publica un evento."""
+        if self._hilo:
+            return
+        with self._lock:
+            if self._hilo or self._cerrado:
+                return
+            self._hilo = threading.Thread(target=self._atender, name="pusher-publicador", daemon=True)
+            self._hilo.start()
+            atexit.register(self.cerrar)
+
+    def _atender(self):
+        """Bucle del hilo: junta los eventos de cada ventana y los envía."""
+        terminar = False
+        while not terminar:
+            primero = self._cola.get()
+            if primero is None:
+                return
+            eventos = [primero]
+            limite = time.monotonic() + self.ventana
+            while True:
+                restante = limite - time.monotonic()
+                try:
+                    siguiente = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    terminar = True
+                    break
+                eventos.append(siguiente)
+            self._enviar(eventos)
+
+    def _enviar(self, eventos: List[Tuple[str, str, Any]]):
+        """Envía los eventos de una ventana, sin duplicados, en lotes de MAX_LOTE."""
+        unicos = []
+        vistos = set()
+        for canal, evento, datos in eventos:
+            clave = (canal, evento, repr(datos))
+            if clave in vistos:
+                continue
+            vistos.add(clave)
+            unicos.append({'channel': canal, 'name': evento, 'data': datos})
+        with self._lock:
+            self.agrupados += len(eventos) - len(unicos)
+
+        for inicio in range(0, len(unicos), self.MAX_LOTE):
+            lote = unicos[inicio:inicio + self.MAX_LOTE]
+            if self._enviar_lote(lote):
+                with self._lock:
+                    self.enviados += len(lote)
+                    self.lotes += 1
+            else:
+                with self._lock:
+                    self.fallidos += len(lote)
+
+    def _enviar_lote(self, lote: List[Dict[str, Any]]) -> bool:
+        """Envía un lote con trigger_batch, reintentando con espera exponencial."""
+        for intento in range(self.reintentos + 1):
+            try:
+                self.cliente.trigger_batch(lote)
+                return True
+            except Exception as error:
+                if intento == self.reintentos:
+                    print(f"[PusherPublicador] Error al enviar {len(lote)} eventos: {error}")
+                    return False
+                with self._lock:
+                    self.reintentos_realizados += 1
+                time.sleep(self.espera_base * (2 ** intento))
+        return False
@@ -0,0 +1,258 @@
+"""
+Módulo con los resúmenes preagregados de la bitácora por paciente y día.
+La tabla bitacora_resumen_diario se mantiene de forma incremental a partir
+de los eventos del Facade (recalculando solo los días afectados) y puede
+reconstruirse por completo; los resúmenes se leen solo de esa tabla.
+"""
+
+import mysql.connector
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bitacora_service import BitacoraObserver
+
+
+# Agregados de un día a partir de las filas de bitacora
+_SELECT_AGREGADOS = """
+SELECT idPaciente, YEAR(fecha), MONTH(fecha), DAY(fecha),
+       COUNT(*), COALESCE(SUM(ufTotal), 0), COUNT(ufTotal),
+       COALESCE(SUM(liquidoIngerido), 0), COALESCE(SUM(cantidadOrina), 0),
+       MIN(glucosa), MAX(glucosa)
+FROM bitacora
+"""
+
+_INSERTAR_RESUMEN = """
+INSERT INTO bitacora_resumen_diario (idPaciente, anio, mes, dia, sesiones, sumaUfTotal,
+                                     conteoUfTotal, sumaLiquidoIngerido, sumaCantidadOrina,
+                                     glucosaMinima, glucosaMaxima)
+"""
+
+
+class ResumenService:
+    """
+    Servicio de resúmenes diarios y mensuales de la bitácora.
+    """
+
+    def __init__(self, connection_source):
+        """
+        Args:
+            connection_source: Objeto con get_connection() (pool o fuente por petición)
+        """
+        self.connection_source = connection_source
+
+    def recalcular_dias(self, dias: Iterable[Tuple[int, date]]) -> bool:
+        """
+        Recalcula los resúmenes de los días indicados a partir de bitacora,
+        en una sola transacción (usa el índice (idPaciente, fecha)).
+
+        Args:
+            dias: Pares (idPaciente, fecha)
+
+        Returns:
+            True si se recalcularon correctamente
+        """
+        dias = sorted(set(dias))
+        if not dias:
+            return True
+        con = None
+        cursor = None
+        try:
+            con = self.connection_source.get_connection()
+            cursor = con.cursor()
+            for id_paciente, fecha in dias:
+                cursor.execute("""
+                    DELETE FROM bitacora_resumen_diario
+                    WHERE idPaciente = %s AND anio = %s AND mes = %s AND dia = %s
+                """, (id_paciente, fecha.year, fecha.month, fecha.day))
+                cursor.execute(_INSERTAR_RESUMEN + _SELECT_AGREGADOS + """
+                    WHERE idPaciente = %s AND fecha = %s
+                    GROUP BY idPaciente, fecha
+                """, (id_paciente, fecha))
+            con.commit()
+            return True
+        except mysql.connector.Error as error:
+            print(f"[ResumenService] Error al recalcular resúmenes: {error}")
+            if con:
+                con.rollback()
+            return False
+        finally:
+            if cursor:
+                cursor.close()
+            if con and con.is_connected():
+                con.close()
+
+    def reconstruir(self, id_paciente: Optional[int] = None) -> int:
+        """
+        Reconstruye los resúmenes desde cero (de todos los pacientes o de uno).
+
+        Args:
+            id_paciente: ID del paciente (opcional)
+
+        Returns:
+            Número de días resumidos (-1 si hubo un error)
+        """
+        con = None
+        cursor = None
+        try:
+            con = self.connection_source.get_connection()
+            cursor = con.cursor()
+            if id_paciente:
+                cursor.execute("DELETE FROM bitacora_resumen_diario WHERE idPaciente = %s", (id_paciente,))
+                cursor.execute(_INSERTAR_RESUMEN + _SELECT_AGREGADOS + """
+                    WHERE idPaciente = %s
+                    GROUP BY idPaciente, fecha
+                """, (id_paciente,))
+            else:
+                cursor.execute("DELETE FROM bitacora_resumen_diario")
+                cursor.execute(_INSERTAR_RESUMEN + _SELECT_AGREGADOS + """
+                    WHERE idPaciente IS NOT NULL
+                    GROUP BY idPaciente, fecha
+                """)
+            dias = cursor.rowcount
+            con.commit()
+            return dias
+        except mysql.connector.Error as error:
+            print(f"[ResumenService] Error al reconstruir resúmenes: {error}")
+            if con:
+                con.rollback()
+            return -1
+        finally:
+            if cursor:
+                cursor.close()
+            if con and con.is_connected():
+                con.close()
+
+    def resumen(self, id_paciente: int, año: int, mes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Obtiene el resumen de un paciente leyendo solo los datos preagregados.
+        Con mes: totales del mes y detalle por día; sin mes: totales por mes del año.
+
+        Returns:
+            Diccionario con 'total' y 'periodos' (días o meses)
+        """
+        con = None
+        cursor = None
+        try:
+            con = self.connection_source.get_connection()
+            cursor = con.cursor(dictionary=True)
+            if mes:
+                cursor.execute("""
+                    SELECT dia AS periodo, sesiones, sumaUfTotal, conteoUfTotal,
+                           sumaLiquidoIngerido, sumaCantidadOrina, glucosaMinima, glucosaMaxima
+                    FROM bitacora_resumen_diario
+                    WHERE idPaciente = %s AND anio = %s AND mes = %s
+                    ORDER BY dia
+                """, (id_paciente, año, mes))
+            else:
+                cursor.execute("""
+                    SELECT mes AS periodo, SUM(sesiones) AS sesiones, SUM(sumaUfTotal) AS sumaUfTotal,
+                           SUM(conteoUfTotal) AS conteoUfTotal,
+                           SUM(sumaLiquidoIngerido) AS sumaLiquidoIngerido,
+                           SUM(sumaCantidadOrina) AS sumaCantidadOrina,
+                           MIN(glucosaMinima) AS glucosaMinima, MAX(glucosaMaxima) AS glucosaMaxima
+                    FROM bitacora_resumen_diario
+                    WHERE idPaciente = %s AND anio = %s
+                    GROUP BY mes
+                    ORDER BY mes
+                """, (id_paciente, año))
+            filas = cursor.fetchall()
+        except mysql.connector.Error as error:
+            print(f"[ResumenService] Error al obtener resumen: {error}")
+            return {'success': False, 'error': 'Error al obtener el resumen'}
+        finally:
+            if cursor:
+                cursor.close()
+            if con and con.is_connected():
+                con.close()
+
+        return {
+            'success': True,
+            'idPaciente': id_paciente,
+            'anio': año,
+            'mes': mes,
+            'total': self._formatear(self._sumar(filas)),
+            'periodos': [dict(self._formatear(fila), periodo=fila['periodo']) for fila in filas]
+        }
+
+    @staticmethod
+    def _sumar(filas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combina los agregados de varios periodos."""
+        minimos = [fila['glucosaMinima'] for fila in filas if fila['glucosaMinima'] is not None]
+        maximos = [fila['glucosaMaxima'] for fila in filas if fila['glucosaMaxima'] is not None]
+        return {
+            'sesiones': sum(fila['sesiones'] for fila in filas),
+            'sumaUfTotal': sum(fila['sumaUfTotal'] for fila in filas),
+            'conteoUfTotal': sum(fila['conteoUfTotal'] for fila in filas),
+            'sumaLiquidoIngerido': sum(fila['sumaLiquidoIngerido'] for fila in filas),
+            'sumaCantidadOrina': sum(fila['sumaCantidadOrina'] for fila in filas),
+            'glucosaMinima': min(minimos) if minimos else None,
+            'glucosaMaxima': max(maximos) if maximos else None
+        }
+
+    @staticmethod
+    def _formatear(agregados: Dict[str, Any]) -> Dict[str, Any]:
+        """Convierte los agregados en las métricas que se muestran."""
+        def numero(valor):
+            return round(float(valor), 2) if isinstance(valor, (Decimal, float, int)) else valor
+
+        conteo_uf = agregados['conteoUfTotal'] or 0
+        return {
+            'sesiones': int(agregados['sesiones'] or 0),
+            'promedioUfTotal': numero(agregados['sumaUfTotal'] / conteo_uf) if conteo_uf else None,
+            'liquidoIngerido': numero(agregados['sumaLiquidoIngerido'] or 0),
+            'cantidadOrina': numero(agregados['sumaCantidadOrina'] or 0),
+            'glucosaMinima': numero(agregados['glucosaMinima']),
+            'glucosaMaxima': numero(agregados['glucosaMaxima'])
+        }
+
+
+class BitacoraResumenObserver(BitacoraObserver):
+    """
+    Observador concreto que mantiene los resúmenes diarios.
+    Recalcula solo los días afectados por cada evento (el nuevo y, en
+    modificaciones y bajas, el anterior). Se atiende en segundo plano.
+    """
+
+    asincrono = True
+    requiere_anterior = True
+
+    def __init__(self, servicio: ResumenService):
+        self.servicio = servicio
+
+    def update(self, event_type: str, data: Dict[str, Any]):
+        """
+        Recalcula los días afectados por el evento.
+
+        Args:
+            event_type: Tipo de evento ('created', 'updated', 'deleted' o 'batch')
+            data: Datos del evento ('datos' y 'anterior' según el tipo)
+        """
+        eventos = data.get('eventos', []) if event_type == 'batch' else [dict(data, tipo=event_type)]
+        dias: Set[Tuple[int, date]] = set()
+        for evento in eventos:
+            for estado in (evento.get('datos'), evento.get('anterior')):
+                dia = self._dia(estado)
+                if dia:
+                    dias.add(dia)
+            if evento.get('tipo') == 'deleted' and not evento.get('anterior'):
+                print(f"[BitacoraResumenObserver] Baja sin estado anterior (registro {evento.get('id')}); "
+                      f"ejecute la reconstrucción de resúmenes")
+        self.servicio.recalcular_dias(dias)
+
+    @staticmethod
+    def _dia(estado: Optional[Dict[str, Any]]) -> Optional[Tuple[int, date]]:
+        """Obtiene (idPaciente, fecha) de los datos de un registro."""
+        if not estado or not estado.get('idPaciente'):
+            return None
+        fecha = estado.get('fecha')
+        if isinstance(fecha, datetime):
+            fecha = fecha.date()
+        elif isinstance(fecha, str):
+            try:
+                fecha = datetime.strptime(fecha, "%Y-%m-%d").date()
+            except ValueError:
+                return None
+        if not isinstance(fecha, date):
+            return None
+        return int(estado['idPaciente']), fecha
@@ -30,6 +30,10 @@ function debounce(fun, delay) {
         }, delay)
     }
 }
+// Las columnas DECIMAL llegan como número JSON (0 es un valor válido)
+function formatearDecimal(valor, vacio) {
+    return (valor === null || valor === undefined || valor === "") ? vacio : Number(valor).toFixed(2)
+}
 
 
 const DateTime = luxon.DateTime
@@ -233,16 +237,16 @@ app.factory("FormularioBitacoraComponent", function(BitacoraMediator) {
             
             $("#txtIdBitacora").val(registro.idBitacora)
             $("#txtFecha").val(registro.fecha)
-            $("#txtHoraInicio").val(registro.horaInicio || "")
-            $("#txtHoraFin").val(registro.horaFin || "")
-            $("#txtDrenajeInicial").val(registro.drenajeInicial || "")
-            $("#txtUfTotal").val(registro.ufTotal || "")
-            $("#txtTiempoMedioPerm").val(registro.tiempoMedioPerm || "")
-            $("#txtLiquidoIngerido").val(registro.liquidoIngerido || "")
-            $("#txtCantidadOrina").val(registro.cantidadOrina || "")
-            $("#txtGlucosa").val(registro.glucosa || "")
-            $("#txtPresionArterial").val(registro.presionArterial || "")
-            $("#txtPaciente").val(registro.paciente || "")
+            $("#txtHoraInicio").val(registro.horaInicio ?? "")
+            $("#txtHoraFin").val(registro.horaFin ?? "")
+            $("#txtDrenajeInicial").val(formatearDecimal(registro.drenajeInicial, ""))
+            $("#txtUfTotal").val(formatearDecimal(registro.ufTotal, ""))
+            $("#txtTiempoMedioPerm").val(formatearDecimal(registro.tiempoMedioPerm, ""))
+            $("#txtLiquidoIngerido").val(formatearDecimal(registro.liquidoIngerido, ""))
+            $("#txtCantidadOrina").val(formatearDecimal(registro.cantidadOrina, ""))
+            $("#txtGlucosa").val(formatearDecimal(registro.glucosa, ""))
+            $("#txtPresionArterial").val(registro.presionArterial ?? "")
+            $("#txtPaciente").val(registro.paciente ?? "")
             
             $("#btnGuardar").text("Actualizar Registro")
             $("#btnGuardar").removeClass("btn-primary").addClass("btn-warning")
@@ -1014,6 +1018,13 @@ app.controller("productosCtrl", function ($scope, $http, SesionService, Mensajes
 app.controller("bitacoraCtrl", function ($scope, $http, SesionService, BitacoraMediator, ListaBitacoraComponent, BusquedaBitacoraComponent) {
     // Inicializar variables del scope
     $scope.mesSeleccionado = ""
+    // El servidor busca el mes del año indicado (por defecto el actual)
+    const anioActual = new Date().getFullYear()
+    $scope.anios = []
+    for (let anio = anioActual; anio >= anioActual - 10; anio--) {
+        $scope.anios.push(anio)
+    }
+    $scope.anioSeleccionado = anioActual
     $scope.esAdmin = (SesionService.getTipo && SesionService.getTipo() == 1)
     $scope.pacienteFiltro = $scope.esAdmin ? "" : (SesionService.getUsr ? (SesionService.getUsr() || "") : "")
 
@@ -1048,7 +1059,7 @@ app.controller("bitacoraCtrl", function ($scope, $http, SesionService, BitacoraM
         return meses[parseInt(numeroMes)] || ""
     }
 
-    // Función para buscar bitácora solo por mes
+    // Función para buscar bitácora por mes y año
     $scope.buscarBitacora = function() {
         // Si no hay mes seleccionado, mostrar mensaje
         if (!$scope.mesSeleccionado) {
@@ -1072,19 +1083,20 @@ app.controller("bitacoraCtrl", function ($scope, $http, SesionService, BitacoraM
         `)
         
         // Notificar al Mediator sobre la búsqueda
-        BitacoraMediator.broadcast('mes_seleccionado', { mes: $scope.mesSeleccionado })
+        BitacoraMediator.broadcast('mes_seleccionado', { mes: $scope.mesSeleccionado, anio: $scope.anioSeleccionado })
         
-        // Preparar parámetros de búsqueda solo con mes
+        // Preparar parámetros de búsqueda con mes y año
         if (!$scope.esAdmin && !$scope.pacienteFiltro) {
             $scope.pacienteFiltro = SesionService.getUsr ? (SesionService.getUsr() || "") : ""
         }
 
         const params = {
             mes: $scope.mesSeleccionado,
+            anio: $scope.anioSeleccionado,
             paciente: $scope.pacienteFiltro || ""
         }
         
-        $.get("bitacora/buscar", params, function (registro) {
+        function mostrarRegistros(registro) {
             enableAll()
             $scope.$apply(function() {
                 $scope.bitacora = registro.length
@@ -1106,18 +1118,18 @@ app.controller("bitacoraCtrl", function ($scope, $http, SesionService, BitacoraM
                                     <h5 class="card-title mb-0">Registro #${item.idBitacora}</h5>
                                 </div>
                                 <div class="card-body">
-                                    <p class="card-text"><strong>Paciente:</strong> ${item.paciente || 'N/A'}</p>
+                                    <p class="card-text"><strong>Paciente:</strong> ${item.paciente ?? 'N/A'}</p>
                                     <p class="card-text"><strong>Fecha:</strong> ${item.fecha || 'N/A'}</p>
-                                    <p class="card-text"><strong>Hora Inicio:</strong> ${item.horaInicio || 'N/A'}</p>
-                                    <p class="card-text"><strong>Hora Fin:</strong> ${item.horaFin || 'N/A'}</p>
+                                    <p class="card-text"><strong>Hora Inicio:</strong> ${item.horaInicio ?? 'N/A'}</p>
+                                    <p class="card-text"><strong>Hora Fin:</strong> ${item.horaFin ?? 'N/A'}</p>
                                     <hr>
-                                    <p class="card-text"><strong>Drenaje Inicial:</strong> ${item.drenajeInicial || 'N/A'}</p>
-                                    <p class="card-text"><strong>UF Total:</strong> ${item.ufTotal || 'N/A'}</p>
-                                    <p class="card-text"><strong>Tiempo Medio Permanencia:</strong> ${item.tiempoMedioPerm || 'N/A'}</p>
-                                    <p class="card-text"><strong>Líquido Ingerido:</strong> ${item.liquidoIngerido || 'N/A'}</p>
-                                    <p class="card-text"><strong>Cantidad Orina:</strong> ${item.cantidadOrina || 'N/A'}</p>
-                                    <p class="card-text"><strong>Glucosa:</strong> ${item.glucosa || 'N/A'}</p>
-                                    <p class="card-text"><strong>Presión Arterial:</strong> ${item.presionArterial || 'N/A'}</p>
+                                    <p class="card-text"><strong>Drenaje Inicial:</strong> ${formatearDecimal(item.drenajeInicial, 'N/A')}</p>
+                                    <p class="card-text"><strong>UF Total:</strong> ${formatearDecimal(item.ufTotal, 'N/A')}</p>
+                                    <p class="card-text"><strong>Tiempo Medio Permanencia:</strong> ${formatearDecimal(item.tiempoMedioPerm, 'N/A')}</p>
+                                    <p class="card-text"><strong>Líquido Ingerido:</strong> ${formatearDecimal(item.liquidoIngerido, 'N/A')}</p>
+                                    <p class="card-text"><strong>Cantidad Orina:</strong> ${formatearDecimal(item.cantidadOrina, 'N/A')}</p>
+                                    <p class="card-text"><strong>Glucosa:</strong> ${formatearDecimal(item.glucosa, 'N/A')}</p>
+                                    <p class="card-text"><strong>Presión Arterial:</strong> ${item.presionArterial ?? 'N/A'}</p>
                                 </div>
                                 <div class="card-footer bg-light">
                                     <button class="btn btn-warning btn-sm btn-editar-bitacora me-1 while-waiting" data-id="${item.idBitacora}">
@@ -1138,12 +1150,29 @@ app.controller("bitacoraCtrl", function ($scope, $http, SesionService, BitacoraM
                 $("#contenedorTarjetas").html(`
                     <div class="col-12">
                         <div class="alert alert-warning text-center" role="alert">
-                            <i class="bi bi-exclamation-triangle"></i> No se encontraron registros de bitácora para el mes de ${nombreMes}.
+                            <i class="bi bi-exclamation-triangle"></i> No se encontraron registros de bitácora para el mes de ${nombreMes} de ${$scope.anioSeleccionado}.
                         </div>
                     </div>
                 `)
             }
-        })
+        }
+
+        // El servidor entrega el mes por páginas: se siguen los cursores de
+        // X-Siguiente-Cursor hasta la última página y se muestran todos los registros
+        const registros = []
+        function cargarPagina(despues) {
+            const pagina = despues ? $.extend({}, params, { despues: despues }) : params
+            $.get("bitacora/buscar", pagina, function (datos, estado, xhr) {
+                registros.push(...datos)
+                const siguiente = xhr.getResponseHeader("X-Siguiente-Cursor")
+                if (siguiente) {
+                    cargarPagina(siguiente)
+                } else {
+                    mostrarRegistros(registros)
+                }
+            })
+        }
+        cargarPagina(null)
         disableAll()
     }
 
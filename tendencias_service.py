@@ -0,0 +1,229 @@
+"""
+Módulo con el análisis de tendencias por paciente.
+Carga una sola vez el historial del paciente en arreglos columnares de NumPy
+y calcula, para todas las ventanas a la vez, medias móviles, pendientes y
+alertas de desviación mediante sumas acumuladas (sin bucles por registro).
+Los resultados se guardan en caché hasta el siguiente cambio del paciente.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import mysql.connector
+import numpy as np
+
+from bitacora_service import BitacoraObserver
+
+
+class TendenciasService:
+    """
+    Servicio de tendencias de ufTotal, glucosa, drenajeInicial y balance
+    hídrico (liquidoIngerido - cantidadOrina).
+    Las ventanas se miden en registros (sesiones); las pendientes, en
+    unidades por día.
+    """
+
+    CAMPOS = ('ufTotal', 'glucosa', 'drenajeInicial', 'balanceHidrico')
+    VENTANAS_POR_DEFECTO = (7, 30)
+    # Mínimo de valores en la ventana para calcular desviaciones y pendientes
+    MINIMO_VALORES = 3
+
+    def __init__(self, connection_source, max_entradas: int = 128):
+        """
+        Args:
+            connection_source: Objeto con get_connection() (pool o fuente por petición)
+            max_entradas: Pacientes/configuraciones que se conservan en caché
+        """
+        self.connection_source = connection_source
+        self.max_entradas = max_entradas
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # Se incrementa en cada invalidación para no guardar resultados calculados antes de ella
+        self._generacion = 0
+
+    def tendencias(self, id_paciente: int, ventanas: Sequence[int] = VENTANAS_POR_DEFECTO,
+                   umbral: float = 2.0) -> Dict[str, Any]:
+        """
+        Obtiene las tendencias de un paciente.
+
+        Args:
+            id_paciente: ID del paciente
+            ventanas: Tamaños de ventana (en registros)
+            umbral: Desviaciones estándar a partir de las cuales un valor se marca como alerta
+
+        Returns:
+            Diccionario con 'fechas' y, por campo, 'valores' y por ventana
+            'media', 'pendiente', 'desviacion' y 'alertas' (índices)
+        """
+        ventanas = tuple(sorted(set(int(v) for v in ventanas)))
+        clave = (id_paciente, ventanas, float(umbral))
+        with self._lock:
+            if clave in self._cache:
+                self._cache.move_to_end(clave)
+                return self._cache[clave]
+            generacion = self._generacion
+
+        historial = self._cargar(id_paciente)
+        if historial is None:
+            return {'success': False, 'error': 'Error al obtener el historial'}
+        resultado = self._calcular(id_paciente, historial, ventanas, umbral)
+
+        with self._lock:
+            if generacion != self._generacion:
+                return resultado
+            self._cache[clave] = resultado
+            self._cache.move_to_end(clave)
+            while len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)
+        return resultado
+
+    def invalidar(self, id_paciente: Optional[int] = None):
+        """Descarta de la caché las tendencias de un paciente (o todas)."""
+        with self._lock:
+            self._generacion += 1
+            if id_paciente is None:
+                self._cache.clear()
+                return
+            for clave in [c for c in self._cache if c[0] == id_paciente]:
+                del self._cache[clave]
+
+    def _cargar(self, id_paciente: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Carga el historial del paciente en arreglos columnares.
+
+        Returns:
+            Tupla (fechas datetime64[D], matriz n x len(CAMPOS) con NaN en los faltantes)
+        """
+        con = None
+        cursor = None
+        try:
+            con = self.connection_source.get_connection()
+            cursor = con.cursor()
+            cursor.execute("""
+                SELECT fecha, ufTotal, glucosa, drenajeInicial, liquidoIngerido, cantidadOrina
+                FROM bitacora
+                WHERE idPaciente = %s
+                ORDER BY fecha, idBitacora
+            """, (id_paciente,))
+            filas = cursor.fetchall()
+        except mysql.connector.Error as error:
+            print(f"[TendenciasService] Error al cargar historial: {error}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if con and con.is_connected():
+                con.close()
+
+        if not filas:
+            return np.array([], dtype="datetime64[D]"), np.empty((0, len(self.CAMPOS)))
+        columnas = list(zip(*filas))
+        fechas = np.array(columnas[0], dtype="datetime64[D]")
+        numericas = np.array([[np.nan if v is None else float(v) for v in columna]
+                              for columna in columnas[1:]], dtype=float)
+        uf, glucosa, drenaje, liquido, orina = numericas
+        valores = np.column_stack((uf, glucosa, drenaje, liquido - orina))
+        return fechas, valores
+
+    def _calcular(self, id_paciente: int, historial: Tuple[np.ndarray, np.ndarray],
+                  ventanas: Tuple[int, ...], umbral: float) -> Dict[str, Any]:
+        """Calcula todas las ventanas sobre la matriz de valores con sumas acumuladas."""
+        fechas, valores = historial
+        n = len(fechas)
+        validos = ~np.isnan(valores)
+        y = np.where(validos, valores, 0.0)
+        # Días desde el primer registro (x de la regresión), por campo
+        dias = (fechas - fechas[0]).astype(float) if n else np.empty(0)
+        x = np.where(validos, dias[:, None], 0.0)
+
+        # Sumas acumuladas con una fila inicial de ceros: suma(i..j) = S[j+1] - S[i]
+        def acumular(matriz):
+            return np.vstack((np.zeros((1, matriz.shape[1])), np.cumsum(matriz, axis=0)))
+
+        s_n, s_y, s_yy = acumular(validos.astype(float)), acumular(y), acumular(y * y)
+        s_x, s_xx, s_xy = acumular(x), acumular(x * x), acumular(x * y)
+
+        fin = np.arange(1, n + 1)
+        series: Dict[str, Any] = {campo: {'valores': self._lista(valores[:, k]), 'ventanas': {}}
+                                  for k, campo in enumerate(self.CAMPOS)}
+        for ventana in ventanas:
+            inicio = np.maximum(fin - ventana, 0)
+            # Ventana que termina en el registro (inclusive): media y pendiente
+            cuenta = s_n[fin] - s_n[inicio]
+            suma_y = s_y[fin] - s_y[inicio]
+            suma_x = s_x[fin] - s_x[inicio]
+            suma_xx = s_xx[fin] - s_xx[inicio]
+            suma_xy = s_xy[fin] - s_xy[inicio]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                media = np.where(cuenta > 0, suma_y / cuenta, np.nan)
+                denominador = cuenta * suma_xx - suma_x * suma_x
+                pendiente = np.where((cuenta >= self.MINIMO_VALORES) & (denominador > 0),
+                                     (cuenta * suma_xy - suma_x * suma_y) / denominador, np.nan)
+
+                # Ventana anterior al registro (exclusiva): desviación del valor actual
+                previo_fin = fin - 1
+                previo_inicio = np.maximum(previo_fin - ventana, 0)
+                cuenta_p = s_n[previo_fin] - s_n[previo_inicio]
+                media_p = (s_y[previo_fin] - s_y[previo_inicio]) / cuenta_p
+                varianza_p = (s_yy[previo_fin] - s_yy[previo_inicio]) / cuenta_p - media_p * media_p
+                desviacion_p = np.sqrt(np.maximum(varianza_p, 0.0))
+                z = np.where(validos & (cuenta_p >= self.MINIMO_VALORES) & (desviacion_p > 0),
+                             (valores - media_p) / desviacion_p, np.nan)
+            alertas = np.abs(np.nan_to_num(z)) > umbral
+
+            for k, campo in enumerate(self.CAMPOS):
+                series[campo]['ventanas'][str(ventana)] = {
+                    'media': self._lista(media[:, k]),
+                    'pendiente': self._lista(pendiente[:, k], 4),
+                    'desviacion': self._lista(z[:, k]),
+                    'alertas': np.flatnonzero(alertas[:, k]).tolist()
+                }
+
+        return {
+            'success': True,
+            'idPaciente': id_paciente,
+            'registros': n,
+            'ventanas': list(ventanas),
+            'umbral': umbral,
+            'fechas': [str(fecha) for fecha in fechas],
+            'series': series
+        }
+
+    @staticmethod
+    def _lista(arreglo: np.ndarray, decimales: int = 2) -> List[Optional[float]]:
+        """Convierte un arreglo en lista para JSON (NaN como None)."""
+        redondeado = np.round(arreglo, decimales)
+        return [None if np.isnan(v) else v for v in redondeado.tolist()]
+
+
+class BitacoraTendenciasObserver(BitacoraObserver):
+    """
+    Observador concreto que invalida las tendencias en caché del paciente
+    afectado por cada alta, modificación o baja.
+    """
+
+    requiere_anterior = True
+
+    def __init__(self, servicio: TendenciasService):
+        self.servicio = servicio
+
+    def update(self, event_type: str, data: Dict[str, Any]):
+        """
+        Invalida las tendencias de los pacientes afectados por el evento.
+
+        Args:
+            event_type: Tipo de evento ('created', 'updated', 'deleted' o 'batch')
+            data: Datos del evento ('datos' y 'anterior' según el tipo)
+        """
+        eventos = data.get('eventos', []) if event_type == 'batch' else [data]
+        for evento in eventos:
+            pacientes = {(estado or {}).get('idPaciente')
+                         for estado in (evento.get('datos'), evento.get('anterior'))}
+            pacientes.discard(None)
+            if not pacientes:
+                # Sin paciente conocido no se puede acotar la invalidación
+                self.servicio.invalidar()
+                return
+            for id_paciente in pacientes:
+                self.servicio.invalidar(int(id_paciente))